@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, HTTPException
+from bson import ObjectId
+from bson.errors import InvalidId
 from backend.db.database import get_database
-from backend.services.auth_service import get_current_admin # ใช้ยามตรวจ Admin
+from backend.services.auth_service import get_current_admin, user_cache # ใช้ยามตรวจ Admin
+from backend.services.scoring_executor import scoring_executor
+from backend.services import artifact_store
 
 router = APIRouter()
 
@@ -21,5 +26,34 @@ async def delete_user(user_id: str, admin: dict = Depends(get_current_admin)):
     if user_id == str(admin["_id"]):
         raise HTTPException(status_code=400, detail="ไม่สามารถลบบัญชีตัวเองได้")
     
-    await db.users.delete_one({"_id": user_id})
-    return {"message": "ลบผู้ใช้งานเรียบร้อยแล้ว"}
\ No newline at end of file
+    try:
+        oid = ObjectId(user_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="รหัสผู้ใช้งานไม่ถูกต้อง")
+
+    await db.users.delete_one({"_id": oid})
+    # ลบออกจากแคชทันที Token ที่ยังไม่หมดอายุของบัญชีนี้จะใช้ไม่ได้ตั้งแต่ Request ถัดไป
+    user_cache.invalidate(user_id=user_id)
+    return {"message": "ลบผู้ใช้งานเรียบร้อยแล้ว"}
+
+@router.get("/stats/user-cache")
+async def user_cache_stats(admin: dict = Depends(get_current_admin)):
+    """สถิติแคชข้อมูล User ของ Process นี้ (hit/miss) (เฉพาะ Admin)"""
+    return user_cache.stats()
+
+@router.post("/model/reload")
+async def reload_model(model_path: Optional[str] = Body(None, embed=True), admin: dict = Depends(get_current_admin)):
+    """สลับไปใช้ไฟล์โมเดลใหม่ (.keras) โดยไม่ต้องรีสตาร์ทเซิร์ฟเวอร์ (เฉพาะ Admin)
+    ถ้าไม่ระบุ model_path จะโหลดไฟล์เดิมซ้ำ (กรณีเขียนทับไฟล์โมเดลเดิม)"""
+    try:
+        info = await scoring_executor.reload(model_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="ไม่พบไฟล์โมเดลที่ระบุ")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"โหลดโมเดลใหม่ไม่สำเร็จ: {str(e)}")
+    return {"message": "สลับโมเดลเรียบร้อยแล้ว", "model": info}
+
+@router.post("/storage/gc")
+async def storage_gc(admin: dict = Depends(get_current_admin)):
+    """สั่งเก็บกวาดที่เก็บไฟล์ทันที (ปกติทำอัตโนมัติทุก STORE_GC_INTERVAL_MIN นาที) (เฉพาะ Admin)"""
+    return await artifact_store.collect_garbage()
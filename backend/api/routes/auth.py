@@ -5,7 +5,7 @@ from zoneinfo import ZoneInfo
 
 from backend.db.database import get_database
 from backend.schemas.user import UserCreate, UserResponse
-from backend.services.auth_service import hash_password, verify_password, create_access_token
+from backend.services.auth_service import hash_password_async, verify_password_async, needs_rehash, create_access_token
 
 router = APIRouter()
 
@@ -24,7 +24,7 @@ async def register(user: UserCreate):
 
     # 2. แปลงข้อมูลเป็น Dict และแฮชรหัสผ่าน
     user_dict = user.model_dump()
-    user_dict["password"] = hash_password(user.password)
+    user_dict["password"] = await hash_password_async(user.password)
     
     # เพิ่ม Timestamp ลงไป (ใช้ timezone-aware ตามมาตรฐานใหม่)
     bangkok_tz = ZoneInfo("Asia/Bangkok")
@@ -54,12 +54,17 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         )
 
     # 2. ตรวจสอบรหัสผ่านว่าตรงกับที่แฮชไว้หรือไม่
-    if not verify_password(form_data.password, user["password"]):
+    if not await verify_password_async(form_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="รหัสผ่านไม่ถูกต้อง"
         )
 
+    # ถ้าเปลี่ยน BCRYPT_ROUNDS แฮชรหัสผ่านใหม่ด้วย Cost factor ปัจจุบัน (ทำได้เฉพาะตอนนี้ที่รู้รหัสผ่านจริง)
+    if needs_rehash(user["password"]):
+        new_hash = await hash_password_async(form_data.password)
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+
     # 3. สร้าง JWT Token พร้อมฝัง Role เข้าไปใน Token ด้วย
     access_token = create_access_token(
         data={"sub": user["username"], "role": user["role"]}
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from backend.services.scoring_executor import scoring_executor
+
+router = APIRouter()
+
+@router.get("/live")
+async def liveness():
+    """เซิร์ฟเวอร์ยังทำงานอยู่ (ไม่สนว่าโมเดลพร้อมหรือยัง)"""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """พร้อมรับงานวิเคราะห์เมื่อทุก Scoring Process โหลดและอุ่นเครื่องโมเดลเสร็จแล้วเท่านั้น
+    (เซิร์ฟเวอร์แบบ API อย่างเดียวพร้อมทันทีเพราะไม่ต้องโหลดโมเดล)"""
+    if not scoring_executor.enabled:
+        return {"status": "ready", "scoring": "disabled"}
+
+    body = {
+        "status": "ready" if scoring_executor.ready else "starting",
+        "model": scoring_executor.model_info,
+        "error": scoring_executor.error,
+    }
+    return JSONResponse(status_code=200 if scoring_executor.ready else 503, content=body)
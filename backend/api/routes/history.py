@@ -1,16 +1,43 @@
-from fastapi import APIRouter, Depends, Query
+import re
+import base64
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
 from backend.db.database import get_database
 from backend.services.auth_service import get_current_user
+from backend.services.round_service import normalize_match_name
 
 router = APIRouter()
 
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+SUMMARY_PROJECTION = {"details": 0, "match_name_norm": 0}  # ไม่ส่งรายละเอียดทุกท่อนเสียงในหน้ารายการ
+
+def encode_cursor(doc: dict) -> str:
+    """ตำแหน่งของเอกสารสุดท้ายในหน้า (created_at, _id) แปลงเป็นข้อความสำหรับขอหน้าถัดไป"""
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, oid = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(oid)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="cursor ไม่ถูกต้อง")
+
 @router.get("/")
 async def get_history(
     match_name: Optional[str] = Query(None),
     cage_number: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor จากหน้าก่อนหน้า"),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    include_details: bool = Query(False, description="ส่งรายละเอียดทุกท่อนเสียง (details) มาด้วย"),
     current_user: dict = Depends(get_current_user)
 ):
+    """ประวัติการวิเคราะห์ เรียงจากใหม่ไปเก่า แบ่งหน้าแบบ Keyset ตาม (created_at, _id)
+    หน้าที่ลึกแค่ไหนก็เร็วเท่ากัน เพราะไม่ต้อง skip เอกสารก่อนหน้า"""
     db = get_database()
     query = {}
 
@@ -20,40 +47,69 @@ async def get_history(
     
     # 🔍 ตัวกรองค้นหา (ถ้ามีการส่งมา)
     if match_name:
-        query["match_name"] = {"$regex": match_name, "$options": "i"} # ค้นหาแบบไม่สนตัวพิมพ์เล็กใหญ่
+        # ค้นหาจากคำขึ้นต้นของชื่อรายการแข่งที่ Normalize แล้ว (ไม่สนตัวพิมพ์เล็กใหญ่ และใช้ Index ได้)
+        query["match_name_norm"] = {"$regex": f"^{re.escape(normalize_match_name(match_name))}"}
     if cage_number:
         query["cage_number"] = cage_number
 
-    # ดึงข้อมูล เรียงจากใหม่ไปเก่า
-    results = await db.results.find(query).sort("created_at", -1).to_list(100)
-    
+    if cursor:
+        created_at, oid = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": oid}},
+        ]
+
+    projection = {"match_name_norm": 0} if include_details else SUMMARY_PROJECTION
+    results = await (
+        db.results.find(query, projection)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1) # ดึงเกินมา 1 เพื่อรู้ว่ายังมีหน้าถัดไปไหม
+        .to_list(limit + 1)
+    )
+
+    has_more = len(results) > limit
+    results = results[:limit]
+    next_cursor = encode_cursor(results[-1]) if has_more else None
+
     for r in results:
         r["_id"] = str(r["_id"])
         
-    return results
+    return {"items": results, "next_cursor": next_cursor}
 
 @router.get("/session/{session_id}")
 async def get_session_detail(session_id: str, current_user: dict = Depends(get_current_user)):
-    """ดึงข้อมูล 4 ยกของนกตัวเดียวมาแสดงในหน้าสรุปผล"""
+    """ดึงข้อมูล 4 ยกของนกตัวเดียวมาแสดงในหน้าสรุปผล
+    (สรุปคะแนนอ่านจาก db.sessions ที่อัปเดตทุกครั้งที่บันทึกยก ไม่ต้องรวมคะแนนใหม่ทุกครั้งที่เปิดดู)"""
     db = get_database()
-    rounds = await db.results.find({"session_id": session_id}).sort("round_no", 1).to_list(length=4)
+    session = await db.sessions.find_one({"_id": session_id})
     
-    if not rounds:
+    if not session:
         raise HTTPException(status_code=404, detail="ไม่พบข้อมูลเซสชันนี้")
         
     # เช็กสิทธิ์ (ถ้าไม่ใช่เจ้าของ และไม่ใช่ Admin ห้ามดู)
-    if rounds[0]["user_id"] != str(current_user["_id"]) and current_user["role"] != "admin":
+    if session["user_id"] != str(current_user["_id"]) and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="ไม่มีสิทธิ์ดูข้อมูลนี้")
 
+    # ยกเดียวกันที่ส่งซ้ำ แสดงเฉพาะผลล่าสุด (ตรงกับคะแนนรายยกใน db.sessions)
+    rounds = await db.results.aggregate([
+        {"$match": {"session_id": session_id}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": "$round_no", "doc": {"$last": "$$ROOT"}}},
+        {"$replaceRoot": {"newRoot": "$doc"}},
+        {"$project": {"match_name_norm": 0}},
+        {"$sort": {"round_no": 1}},
+    ]).to_list(length=None)
     for r in rounds:
         r["_id"] = str(r["_id"])
 
     return {
         "summary": {
-            "match_name": rounds[0]["match_name"],
-            "cage_number": rounds[0]["cage_number"],
-            "total_score": sum(r["total_score"] for r in rounds),
-            "final_status": rounds[-1]["final_status"] # สถานะจากยกสุดท้าย
+            "match_name": session["match_name"],
+            "cage_number": session["cage_number"],
+            "total_score": session["total_score"],
+            "rounds": sorted(session["rounds"]),
+            "round_scores": session["round_scores"],
+            "final_status": session.get("final_status", "pending") # สถานะจากยกล่าสุด
         },
         "rounds": rounds
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,68 @@
+import json
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from backend.services.auth_service import get_current_user, get_current_user_or_query
+from backend.services.job_service import get_job, job_to_response
+
+router = APIRouter()
+
+SSE_POLL_INTERVAL = 0.5   # วินาที ระหว่างการเช็กสถานะงานใน MongoDB
+SSE_HEARTBEAT_EVERY = 30  # ส่ง comment กันการเชื่อมต่อหลุดทุกๆ กี่รอบของการเช็ก
+
+async def get_owned_job(job_id: str, current_user: dict):
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ไม่พบงานวิเคราะห์นี้")
+    # เช็กสิทธิ์ (ถ้าไม่ใช่เจ้าของ และไม่ใช่ Admin ห้ามดู)
+    if job["user_id"] != str(current_user["_id"]) and current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="ไม่มีสิทธิ์ดูข้อมูลนี้")
+    return job
+
+def sse_message(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    """ดูสถานะ/ผลลัพธ์ของงานวิเคราะห์ (สำหรับ Polling)"""
+    job = await get_owned_job(job_id, current_user)
+    return job_to_response(job)
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, current_user: dict = Depends(get_current_user_or_query)):
+    """Server-Sent Events: แจ้งทุกครั้งที่งานเปลี่ยนขั้นตอน และส่งผลลัพธ์สุดท้ายเมื่อเสร็จ
+    ยืนยันตัวตนด้วย Header Authorization หรือ ?token=... (EventSource ของเบราว์เซอร์ส่ง Header เองไม่ได้)"""
+    await get_owned_job(job_id, current_user)
+
+    async def event_stream():
+        last_stage = None
+        polls = 0
+        while True:
+            job = await get_job(job_id)
+            if job is None:
+                yield sse_message("error", {"detail": "ไม่พบงานวิเคราะห์นี้"})
+                return
+
+            if job["stage"] != last_stage:
+                last_stage = job["stage"]
+                yield sse_message("progress", {"job_id": job_id, "status": job["status"], "stage": last_stage})
+
+            if job["status"] == "done":
+                yield sse_message("result", job["result"])
+                return
+            if job["status"] == "failed":
+                yield sse_message("error", {"detail": job["error"]})
+                return
+
+            polls += 1
+            if polls % SSE_HEARTBEAT_EVERY == 0:
+                yield ": heartbeat\n\n"
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,175 @@
+import os
+import json
+import asyncio
+import hashlib
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status
+
+from backend.services.scoring_executor import scoring_executor, ScoringBusyError, SCORING_RETRY_AFTER
+from backend.services.scoring_config import SR
+from backend.services.auth_service import get_user_from_token
+from backend.services.round_service import record_round, build_round_response
+from backend.services.analysis_cache import get_cached_analysis, store_analysis
+from backend.services.upload_service import MAX_UPLOAD_BYTES, IN_MEMORY_MAX_BYTES
+from backend.services import scoring_worker, artifact_store
+
+router = APIRouter()
+
+LIVE_MAX_SAMPLES = MAX_UPLOAD_BYTES // 2  # ไฟล์ทั้งยกบันทึกเป็น WAV 16-bit จำกัดความยาวเท่ากับไฟล์อัปโหลดที่ใหญ่ที่สุด
+LIVE_MAX_INFLIGHT = int(os.getenv("LIVE_MAX_INFLIGHT", "2"))  # ท่อนเสียงที่ส่งให้คะแนนค้างพร้อมกันได้ต่อการเชื่อมต่อ
+
+async def _run_retrying(fn, *args):
+    """รันงานใน Scoring Pool ถ้าคิวเต็มให้รอแล้วลองใหม่ (เสียงของยกที่กำลังอัดต้องไม่หาย)"""
+    while True:
+        try:
+            return await fn(*args)
+        except ScoringBusyError:
+            await asyncio.sleep(min(SCORING_RETRY_AFTER, 1))
+
+async def _score_chunk(y_chunk, sr: int) -> dict:
+    """ส่งท่อนเสียง 1 ท่อนเข้า Scoring Pool (ผลเบื้องต้นระหว่างอัด)"""
+    return await _run_retrying(scoring_executor.run, scoring_worker.score_segment, y_chunk, sr)
+
+async def _abort(tasks: list, websocket: WebSocket, code: int, detail: str):
+    """ยกเลิกงานที่ค้าง แจ้งสาเหตุให้ Client แล้วปิดการเชื่อมต่อ (ไม่บันทึกผลครึ่งยก)"""
+    for task in tasks:
+        task.cancel()
+    await websocket.send_json({"type": "error", "detail": detail})
+    await websocket.close(code=code)
+
+@router.websocket("/live")
+async def live_scoring(websocket: WebSocket):
+    """วิเคราะห์เสียง 1 ยกแบบ Real-time ระหว่างที่กำลังอัดเสียง
+
+    ลำดับข้อความ:
+    1. Client ส่ง JSON {"type": "start", "token", "match_name", "cage_number", "round_no", "mode", "session_id",
+       "sample_rate", "format": "f32" | "s16"}  -> Server ตอบ {"type": "ready"}
+    2. Client ส่งเสียง PCM mono (binary) ทีละก้อน -> Server ส่ง {"type": "event", "event", "running_score"}
+       ทุกครั้งที่ท่อนเสียงจบและให้คะแนนเสร็จ (ผลเบื้องต้น URL ของไฟล์ประกอบมีใน final เท่านั้น)
+    3. Client ส่ง {"type": "stop"} -> Server วิเคราะห์ไฟล์ทั้งยกใหม่แบบเดียวกับ /api/predict บันทึกผล
+       แล้วส่ง {"type": "final", ...} (รูปแบบและผลเดียวกับ /api/predict ของไฟล์เดียวกัน)
+
+    ปิดการเชื่อมต่อด้วย 1009 ถ้าเสียงยาวเกิน LIVE_MAX_SAMPLES และ 1003 ถ้าข้อมูลเสียงผิดรูปแบบ"""
+    await websocket.accept()
+
+    # 1. ยืนยันตัวตนจาก Token ในข้อความแรก (WebSocket ของเบราว์เซอร์ใส่ Header Authorization เองไม่ได้)
+    start = await websocket.receive_json()
+    if start.get("type") != "start":
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="ข้อความแรกต้องเป็น start")
+        return
+    try:
+        current_user = await get_user_from_token(start.get("token", ""))
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="ไม่สามารถยืนยันตัวตนได้")
+        return
+
+    if not scoring_executor.enabled:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="เซิร์ฟเวอร์นี้ไม่รองรับการวิเคราะห์เสียง")
+        return
+
+    # import ตอนใช้งาน เพื่อให้ Process ของ API ที่ไม่ได้เปิดใช้ WebSocket ไม่ต้องโหลดส่วนนี้
+    from backend.services.live_scoring import StreamingSegmenter, RecordingTooLongError, decode_pcm, encode_wav, PCM_FORMATS
+
+    # ตรวจข้อมูลใน start ทั้งหมดก่อนเริ่ม (ค่าที่แปลงเป็นตัวเลขไม่ได้ก็ปิดด้วยเหตุผลเดียวกัน ไม่ปล่อยให้ Socket หลุดเฉยๆ)
+    try:
+        pcm_format = start.get("format", "f32")
+        sample_rate = int(start.get("sample_rate", SR))
+        round_no = int(start.get("round_no", 1))
+        if pcm_format not in PCM_FORMATS or sample_rate <= 0 or round_no <= 0:
+            raise ValueError()
+    except (TypeError, ValueError):
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason="รูปแบบเสียงหรือข้อมูลยกไม่ถูกต้อง")
+        return
+
+    round_info = {
+        "match_name": start.get("match_name"),
+        "mode": start.get("mode", "competition"),
+        "session_id": start.get("session_id"),
+        "cage_number": start.get("cage_number"),
+        "round_no": round_no,
+    }
+    print(f"👤 ผู้ใช้งาน {current_user['username']} เริ่มส่งเสียงนกแบบ Real-time...")
+
+    segmenter = StreamingSegmenter(sample_rate, max_samples=LIVE_MAX_SAMPLES)
+    send_lock = asyncio.Lock()
+    inflight = asyncio.Semaphore(LIVE_MAX_INFLIGHT)
+    scored = {}   # event_no -> ผลเบื้องต้นของท่อนนั้น
+    tasks = []
+
+    async def score_event(event: dict):
+        try:
+            verdict = await _score_chunk(segmenter.chunk(event["start"], event["end"]), sample_rate)
+        finally:
+            inflight.release()
+        detail = {
+            "event_no": event["event_no"],
+            "start_sec": round(event["start"] / sample_rate, 2),
+            "end_sec": round(event["end"] / sample_rate, 2),
+            "duration_sec": round((event["end"] - event["start"]) / sample_rate, 2),
+            **verdict,
+        }
+        async with send_lock:
+            scored[event["event_no"]] = detail
+            running_score = sum(1 for d in scored.values() if d["is_counted"])
+            await websocket.send_json({"type": "event", "event": detail, "running_score": running_score})
+
+    async def schedule(events: list):
+        # รอให้ท่อนที่ค้างอยู่เสร็จก่อนรับท่อนใหม่ (ไม่อ่านเสียงก้อนถัดไปจนกว่าจะมีที่ว่าง)
+        for event in events:
+            await inflight.acquire()
+            tasks.append(asyncio.create_task(score_event(event)))
+
+    await websocket.send_json({"type": "ready", "sample_rate": sample_rate, "format": pcm_format})
+
+    try:
+        # 2. รับเสียงทีละก้อน ตัดท่อนที่จบแล้วส่งไปให้คะแนนทันที (ไม่รอให้จบยก)
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                try:
+                    pcm = decode_pcm(message["bytes"], pcm_format)
+                except ValueError:
+                    await _abort(tasks, websocket, status.WS_1003_UNSUPPORTED_DATA, "ข้อมูลเสียงไม่ตรงกับรูปแบบที่แจ้งไว้")
+                    return
+                try:
+                    events = segmenter.feed(pcm)
+                except RecordingTooLongError:
+                    await _abort(tasks, websocket, status.WS_1009_MESSAGE_TOO_BIG,
+                                 f"เสียงยาวเกิน {LIVE_MAX_SAMPLES // sample_rate} วินาที")
+                    return
+                await schedule(events)
+            elif message.get("text") is not None and json.loads(message["text"]).get("type") == "stop":
+                break
+
+        # 3. จบยก: ปิดท่อนสุดท้าย รอผลเบื้องต้นทุกท่อน แล้วบันทึกไฟล์เสียงทั้งยก
+        await schedule(segmenter.finish())
+        await asyncio.gather(*tasks)
+        wav_bytes = encode_wav(segmenter.samples, sample_rate)
+        audio_hash = hashlib.sha256(wav_bytes).hexdigest()
+        save_path = await asyncio.to_thread(artifact_store.put_bytes, audio_hash, ".wav", wav_bytes)
+        audio_name = os.path.basename(save_path)
+
+        # วิเคราะห์ไฟล์ทั้งยกใหม่ด้วย analyze_audio_session เหมือน /api/predict ผลที่บันทึกจึงตรงกับการอัปโหลดไฟล์เดียวกัน
+        # (ผลระหว่างอัดใช้ค่าอ้างอิงความดังเท่าที่ได้ยินมา และไม่ได้ลดเสียงรบกวนทั้งไฟล์ จึงเป็นแค่ผลเบื้องต้น)
+        analysis_result = await get_cached_analysis(audio_hash)
+        if analysis_result is None:
+            audio_bytes = wav_bytes if len(wav_bytes) <= IN_MEMORY_MAX_BYTES else None
+            analysis_result = await _run_retrying(scoring_executor.score, save_path, None, audio_bytes)
+            await store_analysis(audio_hash, analysis_result)
+        result_doc = await record_round(
+            round_info, str(current_user["_id"]), artifact_store.blob_url(audio_hash, ".wav"), analysis_result,
+            audio_hash=audio_hash
+        )
+
+        async with send_lock:
+            await websocket.send_json({"type": "final", **build_round_response(result_doc, audio_name, analysis_result)})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        # Client หลุดก่อนจบยก: ยกเลิกงานที่ค้าง ไม่บันทึกผลครึ่งยก
+        for task in tasks:
+            task.cancel()
+        print(f"⚠️ การเชื่อมต่อ Real-time ของ {current_user['username']} หลุดก่อนจบยก")
+    except Exception as e:
+        await _abort(tasks, websocket, status.WS_1011_INTERNAL_ERROR, f"เกิดข้อผิดพลาดในการประมวลผล: {str(e)}")
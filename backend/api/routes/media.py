@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from backend.services import artifact_store
+
+router = APIRouter()
+
+MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+}
+
+@router.get("/audio/{name}")
+def get_audio(name: str):
+    """ไฟล์เสียงต้นฉบับของยก (URL เดิม /uploads/audio/<ชื่อไฟล์>)
+    หาไฟล์จากที่เก็บแบบ Content-addressed ก่อน ถ้าไม่มีค่อยหาใน uploads/audio (ไฟล์ที่อัปโหลดก่อนมีที่เก็บนี้)"""
+    path = artifact_store.resolve(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="ไม่พบไฟล์เสียง")
+    ext = name[name.rfind("."):].lower() if "." in name else ""
+    # ชื่อไฟล์ตามแฮชไม่มีวันเปลี่ยนเนื้อหา ให้เบราว์เซอร์แคชได้นาน
+    return FileResponse(path, media_type=MEDIA_TYPES.get(ext), headers={"Cache-Control": "public, max-age=31536000, immutable"})
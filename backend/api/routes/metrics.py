@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from backend.services.metrics import registry
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """ตัวชี้วัดของเซิร์ฟเวอร์ในรูปแบบข้อความของ Prometheus (เวลาแต่ละขั้นตอน, คิววิเคราะห์, จำนวนท่อนต่อยก)"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,15 +1,23 @@
 import os
-import time
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from datetime import datetime
-from zoneinfo import ZoneInfo
 
-from backend.services.ml_service import analyze_audio_session
+from backend.services.scoring_executor import scoring_executor, ScoringBusyError, ScoringDisabledError, SCORING_RETRY_AFTER
 from backend.services.auth_service import get_current_user
-from backend.db.database import get_database
+from backend.services.round_service import record_round, build_round_response
+from backend.services.job_service import create_job, schedule_job
+from backend.services.analysis_cache import get_cached_analysis, store_analysis
+from backend.services.upload_service import receive_upload, persist_upload, upload_extension, UploadTooLargeError, MAX_UPLOAD_BYTES
+from backend.services import artifact_store, metrics
 
 router = APIRouter()
 
+def scoring_busy_exception():
+    return HTTPException(
+        status_code=503,
+        detail="ระบบกำลังวิเคราะห์เสียงเต็มคิว กรุณาลองใหม่อีกครั้ง",
+        headers={"Retry-After": str(SCORING_RETRY_AFTER)},
+    )
+
 @router.post("/predict")
 async def predict_audio(
     match_name: str = Form(...),
@@ -17,82 +25,105 @@ async def predict_audio(
     round_no: int = Form(...),
     mode: str = Form("competition"),
     session_id: str = Form(None),
+    async_job: bool = Form(False),
     file: UploadFile = File(...), 
     current_user: dict = Depends(get_current_user)
 ):
-    db = get_database()
-    bangkok_tz = ZoneInfo("Asia/Bangkok")
-
+    """วิเคราะห์เสียง 1 ยก
+    async_job=True: ตอบกลับ job_id ทันที แล้วติดตามผลที่ /api/jobs/{job_id} หรือ /api/jobs/{job_id}/events"""
     print(f"👤 ผู้ใช้งาน {current_user['username']} กำลังส่งเสียงนกมาตรวจ...")
 
     # 1. ตรวจสอบนามสกุลไฟล์
     if not (file.filename.endswith('.wav') or file.filename.endswith('.mp3')):
         raise HTTPException(status_code=400, detail="กรุณาอัปโหลดไฟล์ .wav/.mp3 เท่านั้น")
 
-    # 2. สร้างชื่อไฟล์ใหม่ให้ไม่ซ้ำกัน (ใช้ Timestamp + ชื่อเดิม)
-    # วิธีนี้จะทำให้ไฟล์ในโฟลเดอร์เรียงลำดับตามเวลาที่อัปโหลดด้วย
-    timestamp = int(time.time())
-    unique_filename = f"{timestamp}_{file.filename}"
-    save_path = os.path.join("uploads", "audio", unique_filename)
+    if not scoring_executor.enabled:
+        raise HTTPException(status_code=503, detail="เซิร์ฟเวอร์นี้ไม่รองรับการวิเคราะห์เสียง กรุณาส่งไปยังเซิร์ฟเวอร์วิเคราะห์")
+
+    if artifact_store.is_over_quota():
+        raise HTTPException(status_code=507, detail="พื้นที่เก็บไฟล์เสียงเต็ม กรุณาติดต่อผู้ดูแลระบบ")
+
+    round_info = {
+        "match_name": match_name,
+        "mode": mode,
+        "session_id": session_id,
+        "cage_number": cage_number,
+        "round_no": round_no,
+    }
     
+    # 2. รับไฟล์ทีละก้อนพร้อมคำนวณแฮช: ไฟล์สั้นเก็บในหน่วยความจำ ไฟล์ยาวเขียนลง uploads/audio/ ระหว่างรับ
+    # ไฟล์ต้นฉบับเก็บใน artifact_store ตั้งชื่อตามแฮชของเนื้อไฟล์ ไฟล์ที่ส่งซ้ำจึงใช้ไฟล์เดียวกันบนดิสก์
     try:
-        # 3. บันทึกไฟล์เสียงต้นฉบับ (13 วินาที) ลงใน uploads/audio/ แบบถาวร
-        with open(save_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # 4. ส่ง Path ของไฟล์ที่บันทึกแล้วไปให้ ML Service วิเคราะห์
-        analysis_result = analyze_audio_session(save_path)
-        
-        final_status = "n/a" # ค่าเริ่มต้นสำหรับโหมด Test
+        with metrics.span("upload"):
+            content, audio_hash, save_path = await receive_upload(file)
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=413,
+            detail=f"ไฟล์มีขนาดใหญ่เกิน {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+        )
+    ext = upload_extension(file.filename)
+    stored_name = os.path.basename(save_path)
+    audio_url = artifact_store.blob_url(audio_hash, ext)
 
-        if mode == "competition":
-            if round_no < 4:
-                final_status = "pending" # รอให้ครบ 4 ยก
-            elif round_no == 4 and session_id:
-                # คำนวณคะแนนรวมจากยกที่ 1-3 ที่อยู่ใน session_id เดียวกัน
-                previous_rounds = await db.results.find({
-                    "session_id": session_id,
-                    "round_no": {"$lt": 4}
-                }).to_list(length=4)
+    # บันทึกไฟล์เสียงต้นฉบับแบบถาวรเบื้องหลัง ไปพร้อมกับการวิเคราะห์
+    persist_task = persist_upload(audio_hash, ext, content) if content is not None else None
+    
+    try:
+        # 3. ไฟล์เดิม + โมเดลเดิม + กติกาเดิม เคยวิเคราะห์แล้ว: ใช้ผลเดิมเลย แต่ยังบันทึกเป็นยกใหม่ตามปกติ
+        with metrics.span("db_cache_lookup"):
+            analysis_result = await get_cached_analysis(audio_hash)
+        if analysis_result is not None:
+            if persist_task:
+                with metrics.span("persist"):
+                    await persist_task
+            with metrics.span("db_record_round"):
+                result_doc = await record_round(
+                    round_info, str(current_user["_id"]), audio_url, analysis_result, audio_hash=audio_hash
+                )
+            return build_round_response(result_doc, stored_name, analysis_result)
 
-                prev_score = sum(r["total_score"] for r in previous_rounds)
-                current_total = prev_score + analysis_result["total_score"]
+        # ถ้าคิววิเคราะห์เต็มแล้ว ปฏิเสธทันที (งานแบบ async รอคิวใน db.jobs ได้)
+        if not async_job and scoring_executor.is_full():
+            raise ScoringBusyError()
 
-                # กติกาจำลอง: ถ้าคะแนนรวม 4 ยก >= 8 คะแนน ถือว่าผ่าน (ปรับเปลี่ยนได้ตามต้องการ)
-                final_status = "pass" if current_total >= 8 else "fail"
-            
-        result_doc = {
-            "user_id": str(current_user["_id"]),
-            "match_name": match_name,
-            "mode": mode,
-            "session_id": session_id,
-            "cage_number": cage_number,
-            "round_no": round_no,
-            "total_score": analysis_result["total_score"],
-            "audio_path": f"/uploads/audio/{unique_filename}",
-            "details": analysis_result["events"], # ข้อมูลละเอียดแต่ละท่อนร้อง
-            "final_status": final_status,
-            "created_at": datetime.now(bangkok_tz)
-        }
+        if async_job:
+            # ไฟล์ต้องอยู่บนดิสก์ก่อน เพราะงานที่ค้างหลังรีสตาร์ทจะอ่านจากไฟล์
+            if persist_task:
+                with metrics.span("persist"):
+                    await persist_task
+            # บันทึกงานลง MongoDB ก่อน (กันงานหายตอนรีสตาร์ท) แล้วค่อยรันเบื้องหลัง
+            with metrics.span("db_create_job"):
+                job_id = await create_job(round_info, current_user, save_path, stored_name, audio_url, audio_hash)
+            schedule_job(job_id)
+            return {
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/jobs/{job_id}",
+                "events_url": f"/api/jobs/{job_id}/events",
+            }
+        
+        # 4. ส่งไฟล์ไปให้ ML Service วิเคราะห์ใน Process Pool (ไม่บล็อก Request อื่น)
+        # ไฟล์สั้นส่งเนื้อไฟล์ไปถอดรหัสจากหน่วยความจำเลย ไม่ต้องรอเขียนแล้วอ่านกลับจากดิสก์
+        analysis_result = await scoring_executor.score(save_path, audio_bytes=content)
+        with metrics.span("db_store_analysis"):
+            await store_analysis(audio_hash, analysis_result)
+        if persist_task:
+            with metrics.span("persist"):
+                await persist_task
 
-        new_result = await db.results.insert_one(result_doc)
+        with metrics.span("db_record_round"):
+            result_doc = await record_round(
+                round_info, str(current_user["_id"]), audio_url, analysis_result, audio_hash=audio_hash
+            )
 
         # 5. ส่งผลลัพธ์กลับ พร้อม URL ของไฟล์ต้นฉบับ
         # เพื่อให้นำไปบันทึกลง MongoDB ในฟิลด์ audio_file_path ได้ทันที
-        return {
-            "id": str(new_result.inserted_id),
-            "status": "success",
-            "final_status": final_status,
-            "filename": unique_filename,
-            "audio_full_url": f"/uploads/audio/{unique_filename}", 
-            "summary": {
-                "total_score": analysis_result["total_score"],
-                "total_events": analysis_result["total_events"]
-            },
-            "events": analysis_result["events"]
-        } 
+        return build_round_response(result_doc, stored_name, analysis_result)
 
+    except ScoringBusyError:
+        raise scoring_busy_exception()
+    except ScoringDisabledError:
+        raise HTTPException(status_code=503, detail="เซิร์ฟเวอร์นี้ไม่รองรับการวิเคราะห์เสียง")
     except Exception as e:
         # กรณีเกิด Error ระหว่างประมวลผล
-        raise HTTPException(status_code=500, detail=f"เกิดข้อผิดพลาดในการประมวลผล: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"เกิดข้อผิดพลาดในการประมวลผล: {str(e)}")
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from backend.services import artifact_store, metrics, scoring_worker
+from backend.services.artifact_cache import event_artifact_key, get_cached
+from backend.services.scoring_executor import scoring_executor, ScoringBusyError, SCORING_RETRY_AFTER
+from backend.services.segment_audio import SegmentAudio, UnsupportedAudioError, RangeNotSatisfiableError
+
+router = APIRouter()
+
+MEDIA_TYPES = {
+    "spec.png": "image/png",
+    "plot.png": "image/png",
+    "seg.wav": "audio/wav",
+}
+
+def _cache_headers(audio_name: str, start_frame: int, end_frame: int) -> dict:
+    # ไฟล์ต้นฉบับตั้งชื่อตามแฮช เนื้อหาของช่วงเดิมไม่มีวันเปลี่ยน ให้เบราว์เซอร์แคชได้นาน
+    immutable = artifact_store.BLOB_NAME.match(audio_name) is not None
+    return {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{audio_name}-{start_frame}-{end_frame}"',
+        "Cache-Control": "public, max-age=31536000, immutable" if immutable else "public, max-age=86400",
+    }
+
+@router.get("/{audio_name}/{start_frame}/{end_frame}/seg.wav")
+async def segment_audio(audio_name: str, start_frame: int, end_frame: int, request: Request):
+    """เสียงท่อนสั้นของ Event: ส่งช่วง sample ของไฟล์ WAV ต้นฉบับตรงๆ (ไม่เขียนไฟล์เสียงแยกต่อ Event)
+    รองรับ HTTP Range และ If-None-Match ไฟล์ที่ตัดเป็นช่วง byte ไม่ได้ (เช่น mp3) ถอดรหัสแล้วแคชแบบเดิม"""
+    path = artifact_store.resolve(audio_name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="ไม่พบไฟล์เสียงต้นฉบับของยกนี้")
+    try:
+        segment = SegmentAudio(path, start_frame, end_frame)
+    except UnsupportedAudioError:
+        return await render_artifact(audio_name, start_frame, end_frame, "seg.wav")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = _cache_headers(audio_name, start_frame, end_frame)
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = segment.byte_range(request.headers.get("range"))
+    except RangeNotSatisfiableError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{segment.size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(segment.size)
+        return StreamingResponse(segment.iter_bytes(), media_type="audio/wav", headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{segment.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(segment.iter_bytes(start, end), status_code=206, media_type="audio/wav", headers=headers)
+
+@router.get("/{audio_name}/{start_frame}/{end_frame}/{kind}")
+async def render_artifact(audio_name: str, start_frame: int, end_frame: int, kind: str):
+    """ส่งไฟล์ประกอบของ Event จากแคช หรือสร้างครั้งแรก: ภาพ Spectrogram, กราฟนับพยางค์, เสียงท่อนสั้น
+    การสร้างไฟล์ (ถอดรหัสเสียง + คำนวณ Spectrogram) รันใน Scoring Pool ไม่โหลด librosa ใน Process ของ API"""
+    if kind not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="ไม่พบไฟล์ประกอบชนิดนี้")
+
+    try:
+        path = get_cached(event_artifact_key(audio_name, start_frame, end_frame, kind))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if path is None:
+        if not scoring_executor.enabled:
+            raise HTTPException(status_code=503, detail="เซิร์ฟเวอร์นี้ไม่รองรับการสร้างไฟล์ประกอบ กรุณาเปิดผ่านเซิร์ฟเวอร์วิเคราะห์")
+        try:
+            with metrics.span(f"artifact_{kind.split('.')[0]}"):
+                path = await scoring_executor.run(scoring_worker.render_artifact, audio_name, start_frame, end_frame, kind)
+        except ScoringBusyError:
+            raise HTTPException(
+                status_code=503,
+                detail="ระบบกำลังวิเคราะห์เสียงเต็มคิว กรุณาลองใหม่อีกครั้ง",
+                headers={"Retry-After": str(SCORING_RETRY_AFTER)},
+            )
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="ไม่พบไฟล์เสียงต้นฉบับของยกนี้")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    headers = _cache_headers(audio_name, start_frame, end_frame)
+    headers.pop("ETag") # FileResponse สร้าง ETag จากไฟล์แคชเอง
+    return FileResponse(path, media_type=MEDIA_TYPES[kind], headers=headers)
@@ -0,0 +1,174 @@
+"""
+ให้คะแนนไฟล์เสียงย้อนหลังทั้งโฟลเดอร์แบบขนาน (ไม่ผ่าน HTTP) เช่น ตรวจผลใหม่เมื่อมีข้อโต้แย้งกติกา หรือเปลี่ยน Threshold
+
+ใช้ Logic เดียวกับเซิร์ฟเวอร์ (analyze_audio_session) ผ่าน Process Pool ที่ทุก Process โหลดโมเดลครั้งเดียวตอนเริ่ม
+ผลแต่ละไฟล์เขียนต่อท้ายไฟล์ JSONL ทันทีที่เสร็จ รันซ้ำด้วย output เดิมจะข้ามไฟล์ที่ให้คะแนนสำเร็จไปแล้ว (ทำต่อจากที่ค้าง)
+
+วิธีใช้ (รันจาก Root ของโปรเจกต์):
+    python -m backend.batch_score <โฟลเดอร์ หรือ ไฟล์รายชื่อ .txt> --out results.jsonl [--workers 8] [--parquet results.parquet]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+AUDIO_EXTENSIONS = (".wav", ".mp3")
+REPORT_EVERY = 50  # แสดง Throughput ทุกกี่ไฟล์
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ให้คะแนนไฟล์เสียงย้อนหลังแบบขนาน")
+    parser.add_argument("source", help="โฟลเดอร์ไฟล์เสียง (ค้นหาในโฟลเดอร์ย่อยด้วย) หรือไฟล์รายชื่อ path บรรทัดละไฟล์")
+    parser.add_argument("--out", required=True, help="ไฟล์ผลลัพธ์ JSONL (มีอยู่แล้วจะทำต่อจากที่ค้าง)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="จำนวน Process (แต่ละ Process โหลดโมเดล 1 ชุด)")
+    parser.add_argument("--model", default=None, help="path ของโมเดล .keras (ค่าเริ่มต้นตาม MODEL_PATH)")
+    parser.add_argument("--parquet", default=None, help="แปลงผลทั้งหมดเป็น Parquet เมื่อเสร็จ (ต้องมี pandas + pyarrow)")
+    parser.add_argument("--retry-errors", action="store_true", help="ให้คะแนนไฟล์ที่เคยผิดพลาดใหม่ด้วย")
+    return parser.parse_args()
+
+def list_sources(source: str) -> list:
+    """รายชื่อไฟล์เสียงจากโฟลเดอร์ (เรียงตามชื่อ ผลจึงออกมาลำดับเดิมทุกครั้ง) หรือจากไฟล์รายชื่อ"""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(AUDIO_EXTENSIONS))
+        return sorted(paths)
+    with open(source, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def read_records(out_path: str) -> dict:
+    """ผลล่าสุดของแต่ละ path ในไฟล์ output (บรรทัดหลังใช้แทนบรรทัดก่อน เช่นผลใหม่จาก --retry-errors)
+    บรรทัดที่อ่านไม่ได้ (บรรทัดสุดท้ายที่เขียนไม่ครบตอนถูกขัดจังหวะ) จะถูกข้าม"""
+    records = {}
+    if not os.path.exists(out_path):
+        return records
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["path"]] = record
+    return records
+
+def load_done(out_path: str, retry_errors: bool) -> set:
+    """path ที่มีผลอยู่แล้วในไฟล์ output (--retry-errors: ไม่นับไฟล์ที่ผลล่าสุดผิดพลาด)"""
+    return {path for path, record in read_records(out_path).items() if "error" not in record or not retry_errors}
+
+def repair_output(out_path: str):
+    """ตัดบรรทัดสุดท้ายที่เขียนไม่ครบออกก่อนเขียนต่อท้าย ไม่อย่างนั้นผลแรกของรอบใหม่จะต่อกันเป็นบรรทัดเสียและหายไป"""
+    if not os.path.exists(out_path):
+        return
+    with open(out_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+def score_file(path: str) -> dict:
+    """รันใน Process ลูก: ให้คะแนนไฟล์ 1 ยก (ผิดพลาดคืน error แทน ไม่ให้ไฟล์เดียวทำให้ทั้งชุดหยุด)"""
+    from backend.services import scoring_worker
+    from backend.services.scoring_config import SCORING_PARAMS_HASH
+
+    start = time.perf_counter()
+    record = {"path": path}
+    try:
+        with open(path, "rb") as f:
+            audio_bytes = f.read()
+        record["audio_hash"] = hashlib.sha256(audio_bytes).hexdigest()
+        result = scoring_worker.score_audio(path, audio_bytes=audio_bytes)
+        result.pop("profile", None)
+        record.update(result, params_hash=SCORING_PARAMS_HASH)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    return record
+
+def write_parquet(jsonl_path: str, parquet_path: str):
+    """แปลงผล JSONL เป็น Parquet (1 แถวต่อไฟล์ ใช้ผลล่าสุดของไฟล์นั้น รายละเอียด events เก็บเป็นข้อความ JSON)"""
+    try:
+        import pandas as pd
+    except ImportError:
+        print("❌ แปลงเป็น Parquet ไม่ได้: ไม่พบ pandas")
+        return
+
+    records = list(read_records(jsonl_path).values())
+    for record in records:
+        record["events"] = json.dumps(record.get("events", []), ensure_ascii=False)
+    try:
+        pd.DataFrame.from_records(records).to_parquet(parquet_path, index=False)
+    except ImportError as e:
+        print(f"❌ แปลงเป็น Parquet ไม่ได้: {e}")
+        return
+    print(f"💾 บันทึก Parquet ที่ {parquet_path} ({len(records)} แถว)")
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, os.getcwd())
+
+    # แต่ละ Process ใช้ 1 Thread (ขนานกันที่ระดับ Process) ความเร็วจึงเพิ่มตามจำนวนคอร์ ไม่แย่ง CPU กันเอง
+    # ต้องตั้งก่อนสร้าง Pool เพราะ Process ลูก (spawn) รับค่า environment ตอนเริ่ม
+    for var in ("TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS", "OMP_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+
+    from backend.services import scoring_worker
+
+    paths = list_sources(args.source)
+    done = load_done(args.out, args.retry_errors)
+    todo = [path for path in paths if path not in done]
+    print(f"🎧 พบไฟล์เสียง {len(paths)} ไฟล์ ให้คะแนนแล้ว {len(paths) - len(todo)} ไฟล์ เหลือ {len(todo)} ไฟล์ ({args.workers} Process)")
+    if not todo:
+        if args.parquet:
+            write_parquet(args.out, args.parquet)
+        return
+
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=scoring_worker.init_worker,
+        initargs=(None, args.model),
+    )
+    # ไม่เริ่มจับเวลาจนกว่าทุก Process จะโหลดโมเดลเสร็จ Throughput จึงวัดเฉพาะการให้คะแนน
+    for future in [pool.submit(scoring_worker.worker_info) for _ in range(args.workers)]:
+        future.result()
+
+    scored = failed = reported = 0
+    start = time.perf_counter()
+    pending = set()
+    queue = iter(todo)
+    repair_output(args.out)
+    with pool, open(args.out, "a", encoding="utf-8") as out:
+        while True:
+            # ส่งงานเข้าคิวไม่เกิน 2 เท่าของจำนวน Process (ไม่โหลดไฟล์ทั้งหมดค้างไว้ในคิว)
+            for path in queue:
+                pending.add(pool.submit(score_file, path))
+                if len(pending) >= args.workers * 2:
+                    break
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if "error" in record:
+                    failed += 1
+                    print(f"❌ {record['path']}: {record['error']}")
+                else:
+                    scored += 1
+            out.flush()
+
+            if scored + failed - reported >= REPORT_EVERY:
+                reported = scored + failed
+                elapsed = time.perf_counter() - start
+                print(f"⏳ {scored + failed}/{len(todo)} ไฟล์ ({(scored + failed) / elapsed:.2f} ไฟล์/วินาที)")
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ ให้คะแนนเสร็จ {scored} ไฟล์ ผิดพลาด {failed} ไฟล์ ใช้เวลา {elapsed:.1f} วินาที ({(scored + failed) / elapsed:.2f} ไฟล์/วินาที)")
+    if args.parquet:
+        write_parquet(args.out, args.parquet)
+
+if __name__ == "__main__":
+    main()
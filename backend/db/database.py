@@ -31,10 +31,29 @@ async def close_mongo_connection():
         print("✅ ปิดการเชื่อมต่อ MongoDB เรียบร้อย")
     
 async def create_indexes():
+    """สร้าง Index ที่ใช้บ่อย (เรียกตอนเริ่มเซิร์ฟเวอร์ ถ้ามีอยู่แล้ว MongoDB จะข้ามไปเอง)"""
     db = get_database()
-    # สร้าง Index ให้ session_id (1 หมายถึงเรียงลำดับจากน้อยไปมาก)
-    await db.results.create_index("session_id")
-    print("✅ Index for 'session_id' created successfully.")
+    # ดึงยกของเซสชันเรียงตามยก (1 หมายถึงเรียงลำดับจากน้อยไปมาก) ใช้แทน Index session_id เดี่ยวได้ด้วย
+    await db.results.create_index([("session_id", 1), ("round_no", 1)])
+    # ประวัติของผู้ใช้แต่ละคน เรียงจากใหม่ไปเก่า (_id ต่อท้ายสำหรับแบ่งหน้าแบบ Keyset)
+    await db.results.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    # ประวัติทั้งหมด (Admin) และการค้นหาชื่อรายการแข่งแบบขึ้นต้นด้วย
+    await db.results.create_index([("created_at", -1), ("_id", -1)])
+    await db.results.create_index([("match_name_norm", 1), ("created_at", -1)])
+    # งานวิเคราะห์ 1 งานบันทึกผลได้ครั้งเดียว (หลาย worker รันงานเดียวกันพร้อมกัน ตัวที่สองจะได้ DuplicateKeyError)
+    # Index เดิมที่ไม่ได้กำหนด unique ต้องลบก่อน ไม่อย่างนั้นสร้างใหม่ด้วยคีย์เดิมไม่ได้
+    existing = await db.results.index_information()
+    if "job_id_1" in existing and not existing["job_id_1"].get("unique"):
+        await db.results.drop_index("job_id_1")
+    await db.results.create_index("job_id", unique=True, sparse=True)
+    # ไฟล์ต้นฉบับในที่เก็บไฟล์ที่ยังมีผล/งานอ้างถึง (ใช้ตอนเก็บกวาดไฟล์)
+    await db.results.create_index("audio_hash", sparse=True)
+    await db.jobs.create_index("audio_hash", sparse=True)
+    # คีย์ของแคชผลวิเคราะห์ (แฮชไฟล์ + เวอร์ชันโมเดล + ค่าตั้งการให้คะแนน) ต้องไม่ซ้ำกัน
+    await db.analysis_cache.create_index(
+        [("audio_hash", 1), ("model_version", 1), ("params_hash", 1)], unique=True
+    )
+    print("✅ สร้าง Index ของฐานข้อมูลเรียบร้อย")
     
 def get_database():
     """เรียกใช้ฟังก์ชันนี้ใน API เพื่อเข้าถึงฐานข้อมูล"""
@@ -1,17 +1,36 @@
 import os
+import asyncio
 from contextlib import asynccontextmanager 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from backend.db.database import connect_to_mongo, close_mongo_connection
-from backend.api.routes import predict, auth, history, admin
+from backend.db.database import connect_to_mongo, close_mongo_connection, create_indexes
+from backend.services.scoring_executor import scoring_executor
+from backend.services.job_service import sweep_jobs_loop
+from backend.services.round_service import backfill_sessions, backfill_match_names
+from backend.services.artifact_store import gc_loop
+from backend.services.metrics import timing_middleware
+from backend.api.routes import predict, auth, history, admin, render, jobs, health, live, media, metrics
 
-# ตั้งค่า Lifespan ให้เปิด-ปิด DB อัตโนมัติ
+# ตั้งค่า Lifespan ให้เปิด-ปิด DB และ Scoring Pool อัตโนมัติ
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    await create_indexes()
+    await backfill_sessions() # สร้าง db.sessions จากประวัติเดิม (ครั้งแรกครั้งเดียว)
+    await backfill_match_names()
+    sweep_task = None
+    if scoring_executor.enabled: # SCORING_WORKERS=0 คือรันเป็น API อย่างเดียว ไม่โหลดโมเดล/TensorFlow เลย
+        scoring_executor.start()
+        scoring_executor.warm_up_in_background() # โหลดโมเดลเบื้องหลัง ไม่ต้องรอให้เสร็จก่อนเปิดรับ Request
+        sweep_task = asyncio.create_task(sweep_jobs_loop()) # รันงานที่ค้าง (ตอนเริ่ม และงานที่ lease หมดอายุภายหลัง)
+    gc_task = asyncio.create_task(gc_loop()) # เก็บกวาดไฟล์ที่ไม่มีผลอ้างถึง + คุมโควตาพื้นที่
     yield
+    gc_task.cancel()
+    if sweep_task is not None:
+        sweep_task.cancel()
+    scoring_executor.shutdown()
     await close_mongo_connection()
 
 app = FastAPI(title="Bulbul Contests API", version="1.0.0", lifespan=lifespan)
@@ -27,8 +46,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # อนุญาตทุก Method (GET, POST, PUT, DELETE)
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# จับเวลาทุก Request (ตัวชี้วัดที่ /metrics และ Header Server-Timing เมื่อตั้ง SERVER_TIMING=1)
+app.middleware("http")(timing_middleware)
+
+# ไฟล์เสียงต้นฉบับอยู่ในที่เก็บแบบ Content-addressed (ต้องลงทะเบียนก่อน mount ด้านล่าง เพื่อให้ URL เดิมหาไฟล์เจอ)
+app.include_router(media.router, prefix="/uploads", tags=["Media"])
+
 # เปิดให้ Frontend เข้าถึงรูปภาพได้
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
@@ -37,6 +63,11 @@ app.include_router(predict.router, prefix="/api", tags=["Prediction"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(history.router, prefix="/api/history", tags=["History"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(live.router, prefix="/api", tags=["Live"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(render.router, prefix="/api/render", tags=["Render"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 @app.get("/")
 def read_root():
@@ -5,6 +5,8 @@ from typing import List, Optional, Any
 # ข้อมูลย่อย: รายละเอียดของเสียงแต่ละท่อนที่ AI ตัดมา
 class EventDetail(BaseModel):
     event_no: int
+    start_sec: Optional[float] = None
+    end_sec: Optional[float] = None
     duration_sec: float
     prediction: str
     confidence: float
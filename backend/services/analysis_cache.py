@@ -0,0 +1,52 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from backend.db.database import get_database
+from backend.services.scoring_config import SCORING_PARAMS, SCORING_PARAMS_HASH
+from backend.services.scoring_executor import scoring_executor
+from backend.services import metrics
+
+# --- แคชผลวิเคราะห์ตามเนื้อไฟล์เสียง (db.analysis_cache) ---
+# คีย์ = (แฮชของไฟล์, เวอร์ชันโมเดล, แฮชของค่าตั้งการให้คะแนน) ไฟล์เดิม + โมเดลเดิม + กติกาเดิม ได้ผลเดิมเสมอ
+# ใช้ตอบกรรมการที่ส่งไฟล์เดิมซ้ำ (เน็ตหลุดแล้วส่งใหม่, กดส่งสองครั้ง) โดยไม่ต้องวิเคราะห์ใหม่
+
+def current_model_version():
+    """เวอร์ชันโมเดลที่ Scoring Pool ใช้อยู่ (None ถ้ายังอุ่นเครื่องไม่เสร็จ ซึ่งจะไม่ใช้แคช)"""
+    if scoring_executor.model_info is None:
+        return None
+    return scoring_executor.model_info.get("model_version")
+
+async def get_cached_analysis(audio_hash: str):
+    """คืนผลวิเคราะห์ที่เคยเก็บไว้ของไฟล์นี้ (รูปแบบเดียวกับ analyze_audio_session) ไม่มีคืน None"""
+    model_version = current_model_version()
+    if not audio_hash or model_version is None:
+        return None
+
+    db = get_database()
+    cached = await db.analysis_cache.find_one_and_update(
+        {"audio_hash": audio_hash, "model_version": model_version, "params_hash": SCORING_PARAMS_HASH},
+        {"$inc": {"hits": 1}, "$set": {"last_hit_at": datetime.now(ZoneInfo("Asia/Bangkok"))}},
+        projection={"analysis": 1},
+    )
+    if cached is None:
+        return None
+    metrics.rounds_total.inc(source="cache")
+    print(f"⚡ ใช้ผลวิเคราะห์จากแคช (ไฟล์ {audio_hash[:12]}, โมเดล {model_version})")
+    return cached["analysis"]
+
+async def store_analysis(audio_hash: str, analysis_result: dict):
+    """เก็บผลวิเคราะห์ลงแคช (ใช้เวอร์ชันโมเดลที่ Process ลูกรายงานมาว่าใช้จริง)"""
+    model_version = analysis_result.get("model_version")
+    if not audio_hash or model_version is None:
+        return
+
+    db = get_database()
+    analysis = {key: analysis_result[key] for key in ("total_score", "total_events", "events")}
+    await db.analysis_cache.update_one(
+        {"audio_hash": audio_hash, "model_version": model_version, "params_hash": SCORING_PARAMS_HASH},
+        {
+            "$set": {"analysis": analysis, "params": SCORING_PARAMS},
+            "$setOnInsert": {"hits": 0, "created_at": datetime.now(ZoneInfo("Asia/Bangkok"))},
+        },
+        upsert=True,
+    )
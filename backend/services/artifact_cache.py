@@ -0,0 +1,96 @@
+import os
+import hashlib
+import threading
+
+# --- แคชไฟล์ภาพ/เสียงประกอบที่สร้างตามคำขอ (Lazy Render) ---
+CACHE_DIR = os.path.join("uploads", "cache")
+CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+_lock = threading.Lock()
+_total_bytes = None  # ขนาดรวมของแคช (คำนวณครั้งแรกตอนใช้งาน แล้วอัปเดตต่อเนื่อง)
+
+def cache_path(key: str) -> str:
+    """คืน path ของไฟล์ในแคช (key ต้องเป็นชื่อไฟล์ล้วน ไม่มีโฟลเดอร์)
+    แยกเก็บเป็นโฟลเดอร์ย่อยตามแฮชของ key (256 โฟลเดอร์) ไม่ให้โฟลเดอร์เดียวมีไฟล์มากเกินไป"""
+    if os.path.basename(key) != key:
+        raise ValueError(f"ชื่อไฟล์แคชไม่ถูกต้อง: {key}")
+    shard = hashlib.sha1(key.encode()).hexdigest()[:2]
+    return os.path.join(CACHE_DIR, shard, key)
+
+def event_artifact_key(audio_name: str, start_frame: int, end_frame: int, kind: str) -> str:
+    """คีย์แคชของไฟล์ประกอบ Event (ไฟล์ต้นฉบับ + ช่วง sample + ชนิด) ใช้ร่วมกันระหว่าง API และ Process ที่สร้างไฟล์
+    ใช้ชื่อไฟล์เต็มรวมนามสกุล (x.wav กับ x.mp3 ในโฟลเดอร์เดียวกันเป็นคนละเสียง ต้องไม่ใช้แคชร่วมกัน)"""
+    return f"{audio_name}_{start_frame}-{end_frame}_{kind}"
+
+def get_cached(key: str):
+    """คืน path ถ้ามีไฟล์อยู่ในแคชแล้ว (และอัปเดตเวลาใช้งานล่าสุดสำหรับ LRU) ไม่มีคืน None"""
+    path = cache_path(key)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+def put_cached(key: str, writer) -> str:
+    """สร้างไฟล์ลงแคชด้วยฟังก์ชัน writer(path) แล้วไล่ลบไฟล์เก่าถ้าแคชเกินขนาดที่กำหนด"""
+    global _total_bytes
+    path = cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    writer(tmp_path)
+    # เขียนไฟล์ชั่วคราวก่อนแล้วค่อยย้าย เพื่อไม่ให้ผู้ใช้คนอื่นอ่านเจอไฟล์ที่เขียนไม่เสร็จ
+    os.replace(tmp_path, path)
+
+    with _lock:
+        if _total_bytes is None:
+            _total_bytes = _scan_size()
+        else:
+            _total_bytes += os.path.getsize(path)
+        if _total_bytes > CACHE_MAX_BYTES:
+            _evict(CACHE_MAX_BYTES, keep=path)
+    return path
+
+def _entries():
+    """ไฟล์ทั้งหมดในแคช (ทุกโฟลเดอร์ย่อย ไม่รวมไฟล์ที่กำลังเขียน)"""
+    for shard in os.scandir(CACHE_DIR):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                yield entry
+
+def _scan_size() -> int:
+    return sum(entry.stat().st_size for entry in _entries())
+
+def total_bytes() -> int:
+    global _total_bytes
+    with _lock:
+        if _total_bytes is None:
+            _total_bytes = _scan_size()
+        return _total_bytes
+
+def trim(max_bytes: int) -> int:
+    """ลดขนาดแคชให้เหลือไม่เกิน max_bytes (ใช้ตอนที่เก็บไฟล์รวมเกินโควตา) คืนจำนวน bytes ที่ลบไป"""
+    with _lock:
+        before = _scan_size()
+        _evict(min(max_bytes, CACHE_MAX_BYTES))
+        return before - _total_bytes
+
+def _evict(max_bytes: int, keep: str = None):
+    """ลบไฟล์ที่ไม่ได้ใช้นานที่สุด (LRU ตามเวลาแก้ไขล่าสุด) จนขนาดรวมเหลือไม่เกิน max_bytes"""
+    global _total_bytes
+    entries = sorted(_entries(), key=lambda entry: entry.stat().st_mtime)
+    _total_bytes = sum(entry.stat().st_size for entry in entries)
+    for entry in entries:
+        if _total_bytes <= max_bytes:
+            break
+        if entry.path == keep:
+            continue
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            _total_bytes -= size
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,168 @@
+"""
+ที่เก็บไฟล์เสียงต้นฉบับแบบ Content-addressed (ชื่อไฟล์ = SHA-256 ของเนื้อไฟล์)
+
+เก็บแยกโฟลเดอร์ย่อย 2 ชั้นตามแฮช (uploads/store/ab/cd/abcd....wav) แต่ละโฟลเดอร์จึงมีไฟล์ไม่มาก
+URL เดิม /uploads/audio/<ชื่อไฟล์> ยังใช้ได้ผ่าน resolve() (ไฟล์เก่าที่อยู่ใน uploads/audio ก็ยังเปิดได้)
+ไฟล์ที่ไม่มีผลใน db.results อ้างถึง (audio_hash) และเก่ากว่าระยะผ่อนผัน จะถูกลบโดย collect_garbage
+"""
+import os
+import re
+import time
+import uuid
+import asyncio
+
+from backend.db.database import get_database
+from backend.services import artifact_cache
+
+# --- ตั้งค่าที่เก็บไฟล์ ---
+STORE_DIR = os.path.join("uploads", "store")
+LEGACY_AUDIO_DIR = os.path.join("uploads", "audio")   # ไฟล์ที่อัปโหลดก่อนมีที่เก็บนี้ (เปิดได้อย่างเดียว ไม่ถูกลบ)
+TMP_DIR = os.path.join(STORE_DIR, "tmp")
+STORE_QUOTA_BYTES = int(os.getenv("STORE_QUOTA_MB", "10240")) * 1024 * 1024   # พื้นที่สูงสุดของไฟล์ต้นฉบับ + แคชภาพ
+GC_GRACE_SECONDS = float(os.getenv("STORE_GC_GRACE_HOURS", "24")) * 3600      # ไฟล์ที่ใหม่กว่านี้ไม่ลบ (อาจยังบันทึกผลไม่เสร็จ)
+GC_INTERVAL_SECONDS = float(os.getenv("STORE_GC_INTERVAL_MIN", "60")) * 60
+
+BLOB_NAME = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]{1,5})?$")
+
+os.makedirs(TMP_DIR, exist_ok=True)
+
+_store_total = None  # ขนาดรวมของไฟล์ต้นฉบับ (คำนวณตอนเก็บกวาด แล้วบวกเพิ่มเมื่อมีไฟล์ใหม่)
+
+def blob_name(digest: str, ext: str) -> str:
+    return f"{digest}{ext.lower()}"
+
+def blob_path(digest: str, ext: str) -> str:
+    """path ของไฟล์ในที่เก็บ: uploads/store/<2 ตัวแรก>/<2 ตัวถัดไป>/<แฮช><นามสกุล>"""
+    return os.path.join(STORE_DIR, digest[:2], digest[2:4], blob_name(digest, ext))
+
+def blob_url(digest: str, ext: str) -> str:
+    """URL สาธารณะของไฟล์ (รูปแบบเดิม /uploads/audio/...)"""
+    return f"/uploads/audio/{blob_name(digest, ext)}"
+
+def temp_path() -> str:
+    """ไฟล์ชั่วคราวสำหรับเขียนระหว่างรับไฟล์ (ยังไม่รู้แฮช)"""
+    return os.path.join(TMP_DIR, f"{uuid.uuid4().hex}.part")
+
+def _touch(path: str) -> bool:
+    try:
+        os.utime(path) # ใช้เวลาแก้ไขล่าสุดเป็นเวลาใช้งานล่าสุด (กัน GC ลบไฟล์ที่เพิ่งถูกอัปโหลดซ้ำ)
+        return True
+    except FileNotFoundError:
+        return False
+
+def adopt_file(tmp_path: str, digest: str, ext: str) -> str:
+    """ย้ายไฟล์ชั่วคราวเข้าที่เก็บ ถ้ามีไฟล์เนื้อหาเดียวกันอยู่แล้วใช้ไฟล์เดิมร่วมกัน คืน path ในที่เก็บ"""
+    global _store_total
+    path = blob_path(digest, ext)
+    if _touch(path):
+        os.remove(tmp_path)
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+    if _store_total is not None:
+        _store_total += os.path.getsize(path)
+    return path
+
+def put_bytes(digest: str, ext: str, data: bytes) -> str:
+    """เขียนเนื้อไฟล์ลงที่เก็บ (ไม่เขียนซ้ำถ้ามีอยู่แล้ว) คืน path ในที่เก็บ"""
+    path = blob_path(digest, ext)
+    if _touch(path):
+        return path
+    tmp_path = temp_path()
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    return adopt_file(tmp_path, digest, ext)
+
+def resolve(name: str) -> str:
+    """หา path จริงจากชื่อไฟล์ใน URL (/uploads/audio/<name>) ไม่พบคืน None"""
+    if os.path.basename(name) != name:
+        return None
+    match = BLOB_NAME.match(name)
+    if match:
+        path = blob_path(match.group(1), match.group(2) or "")
+        if os.path.exists(path):
+            return path
+    legacy_path = os.path.join(LEGACY_AUDIO_DIR, name)
+    return legacy_path if os.path.exists(legacy_path) else None
+
+def iter_blobs():
+    """ไฟล์ทั้งหมดในที่เก็บ: (digest, path, ขนาด, เวลาแก้ไขล่าสุด)"""
+    for shard in os.scandir(STORE_DIR):
+        if not shard.is_dir() or shard.path == TMP_DIR:
+            continue
+        for sub in os.scandir(shard.path):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                match = BLOB_NAME.match(entry.name)
+                if match and entry.is_file():
+                    stat = entry.stat()
+                    yield match.group(1), entry.path, stat.st_size, stat.st_mtime
+
+def is_over_quota() -> bool:
+    """ใช้ขนาดที่นับไว้ล่าสุด (ไม่ไล่อ่านทุกไฟล์ทุกครั้งที่อัปโหลด) ยังไม่เคยเก็บกวาดถือว่าไม่เกิน"""
+    if _store_total is None:
+        return False
+    return _store_total + artifact_cache.total_bytes() > STORE_QUOTA_BYTES
+
+async def _is_referenced(db, digest: str) -> bool:
+    """มีผลการวิเคราะห์ หรืองานที่ยังไม่เสร็จ อ้างถึงไฟล์นี้อยู่หรือไม่"""
+    if await db.results.find_one({"audio_hash": digest}, {"_id": 1}) is not None:
+        return True
+    return await db.jobs.find_one({"audio_hash": digest, "status": {"$in": ["queued", "running"]}}, {"_id": 1}) is not None
+
+def _remove_tmp(now: float) -> int:
+    """ลบไฟล์ชั่วคราวที่ค้าง (เช่น เซิร์ฟเวอร์ล่มระหว่างรับไฟล์)"""
+    removed = 0
+    for entry in os.scandir(TMP_DIR):
+        if entry.is_file() and now - entry.stat().st_mtime > GC_GRACE_SECONDS:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+async def collect_garbage() -> dict:
+    """เก็บกวาดที่เก็บไฟล์:
+    1. ลบไฟล์ต้นฉบับที่ไม่มีผล/งานอ้างถึง และไม่ได้ใช้งานนานกว่า GC_GRACE_SECONDS (เก่าสุดก่อน)
+    2. ถ้ายังเกินโควตา ลบแคชภาพ/เสียงประกอบที่ไม่ได้ใช้นานที่สุด (สร้างใหม่ได้เมื่อมีคนเปิดดู)"""
+    global _store_total
+    db = get_database()
+    now = time.time()
+    stats = {"deleted_blobs": 0, "freed_bytes": 0, "deleted_tmp": await asyncio.to_thread(_remove_tmp, now)}
+
+    # ไล่อ่านโฟลเดอร์ใน Thread แยก (ไฟล์จำนวนมาก ห้ามบล็อก Event Loop)
+    blobs = await asyncio.to_thread(lambda: sorted(iter_blobs(), key=lambda blob: blob[3]))
+    total = sum(size for _, _, size, _ in blobs)
+    for digest, path, size, mtime in blobs:
+        if now - mtime <= GC_GRACE_SECONDS:
+            break # เรียงจากเก่าไปใหม่ ที่เหลือใหม่กว่าระยะผ่อนผันทั้งหมด
+        if await _is_referenced(db, digest):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        stats["deleted_blobs"] += 1
+        stats["freed_bytes"] += size
+        total -= size
+
+    _store_total = total
+    cache_budget = max(0, STORE_QUOTA_BYTES - total)
+    stats["freed_bytes"] += await asyncio.to_thread(artifact_cache.trim, cache_budget)
+    stats["store_bytes"] = total
+    stats["cache_bytes"] = artifact_cache.total_bytes()
+    stats["quota_bytes"] = STORE_QUOTA_BYTES
+    stats["over_quota"] = stats["store_bytes"] + stats["cache_bytes"] > STORE_QUOTA_BYTES
+    if stats["over_quota"]:
+        print("⚠️ พื้นที่เก็บไฟล์ยังเกินโควตา (ไฟล์ที่เหลือมีผลการวิเคราะห์อ้างถึงทั้งหมด)")
+    return stats
+
+async def gc_loop():
+    """เก็บกวาดที่เก็บไฟล์เป็นระยะ (เริ่มจาก lifespan ของเซิร์ฟเวอร์)"""
+    while True:
+        try:
+            stats = await collect_garbage()
+            if stats["deleted_blobs"] or stats["deleted_tmp"]:
+                print(f"🧹 เก็บกวาดที่เก็บไฟล์: ลบ {stats['deleted_blobs']} ไฟล์ ({stats['freed_bytes'] // (1024 * 1024)} MB)")
+        except Exception as e:
+            print(f"❌ เก็บกวาดที่เก็บไฟล์ไม่สำเร็จ: {e}")
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
@@ -1,5 +1,10 @@
 import os
+import time
+import asyncio
+import threading
 import bcrypt
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -15,10 +20,83 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("ACCESS_TOKEN_EXPIRE_HOURS", "24"))
 
+# --- แคชข้อมูล User ในหน่วยความจำ (ลดการอ่าน db.users ทุก Request) ---
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))       # วินาทีที่เก็บข้อมูล User ไว้ก่อนอ่านใหม่จากฐานข้อมูล
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))    # จำนวน User สูงสุดในแคช (เกินแล้วลบตัวที่ไม่ได้ใช้นานที่สุด)
+
+# --- bcrypt (ใช้ CPU หนัก ~100-300 ms ต่อครั้ง ห้ามรันบน Event Loop) ---
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "4"))  # จำนวนการแฮช/ตรวจรหัสผ่านที่ทำพร้อมกันได้สูงสุด
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))   # Cost factor ของรหัสผ่านที่แฮชใหม่ (เพิ่ม 1 = ช้าลง 2 เท่า)
+
+# bcrypt ปล่อย GIL ระหว่างคำนวณ Thread Pool จึงใช้หลาย Core ได้จริง และจำกัดจำนวน Thread ไม่ให้แย่ง CPU งานอื่นจนหมด
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+# EventSource ของเบราว์เซอร์ใส่ Header Authorization เองไม่ได้ Endpoint แบบ SSE จึงรับ Token ทาง Query ได้ด้วย
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """ยามเฝ้าประตู: ตรวจสอบความถูกต้องของ Token และคืนค่าข้อมูล User"""
+class UserCache:
+    """แคช TTL + LRU ของข้อมูล User ตาม username พร้อมตัวนับ hit/miss
+    ลบ User ออกจากแคชทันทีเมื่อบัญชีถูกลบ (invalidate) ไม่ต้องรอให้หมดอายุ"""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # username -> (หมดอายุเมื่อ, ข้อมูล User)
+
+    def get(self, username: str):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return dict(entry[1]) # คืนสำเนา กันผู้เรียกแก้ข้อมูลในแคช
+
+    def put(self, username: str, user: dict):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str = None, user_id: str = None):
+        """ลบ User ออกจากแคช ระบุได้ทั้ง username หรือ user_id"""
+        with self._lock:
+            if username is not None:
+                self._entries.pop(username, None)
+            if user_id is not None:
+                for key in [k for k, (_, user) in self._entries.items() if user["_id"] == user_id]:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+user_cache = UserCache()
+
+async def get_user_from_token(token: str):
+    """ตรวจสอบ Token แล้วคืนข้อมูล User (ใช้ได้ทั้งกับ Header ปกติ และ WebSocket ที่ส่ง Token มาในข้อความ)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="ไม่สามารถยืนยันตัวตนได้ หรือ Token หมดอายุ",
@@ -34,7 +112,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-    # 2. ไปเช็กในฐานข้อมูลว่า User นี้ยังมีตัวตนอยู่จริงไหม
+    # 2. เช็กว่า User นี้ยังมีตัวตนอยู่จริงไหม (ดูในแคชก่อน ไม่มีค่อยไปอ่านฐานข้อมูล)
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+
     db = get_database()
     user = await db.users.find_one({"username": username})
 
@@ -44,22 +126,47 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     # 3. ส่งข้อมูล User กลับไป (เพื่อให้ API รู้ว่าใครเป็นคนเรียกใช้)
     # แปลง _id เป็น string เพื่อความสะดวก
     user["_id"] = str(user["_id"])
+    user_cache.put(username, user)
     return user
 
-def hash_password(password: str) -> str:
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """ยามเฝ้าประตู: ตรวจสอบความถูกต้องของ Token และคืนค่าข้อมูล User"""
+    return await get_user_from_token(token)
+
+async def get_current_user_or_query(header_token: str = Depends(optional_oauth2_scheme), token: str = None):
+    """แบบเดียวกับ get_current_user แต่รับ Token จาก ?token=... ได้ด้วย (สำหรับ EventSource)"""
+    return await get_user_from_token(header_token or token or "")
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
     """เข้ารหัสผ่านก่อนเก็บลงฐานข้อมูล"""
     pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed_password = bcrypt.hashpw(pwd_bytes, salt)
 
     return hashed_password.decode('utf-8')
 
-def verify_password(plain_password, hashed_password) -> str:
+def verify_password(plain_password, hashed_password) -> bool:
     """ตรวจสอบรหัสผ่านตอน Login"""
     pwd_bytes = plain_password.encode('utf-8')
     hashed_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(pwd_bytes, hashed_bytes)
 
+def needs_rehash(hashed_password: str) -> bool:
+    """รหัสผ่านนี้แฮชด้วย Cost factor ที่ต่ำกว่า BCRYPT_ROUNDS ปัจจุบันหรือไม่ ("$2b$12$..." -> 12)
+    แฮชใหม่เฉพาะเพื่อเพิ่มความแข็งแรง ลด BCRYPT_ROUNDS (เช่นตอนทดสอบ) จะไม่ลดความแข็งแรงของรหัสผ่านที่เก็บไว้"""
+    try:
+        return int(hashed_password.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+async def hash_password_async(password: str) -> str:
+    """hash_password ใน Thread Pool ของ bcrypt (ไม่บล็อก Event Loop)"""
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, hash_password, password)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    """verify_password ใน Thread Pool ของ bcrypt (ไม่บล็อก Event Loop)"""
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     """สร้าง JWT Token สำหรับยืนยันตัวตน"""
     to_encode = data.copy()
@@ -0,0 +1,80 @@
+from functools import cached_property
+import numpy as np
+import librosa
+
+# --- ค่ามาตรฐานของ Input ที่โมเดล CNN รับ (ต้องตรงกับภาพ Spectrogram ตอนเทรน) ---
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128                # ความสูงภาพ (จำนวนแถบ Mel)
+N_FRAMES = 130              # ความกว้างภาพ (จำนวนเฟรมของเสียง 3 วินาที)
+FMAX = 8000                 # ความถี่สูงสุดที่ใช้ตอนทำนายผล
+GRAY_LEVELS = 256           # จำนวนระดับสีของ colormap 'gray' ใน matplotlib
+
+def fit_length(y, target_length, center=False):
+    """ตัดหรือเติมความเงียบให้เสียงยาวเท่า target_length
+    center=False: เติมท้าย/ตัดท้าย (แบบตอนทำนายผล), center=True: เติม/ตัดสองฝั่งเท่ากัน (แบบตอนเทรน)"""
+    if len(y) > target_length:
+        start = (len(y) - target_length) // 2 if center else 0
+        return y[start:start + target_length]
+
+    pad_length = target_length - len(y)
+    if center:
+        return np.pad(y, (pad_length // 2, pad_length - pad_length // 2), mode='constant')
+    return np.pad(y, (0, pad_length), mode='constant')
+
+def mel_db(y, sr, fmax=FMAX):
+    """คำนวณ Mel-spectrogram หน่วย dB (อ้างอิงค่าสูงสุดของท่อนเสียง) ขนาด N_MELS x เฟรม"""
+    S = librosa.feature.melspectrogram(y=y, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS, fmax=fmax)
+    return librosa.power_to_db(S, ref=np.max)
+
+def db_to_pixels(S_dB):
+    """แปลง dB Mel-spectrogram เป็นภาพขาวดำ uint8 แบบเดียวกับที่ specshow(cmap='gray') วาดลง PNG
+    - ปรับสเกลสีตามค่าต่ำสุด/สูงสุดของภาพ (vmin/vmax อัตโนมัติของ matplotlib)
+    - แบ่งเป็น 256 ระดับสีแบบปัดเศษทิ้ง เหมือน lookup table ของ colormap
+    - กลับหัวภาพ เพราะ specshow วาดความถี่ต่ำไว้ด้านล่าง"""
+    vmin, vmax = float(np.min(S_dB)), float(np.max(S_dB))
+    if vmax > vmin:
+        norm = (S_dB - vmin) / (vmax - vmin)
+    else:
+        norm = np.zeros_like(S_dB)
+    levels = np.clip((norm * GRAY_LEVELS).astype(np.int32), 0, GRAY_LEVELS - 1)
+    return np.flipud(levels).astype(np.uint8)
+
+def pixels_to_tensor(pixels):
+    """แปลงภาพ uint8 เป็น Input ของโมเดล (สูง x กว้าง x 1) สเกล 0-1 เหมือน img_to_array / 255"""
+    return (pixels.astype(np.float32) / 255.0)[..., np.newaxis]
+
+def mel_tensor(y_segment, sr, duration=3.0):
+    """สร้าง Input ขนาด 128x130x1 ให้ AI โดยตรงจาก NumPy (ไม่ต้องวาด/เซฟ/อ่านไฟล์ PNG)
+    ผลลัพธ์ตรงกับเส้นทางเดิม (วาด PNG ด้วย specshow -> load_img -> img_to_array / 255)"""
+    y_segment = fit_length(y_segment, int(sr * duration))
+    return pixels_to_tensor(db_to_pixels(mel_db(y_segment, sr)))
+
+def chunk_rms(y_chunk):
+    """RMS envelope ของท่อนเสียง (Normalize ท่อนให้สูงสุด 1.0 ก่อน) ใช้นับพยางค์และวาดกราฟพยางค์"""
+    if np.max(np.abs(y_chunk)) > 0:
+        y_chunk = librosa.util.normalize(y_chunk)
+    return librosa.feature.rms(y=y_chunk, frame_length=N_FFT, hop_length=HOP_LENGTH)[0]
+
+class EventFeatures:
+    """Mel-spectrogram และ RMS envelope ของท่อนเสียง 1 Event คำนวณครั้งเดียว (เมื่อใช้ครั้งแรก) แล้วใช้ร่วมกัน
+    - mel_db: ใช้ทั้ง Input ของ AI (tensor) และภาพ spec.png ภาพที่กรรมการเห็นจึงมาจาก array เดียวกับที่ AI ใช้
+    - rms: ใช้ทั้งการนับพยางค์และกราฟ plot.png
+    ค่าที่ได้ตรงกับ mel_tensor / chunk_rms ที่คำนวณแยกทุกบิต (ตรวจด้วย ml_pipeline/scripts/check_mel_tensor.py)"""
+
+    def __init__(self, y_chunk, sr, duration=3.0):
+        self.y = y_chunk
+        self.sr = sr
+        self.duration = duration
+
+    @cached_property
+    def mel_db(self):
+        return mel_db(fit_length(self.y, int(self.sr * self.duration)), self.sr)
+
+    @cached_property
+    def tensor(self):
+        return pixels_to_tensor(db_to_pixels(self.mel_db))
+
+    @cached_property
+    def rms(self):
+        return chunk_rms(self.y)
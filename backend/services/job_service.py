@@ -0,0 +1,203 @@
+import os
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from backend.db.database import get_database
+from backend.services.scoring_executor import scoring_executor, ScoringBusyError, SCORING_RETRY_AFTER
+from backend.services.round_service import record_round, build_round_response
+from backend.services.analysis_cache import get_cached_analysis, store_analysis
+
+# งานที่กำลังรันถูกจองด้วยสัญญาเช่า (lease) ที่ต่ออายุเรื่อยๆ ถ้า Process เจ้าของตาย lease หมดอายุแล้ว Process อื่นรับงานต่อได้
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+# ตัวระบุ Process นี้ (หลาย uvicorn worker ใช้ db.jobs ร่วมกัน)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_running_tasks = set()  # เก็บ reference ของ Task ไว้ ไม่ให้ถูก Garbage Collect ระหว่างทำงาน
+
+def _now():
+    return datetime.now(ZoneInfo("Asia/Bangkok"))
+
+def _to_object_id(job_id: str):
+    try:
+        return ObjectId(job_id)
+    except (InvalidId, TypeError):
+        return None
+
+async def create_job(round_info: dict, user: dict, save_path: str, filename: str, audio_url: str, audio_hash: str = None) -> str:
+    """บันทึกงานวิเคราะห์ใหม่ลง db.jobs (สถานะ queued) แล้วคืน job_id"""
+    db = get_database()
+    now = _now()
+    job_doc = {
+        "user_id": str(user["_id"]),
+        "username": user["username"],
+        "round": round_info,
+        "save_path": save_path,
+        "filename": filename,
+        "audio_url": audio_url,
+        "audio_hash": audio_hash,
+        "status": "queued",
+        "stage": "queued",
+        "stages": [{"stage": "queued", "at": now}],
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    new_job = await db.jobs.insert_one(job_doc)
+    return str(new_job.inserted_id)
+
+async def get_job(job_id: str):
+    oid = _to_object_id(job_id)
+    if oid is None:
+        return None
+    db = get_database()
+    return await db.jobs.find_one({"_id": oid})
+
+async def _set_stage(oid, stage: str):
+    db = get_database()
+    now = _now()
+    await db.jobs.update_one(
+        {"_id": oid},
+        {"$set": {"stage": stage, "updated_at": now}, "$push": {"stages": {"stage": stage, "at": now}}}
+    )
+
+def _claimable(now) -> dict:
+    """เงื่อนไขของงานที่ Process นี้รับไปรันได้: ยังรอคิว หรือกำลังรันแต่เจ้าของหยุดต่อ lease แล้ว"""
+    return {"$or": [
+        {"status": "queued"},
+        {"status": "running", "lease_until": {"$lt": now}},
+        {"status": "running", "lease_until": {"$exists": False}},  # งานที่ค้างมาจากก่อนมี lease
+    ]}
+
+async def claim_job(oid):
+    """จองงานให้ Process นี้แบบ atomic คืนเอกสารงาน หรือ None ถ้างานจบแล้ว/มี Process อื่นรันอยู่"""
+    db = get_database()
+    now = _now()
+    return await db.jobs.find_one_and_update(
+        {"_id": oid, **_claimable(now)},
+        {"$set": {
+            "status": "running", "owner": WORKER_ID,
+            "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS), "updated_at": now,
+        }},
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def _renew_lease(oid):
+    """ต่ออายุ lease ระหว่างที่งานยังรันอยู่ (รวมตอนรอคิว Scoring Pool)"""
+    db = get_database()
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        await db.jobs.update_one(
+            {"_id": oid, "owner": WORKER_ID},
+            {"$set": {"lease_until": _now() + timedelta(seconds=JOB_LEASE_SECONDS)}}
+        )
+
+def _recorded(result_doc: dict):
+    """ผลที่บันทึกลง db.results ไปแล้ว -> (result_doc, analysis_result) สำหรับสร้าง Response"""
+    result_doc["_id"] = str(result_doc["_id"])
+    analysis_result = {
+        "total_score": result_doc["total_score"],
+        "total_events": len(result_doc["details"]),
+        "events": result_doc["details"],
+    }
+    return result_doc, analysis_result
+
+async def run_job(job_id: str):
+    """รันงานวิเคราะห์ 1 งานจนจบ: จองงาน -> ส่งเข้า Scoring Pool -> บันทึกผลลง db.results -> ปิดงาน"""
+    db = get_database()
+    oid = ObjectId(job_id)
+    job = await claim_job(oid)
+    if job is None:
+        return
+    lease_task = asyncio.create_task(_renew_lease(oid))
+    owned = {"_id": oid, "owner": WORKER_ID}
+
+    try:
+        # ถ้ารีสตาร์ทหลังบันทึกผลไปแล้วแต่ยังไม่ได้ปิดงาน ให้ใช้ผลเดิม ไม่บันทึกซ้ำ
+        result_doc = await db.results.find_one({"job_id": job_id})
+        if result_doc is None:
+            # ไฟล์เดียวกันเคยวิเคราะห์แล้ว (โมเดลและกติกาเดิม) ไม่ต้องเข้าคิววิเคราะห์ใหม่
+            analysis_result = await get_cached_analysis(job.get("audio_hash"))
+            while analysis_result is None:
+                try:
+                    analysis_result = await scoring_executor.score(
+                        job["save_path"], progress=lambda stage: _set_stage(oid, stage)
+                    )
+                    await store_analysis(job.get("audio_hash"), analysis_result)
+                except ScoringBusyError:
+                    # คิวเต็ม งานยังอยู่ใน db.jobs รอแล้วลองใหม่
+                    await asyncio.sleep(SCORING_RETRY_AFTER)
+
+            try:
+                result_doc = await record_round(
+                    job["round"], job["user_id"], job["audio_url"], analysis_result,
+                    job_id=job_id, audio_hash=job.get("audio_hash")
+                )
+            except DuplicateKeyError:
+                # Process อื่นบันทึกผลของงานนี้ไปก่อนแล้ว (results.job_id ห้ามซ้ำ) ใช้ผลนั้นแทน
+                result_doc, analysis_result = _recorded(await db.results.find_one({"job_id": job_id}))
+        else:
+            result_doc, analysis_result = _recorded(result_doc)
+
+        response = build_round_response(result_doc, job["filename"], analysis_result)
+        await db.jobs.update_one(
+            owned,
+            {"$set": {"status": "done", "stage": "scored", "result": response, "updated_at": _now()}}
+        )
+        print(f"✅ งานวิเคราะห์ {job_id} เสร็จสิ้น")
+    except Exception as e:
+        await db.jobs.update_one(
+            owned,
+            {"$set": {"status": "failed", "error": f"เกิดข้อผิดพลาดในการประมวลผล: {str(e)}", "updated_at": _now()}}
+        )
+        print(f"❌ งานวิเคราะห์ {job_id} ล้มเหลว: {e}")
+    finally:
+        lease_task.cancel()
+
+def schedule_job(job_id: str):
+    """สั่งรันงานเบื้องหลังบน Event Loop ปัจจุบัน"""
+    task = asyncio.create_task(run_job(job_id))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+
+async def resume_pending_jobs() -> int:
+    """รันงานที่ค้างอยู่ต่อ เพื่อไม่ให้ยกที่ส่งมาก่อนรีสตาร์ทหายไป
+    รับเฉพาะงานที่ยังรอคิว หรือ lease หมดอายุ (ไม่แย่งงานที่ worker อื่นของเซิร์ฟเวอร์กำลังรันอยู่)
+    งานเดียวกันถูกหลาย worker จองพร้อมกันได้ Process เดียว (claim_job)"""
+    db = get_database()
+    pending_jobs = await db.jobs.find(_claimable(_now()), {"_id": 1}).to_list(None)
+    for job in pending_jobs:
+        schedule_job(str(job["_id"]))
+    return len(pending_jobs)
+
+async def sweep_jobs_loop():
+    """ตรวจหางานที่ค้างทุก JOB_LEASE_SECONDS/2 วินาที (เริ่มจาก lifespan ของเซิร์ฟเวอร์)
+    งานของ Process ที่ตายไปโดยที่ lease ยังไม่หมดอายุตอนรีสตาร์ท จะถูกรับไปรันต่อทันทีที่ lease หมด"""
+    while True:
+        try:
+            resumed = await resume_pending_jobs()
+            if resumed:
+                print(f"⏳ กลับมารันงานวิเคราะห์ที่ค้างอยู่ {resumed} งาน")
+        except Exception as e:
+            print(f"⚠️ ตรวจงานวิเคราะห์ที่ค้างไม่สำเร็จ: {e}")
+        await asyncio.sleep(JOB_LEASE_SECONDS / 2)
+
+def job_to_response(job: dict) -> dict:
+    """แปลงเอกสารงานเป็น Response (ไม่ส่ง path ภายในเซิร์ฟเวอร์กลับไป)"""
+    return {
+        "job_id": str(job["_id"]),
+        "status": job["status"],
+        "stage": job["stage"],
+        "stages": job["stages"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
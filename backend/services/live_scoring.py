@@ -0,0 +1,146 @@
+"""
+ตัดท่อนเสียงแบบ Real-time ระหว่างที่กรรมการกำลังอัดเสียง (ใช้กับ WebSocket /api/live)
+
+ใช้ตรรกะเดียวกับ analyze_audio_session (Noise Gate -30 dB, TOP_DB, MERGE_GAP, MIN_DURATION, PADDING_TIME)
+แต่คำนวณทีละเฟรมเมื่อเสียงมาถึง ค่าอ้างอิงความดังสูงสุดจึงเป็น "ค่าสูงสุดเท่าที่ได้ยินมาแล้ว" แทนค่าสูงสุดของทั้งไฟล์
+ผลระหว่างอัดจึงเป็นผลเบื้องต้นเท่านั้น ผลที่บันทึกจริงตอนจบยกวิเคราะห์ไฟล์ทั้งยกใหม่ด้วย analyze_audio_session
+ใช้แค่ NumPy (ไม่ต้อง import librosa ใน Process ของ API)
+"""
+import io
+import wave
+import numpy as np
+
+from backend.services.scoring_config import NOISE_FLOOR_DB, TOP_DB, MIN_DURATION, MERGE_GAP, PADDING_TIME
+
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+PCM_FORMATS = {"f32": "<f4", "s16": "<i2"}
+
+class RecordingTooLongError(Exception):
+    """เสียงที่ส่งมายาวเกิน max_samples ของยก"""
+
+class StreamingSegmenter:
+    """รับเสียง PCM ทีละก้อน แล้วคืนท่อนเสียง (Event) ทันทีที่ท่อนนั้นจบแน่นอนแล้ว
+    (เงียบต่อเนื่องนานเกิน MERGE_GAP จนไม่มีทางถูกรวมกับเสียงถัดไปได้อีก)
+    max_samples: จำนวน sample สูงสุดของทั้งยก (None = ไม่จำกัด) เกินแล้ว feed จะโยน RecordingTooLongError"""
+
+    def __init__(self, sr: int, max_samples: int = None):
+        self.sr = sr
+        self.max_samples = max_samples
+        self._buffer = np.zeros(min(sr * 16, max_samples or sr * 16), dtype=np.float32)
+        self.n_samples = 0
+        # Hann window แบบ periodic เหมือน librosa.stft
+        self._window = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(FRAME_LENGTH) / FRAME_LENGTH)
+        self._next_frame = 0       # เฟรม t อยู่กึ่งกลางที่ sample t * HOP_LENGTH (center=True แบบ librosa)
+        self._ref_magnitude = 0.0  # ค่า |STFT| สูงสุดเท่าที่เคยเห็น (อ้างอิงของ Noise Gate)
+        self._ref_energy = 0.0     # พลังงานต่อเฟรมสูงสุดเท่าที่เคยเห็น (อ้างอิงของ TOP_DB)
+        self._open = None          # [start, end] ของท่อนที่กำลังสะสมอยู่ (หน่วย sample)
+        self.interval_count = 0    # จำนวนท่อนที่ปิดแล้ว (รวมท่อนสั้นที่ถูกข้าม ใช้เป็นเลข event_no)
+
+    @property
+    def samples(self):
+        return self._buffer[:self.n_samples]
+
+    def _append(self, pcm):
+        needed = self.n_samples + len(pcm)
+        if self.max_samples is not None and needed > self.max_samples:
+            raise RecordingTooLongError()
+        if needed > len(self._buffer):
+            capacity = max(needed, len(self._buffer) * 2)
+            if self.max_samples is not None:
+                capacity = min(capacity, self.max_samples)
+            grown = np.zeros(capacity, dtype=np.float32)
+            grown[:self.n_samples] = self._buffer[:self.n_samples]
+            self._buffer = grown
+        self._buffer[self.n_samples:needed] = pcm
+        self.n_samples = needed
+
+    def _frame(self, t: int):
+        """ดึงเฟรม t (เติมศูนย์ส่วนที่เลยขอบเสียง)"""
+        start = t * HOP_LENGTH - FRAME_LENGTH // 2
+        frame = np.zeros(FRAME_LENGTH, dtype=np.float32)
+        src_start, src_end = max(0, start), min(self.n_samples, start + FRAME_LENGTH)
+        if src_end > src_start:
+            frame[src_start - start:src_end - start] = self._buffer[src_start:src_end]
+        return frame
+
+    def _is_voiced(self, frame) -> bool:
+        magnitude = np.abs(np.fft.rfft(frame * self._window))
+        self._ref_magnitude = max(self._ref_magnitude, float(magnitude.max()))
+        if self._ref_magnitude <= 0:
+            return False
+
+        # Noise Gate: bin ที่เบากว่า NOISE_FLOOR_DB ถูกกดลงเหลือ -100 dB
+        floor = self._ref_magnitude * 10 ** (NOISE_FLOOR_DB / 20)
+        gated = np.where(magnitude < floor, self._ref_magnitude * 1e-5, magnitude)
+        energy = float(np.sum(gated ** 2))
+        self._ref_energy = max(self._ref_energy, energy)
+        return 10 * np.log10(energy / self._ref_energy + 1e-20) > -TOP_DB
+
+    def _close_open(self, events):
+        start, end = self._open
+        self._open = None
+        self.interval_count += 1
+        if (end - start) / self.sr >= MIN_DURATION:
+            events.append({"event_no": self.interval_count, "start": start, "end": end})
+
+    def _process_frames(self, final: bool):
+        events = []
+        while True:
+            t = self._next_frame
+            center = t * HOP_LENGTH
+            # เฟรม t ต้องมีเสียงครบถึง sample center + FRAME/2 ก่อนถึงจะคำนวณได้ (ยกเว้นตอนจบยก)
+            if not (center + FRAME_LENGTH // 2 <= self.n_samples or (final and center <= self.n_samples)):
+                break
+            self._next_frame += 1
+            frame_start, frame_end = t * HOP_LENGTH, (t + 1) * HOP_LENGTH
+
+            if self._open is not None and (frame_start - self._open[1]) / self.sr >= MERGE_GAP:
+                # เงียบนานพอแล้ว ท่อนที่ค้างอยู่ไม่มีทางถูกรวมกับเสียงถัดไป ปิดท่อนได้เลย
+                self._close_open(events)
+
+            if self._is_voiced(self._frame(t)):
+                if self._open is None:
+                    self._open = [frame_start, min(frame_end, self.n_samples)]
+                else:
+                    self._open[1] = min(frame_end, self.n_samples)
+
+        if final and self._open is not None:
+            self._close_open(events)
+        return events
+
+    def feed(self, pcm) -> list:
+        """เพิ่มเสียงก้อนใหม่ คืนรายการท่อนเสียงที่ปิดแล้ว [{"event_no", "start", "end"}, ...]"""
+        self._append(np.asarray(pcm, dtype=np.float32))
+        return self._process_frames(final=False)
+
+    def finish(self) -> list:
+        """จบยก: ประมวลผลเฟรมที่เหลือและปิดท่อนสุดท้าย"""
+        return self._process_frames(final=True)
+
+    def chunk(self, start: int, end: int):
+        """ท่อนเสียงของ Event พร้อมเผื่อขอบหน้า-หลัง (PADDING_TIME) แบบเดียวกับ event_chunk"""
+        pad = int(PADDING_TIME * self.sr)
+        return self.samples[max(0, start - pad):min(self.n_samples, end + pad)].copy()
+
+def decode_pcm(data: bytes, pcm_format: str):
+    """แปลง bytes ของ PCM (mono, little-endian) เป็น float32 ช่วง -1..1
+    โยน ValueError ถ้าความยาวไม่ลงตัวกับขนาด sample (เช่น s16 ที่ส่งมาเป็นจำนวน byte คี่)"""
+    dtype = np.dtype(PCM_FORMATS[pcm_format])
+    if len(data) % dtype.itemsize:
+        raise ValueError(f"ข้อมูลเสียง {len(data)} byte ไม่ลงตัวกับ sample ขนาด {dtype.itemsize} byte")
+    pcm = np.frombuffer(data, dtype=PCM_FORMATS[pcm_format])
+    if pcm_format == "s16":
+        return pcm.astype(np.float32) / 32768.0
+    return pcm.astype(np.float32)
+
+def encode_wav(samples, sr: int) -> bytes:
+    """เข้ารหัสเสียงทั้งยกเป็นไฟล์ WAV 16-bit mono (ใช้ wave ของ Python ไม่ต้องพึ่ง soundfile)"""
+    pcm16 = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sr)
+        wav.writeframes(pcm16.tobytes())
+    return buffer.getvalue()
@@ -0,0 +1,188 @@
+"""
+ตัวชี้วัดของเซิร์ฟเวอร์ (Counter / Gauge / Histogram) ส่งออกในรูปแบบข้อความของ Prometheus ที่ GET /metrics
+
+- span(stage): จับเวลาขั้นตอนใน Process หลัก (อ่าน/เขียน MongoDB, รับไฟล์, รอ Scoring Pool)
+- StageTimer: จับเวลาแต่ละขั้นตอนของ analyze_audio_session ใน Process ลูก แล้วส่งกลับมากับผลวิเคราะห์
+- ถ้าตั้ง SERVER_TIMING=1 จะแนบเวลาของแต่ละขั้นตอนใน Header Server-Timing ของ Response ด้วย
+
+ใช้แค่ไลบรารีมาตรฐาน ค่าทั้งหมดอยู่ในหน่วยความจำของ Process (รีสตาร์ทแล้วเริ่มนับใหม่ ตามปกติของ Prometheus)
+"""
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+# เวลาของแต่ละขั้นตอนใน Request ปัจจุบัน [(stage, วินาที), ...] (None เมื่อไม่ได้อยู่ใน Request)
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(labelnames, values) -> str:
+    if not labelnames:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)) + "}"
+
+class Counter:
+    """ค่าที่เพิ่มขึ้นอย่างเดียว แยกตาม label"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_label_text(self.labelnames, key)} {value}"
+
+class Gauge:
+    """ค่าปัจจุบัน อ่านจากฟังก์ชันตอนถูกดึงค่า (เช่น จำนวนงานในคิว)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read):
+        self.name, self.help, self.read = name, help_text, read
+
+    def samples(self):
+        yield f"{self.name} {self.read()}"
+
+class Histogram:
+    """การกระจายของค่า (เวลา, จำนวนท่อนต่อยก) แบบ bucket สะสม แยกตาม label"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [นับต่อ bucket..., นับทั้งหมด, ผลรวม]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        names = self.labelnames + ("le",)
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                yield f"{self.name}_bucket{_label_text(names, key + (f'{bound:g}',))} {count}"
+            yield f"{self.name}_bucket{_label_text(names, key + ('+Inf',))} {state[-2]}"
+            yield f"{self.name}_count{_label_text(self.labelnames, key)} {state[-2]}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, key)} {state[-1]}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_request_seconds = registry.register(Histogram(
+    "bulbul_http_request_seconds", "เวลาตอบ Request แยกตาม route", ("method", "route", "status")))
+stage_seconds = registry.register(Histogram(
+    "bulbul_stage_seconds", "เวลาของแต่ละขั้นตอน (วิเคราะห์เสียง, MongoDB, รับไฟล์)", ("stage",)))
+rounds_total = registry.register(Counter(
+    "bulbul_rounds_total", "จำนวนยกที่วิเคราะห์เสร็จ แยกตามที่มาของผล (scored = วิเคราะห์ใหม่, cache = ใช้ผลเดิม)", ("source",)))
+events_per_round = registry.register(Histogram(
+    "bulbul_events_per_round", "จำนวนท่อนเสียงที่ตัดได้ต่อยก", buckets=COUNT_BUCKETS))
+model_batch_size = registry.register(Histogram(
+    "bulbul_model_batch_size", "ขนาด batch ที่ส่งเข้าโมเดลแต่ละครั้ง", buckets=COUNT_BUCKETS))
+
+def _add_request_timing(stage: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+@contextmanager
+def span(stage: str):
+    """จับเวลาขั้นตอนใน Process หลัก: บันทึกลง Histogram และ Server-Timing ของ Request ปัจจุบัน"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        _add_request_timing(stage, elapsed)
+
+class StageTimer:
+    """จับเวลาทีละขั้นตอนต่อเนื่องกัน (ใช้ใน Process ลูก) lap(stage) = เวลาตั้งแต่ lap ครั้งก่อนถึงตอนนี้"""
+
+    def __init__(self):
+        self.timings = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+        self._last = now
+
+def observe_analysis(profile: dict):
+    """บันทึกข้อมูลที่ Process ลูกส่งกลับมากับผลวิเคราะห์ (เวลาแต่ละขั้นตอน, จำนวนท่อน, ขนาด batch)"""
+    if not profile:
+        return
+    for stage, seconds in profile.get("timings", {}).items():
+        stage_seconds.observe(seconds, stage=stage)
+        _add_request_timing(stage, seconds)
+    events_per_round.observe(profile.get("events", 0))
+    for size in profile.get("batch_sizes", []):
+        model_batch_size.observe(size)
+
+def server_timing_header(timings: list, total: float) -> str:
+    """Header Server-Timing เช่น "decode;dur=12.3, inference;dur=40.1, total;dur=80.0" (หน่วยมิลลิวินาที)"""
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+async def timing_middleware(request, call_next):
+    """Middleware: จับเวลาทุก Request แยกตาม route และแนบ Server-Timing (ถ้าเปิด SERVER_TIMING)"""
+    timings = []
+    token = _request_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _request_timings.reset(token)
+    elapsed = time.perf_counter() - start
+
+    # ใช้ path แบบแม่แบบของ route (เช่น /api/jobs/{job_id}) ไม่ให้ label แตกตาม id
+    route = request.scope.get("route")
+    http_request_seconds.observe(
+        elapsed, method=request.method, route=getattr(route, "path", "unmatched"), status=str(response.status_code)
+    )
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
@@ -1,43 +1,23 @@
+import io
 import os
-import time
 import numpy as np
-import librosa.display
-import matplotlib.pyplot as plt
+import librosa
 from scipy.signal import find_peaks
 import soundfile as sf
 
-import tensorflow as tf
-from tensorflow.keras.preprocessing.image import load_img, img_to_array
-
-# --- การตั้งค่ามาตรฐาน (ต้องตรงกับตอนเตรียมข้อมูลเทรนโมเดล) ---
-SR = 22050                  # Sample Rate
-AI_INPUT_DURATION = 3.0     # ความยาวเสียงที่โมเดล AI รองรับ (วินาที)
-CONFIDENCE_THRESHOLD = 0.6  # ค่าความมั่นใจขั้นต่ำที่ยอมรับว่าเป็นเสียงนกร้อง
-TOP_DB = 25                 # ระดับความดังที่ใช้ตัดเสียง (ยิ่งน้อยยิ่งไวต่อเสียงเบา)
-MIN_DURATION = 0.4          # ท่อนเสียงต้องยาวอย่างน้อย 0.5 วินาทีถึงจะนำมาคิด
-MERGE_GAP = 0.25            # ถ้าเสียงห่างกันไม่เกิน 0.5 วิ ให้รวมเป็นท่อนเดียวกัน
-PADDING_TIME = 0.15          # เผื่อขอบเสียงหน้า-หลังตอนตัด (วินาที)
-MIN_SYLLABLES = 3           # กติกา: ต้องนับได้ 3 พยางค์ขึ้นไปถึงจะได้ 1 ดอก
-
-# ตั้งค่าพาธที่เก็บไฟล์
-UPLOAD_DIR = "uploads"
-IMG_DIR = os.path.join(UPLOAD_DIR, "images")
-AUDIO_DIR = os.path.join(UPLOAD_DIR, "audio")
-
-# ตรวจสอบและสร้างโฟลเดอร์ถ้ายังไม่มี
-os.makedirs(IMG_DIR, exist_ok=True)
-os.makedirs(AUDIO_DIR, exist_ok=True)
-
-# --- โหลดโมเดล AI (CNN) ---
-MODEL_PATH = "ml_pipeline/models/bird_song_model.keras"
-
-print("⏳ กำลังโหลดโมเดล AI...")
-try:
-    model = tf.keras.models.load_model(MODEL_PATH)
-    print("✅ โหลดโมเดลสำเร็จ พร้อมทำงาน!")
-except Exception as e:
-    print(f"❌ โหลดโมเดลไม่สำเร็จ: {e}")
-    model = None
+from backend.services.features import EventFeatures
+from backend.services.artifact_cache import event_artifact_key, get_cached, put_cached
+from backend.services import artifact_store
+from backend.services.renderer import spectrogram_png, syllable_plot_png
+from backend.services.model_manager import model_manager
+from backend.services.metrics import StageTimer
+from backend.services.scoring_config import (
+    SR, AI_INPUT_DURATION, CONFIDENCE_THRESHOLD, NOISE_FLOOR_DB, TOP_DB, MIN_DURATION,
+    MERGE_GAP, PADDING_TIME, MIN_SYLLABLES, PREDICT_BATCH_SIZE,
+)
+
+# ไฟล์ประกอบที่สร้างตามคำขอผ่าน /api/render (ภาพ Spectrogram, กราฟนับพยางค์, เสียงท่อนสั้น)
+ARTIFACT_KINDS = ("spec.png", "plot.png", "seg.wav")
 
 def merge_intervals(intervals, sr, gap_threshold):
     """ฟังก์ชันรวมท่อนเสียงที่อยู่ใกล้กันให้เป็นท่อนเดียว (เหมือนตอนเตรียมข้อมูลเทรน)"""
@@ -55,26 +35,14 @@ def merge_intervals(intervals, sr, gap_threshold):
     merged.append((current_start, current_end))
     return merged
 
-def create_padded_spectrogram(y_segment, sr, save_path):
-    """สร้าง Spectrogram ขนาด 128x130 (Grayscale) เพื่อส่งให้ AI ทายผล"""
-    target_length = int(sr * AI_INPUT_DURATION)
-    # ปรับความยาวให้พอดีกับที่ AI ต้องการ (Padding ด้วยความเงียบ)
-    if len(y_segment) > target_length:
-        y_segment = y_segment[:target_length]
-    else:
-        padding = target_length - len(y_segment)
-        y_segment = np.pad(y_segment, (0, padding), mode='constant')
-
-    S = librosa.feature.melspectrogram(y=y_segment, sr=sr, n_mels=128, fmax=8000)
-    S_dB = librosa.power_to_db(S, ref=np.max)
-
-    # เซฟเป็นรูปภาพขาวดำ (Grayscale) ไม่เอาขอบและแกน
-    fig = plt.figure(figsize=(1.30, 1.28), dpi=100)
-    ax = fig.add_axes([0, 0, 1, 1])
-    ax.axis('off')
-    librosa.display.specshow(S_dB, sr=sr, cmap='gray', ax=ax)
-    plt.savefig(save_path, bbox_inches='tight', pad_inches=0, dpi=100)
-    plt.close(fig)
+def _write_bytes(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def save_spectrogram_image(S_dB, sr, save_path):
+    """เซฟ dB Mel-spectrogram เป็นรูปภาพขาวดำ (Grayscale) 130x128 ไม่เอาขอบและแกน
+    (วาดด้วย renderer ไม่ผ่าน pyplot จึงเรียกพร้อมกันหลาย Thread ได้)"""
+    _write_bytes(save_path, spectrogram_png(S_dB))
 
 def reduce_noise(y, sr):
     """ฟังก์ชันลดเสียงรบกวนเบื้องต้น (Simple Noise Gate)"""
@@ -82,128 +50,250 @@ def reduce_noise(y, sr):
     stft = librosa.stft(y)
     stft_db = librosa.amplitude_to_db(np.abs(stft), ref=np.max)
     # ตัดเสียงที่ต่ำกว่า -30dB ออก (Noise Floor)
-    stft_db[stft_db < -30] = -100 
+    stft_db[stft_db < NOISE_FLOOR_DB] = -100 
     y_cleaned = librosa.istft(librosa.db_to_amplitude(stft_db) * np.exp(1j * np.angle(stft)))
     return y_cleaned
 
-def count_syllables_and_plot(y_chunk, sr, save_path):
-    """ฟังก์ชันนับคะแนน (นับพยางค์): คำนวณพลังงานเสียง (RMS) และหาจุดยอดคลื่น (Peaks)"""
-    # 1. Normalization: ปรับความดังให้สูงสุดที่ 1.0 เสมอ
-    if np.max(np.abs(y_chunk)) > 0:
-        y_chunk = librosa.util.normalize(y_chunk)
-
-    hop_length = 512
-    # 2. คำนวณ RMS Energy
-    rms = librosa.feature.rms(y=y_chunk, frame_length=2048, hop_length=hop_length)[0]
+def syllable_peaks(rms, sr, hop_length=512):
+    """หาจุดยอดคลื่น (Peaks) ของแต่ละพยางค์จาก RMS envelope ที่คำนวณไว้แล้ว"""
+    if len(rms) == 0:
+        return rms, np.array([], dtype=int)
     rms_norm = (rms - np.min(rms)) / (np.max(rms) - np.min(rms) + 1e-6)
 
     # 3. Peak Detection (ปรับจูนระยะห่างระหว่างพยางค์)
     # นกปรอดร้องเร็วมาก ระยะห่างขั้นต่ำควรอยู่ที่ประมาณ 0.1 วินาที
     min_dist_frames = int((0.1 * sr) / hop_length)
     peaks, _ = find_peaks(rms_norm, height=0.10, distance=min_dist_frames)
+    return rms_norm, peaks
 
-    # วาดกราฟ RMS เพื่อโชว์บนแอป (ให้กรรมการดูว่านับตรงไหม)
-    plt.figure(figsize=(8, 3))
-    plt.plot(rms_norm, label='Normalized Energy', color='#2563eb')
-    plt.plot(peaks, rms_norm[peaks], "rx", label='Syllable')
-    plt.title(f'Syllable Counting (Total: {len(peaks)})')
-    plt.legend()
-    plt.savefig(save_path)
-    plt.close()
-    
+def plot_syllables(rms_norm, peaks, save_path):
+    """วาดกราฟ RMS เพื่อโชว์บนแอป (ให้กรรมการดูว่านับตรงไหม)"""
+    _write_bytes(save_path, syllable_plot_png(rms_norm, peaks))
+
+def count_syllables(features: EventFeatures) -> int:
+    """ฟังก์ชันนับคะแนน (นับพยางค์) โดยไม่วาดกราฟ จาก RMS envelope ที่ท่อนเสียงคำนวณไว้"""
+    _, peaks = syllable_peaks(features.rms, features.sr)
     return len(peaks)
 
-def analyze_audio_session(audio_path: str) -> dict:
-    """ฟังก์ชันหลัก: รับไฟล์ 13 วินาที -> ตัดท่อน -> AI คัดกรอง -> นับพยางค์ -> สรุปคะแนน"""
+def load_recording(audio_path: str, audio_bytes: bytes = None):
+    """โหลดไฟล์เสียงทั้งยกที่ Sample Rate มาตรฐาน และทำ Normalization ทั้งไฟล์
+    ถ้ามี audio_bytes จะถอดรหัสจากหน่วยความจำ (soundfile + BytesIO) โดยไม่อ่านไฟล์จากดิสก์"""
+    source = io.BytesIO(audio_bytes) if audio_bytes is not None else audio_path
+    y, sr = librosa.load(source, sr=SR)
+    return librosa.util.normalize(y), sr
+
+def event_bounds(n_samples, sr, start_frame, end_frame):
+    """ขอบเขต (sample) ของท่อนเสียง Event โดยเผื่อขอบเสียงหน้า-หลังเล็กน้อย"""
+    pad = int(PADDING_TIME * sr)
+    return max(0, start_frame-pad), min(n_samples, end_frame+pad)
+
+def event_chunk(y, sr, start_frame, end_frame):
+    """ตัดท่อนเสียงของ Event โดยเผื่อขอบเสียงหน้า-หลังเล็กน้อย"""
+    chunk_start, chunk_end = event_bounds(len(y), sr, start_frame, end_frame)
+    return y[chunk_start:chunk_end]
+
+def load_event_chunk(audio_path: str, start_frame: int, end_frame: int):
+    """ถอดรหัสเฉพาะช่วงเสียงของ Event (รวมขอบ PADDING_TIME) ที่ Sample Rate มาตรฐาน ไม่ต้องโหลดทั้งยก
+    ไม่ทำ Normalization ทั้งไฟล์: ภาพ Spectrogram (อ้างอิงค่าสูงสุด) และกราฟพยางค์ (Normalize ในท่อน) ได้ผลเท่าเดิม"""
+    pad = int(PADDING_TIME * SR)
+    chunk_start = max(0, start_frame - pad)
+    y_chunk, sr = librosa.load(audio_path, sr=SR, offset=chunk_start / SR, duration=(end_frame + pad - chunk_start) / SR)
+    return y_chunk, sr
+
+def artifact_url(audio_name: str, start_frame: int, end_frame: int, kind: str) -> str:
+    """URL ของไฟล์ประกอบ Event ที่จะถูกสร้างเมื่อมีการเปิดดูครั้งแรก"""
+    return f"/api/render/{audio_name}/{start_frame}/{end_frame}/{kind}"
+
+def render_event_artifact(audio_name: str, start_frame: int, end_frame: int, kind: str) -> str:
+    """สร้างไฟล์ประกอบ Event จากไฟล์เสียงต้นฉบับ + ช่วงเวลา (ครั้งแรก) แล้วเก็บแคชไว้ใช้ซ้ำ คืน path ของไฟล์
+    ภาพ spec.png และ plot.png สร้างคู่กันจากการถอดรหัสและ EventFeatures ชุดเดียว (หน้าเว็บเปิดดูทั้งสองภาพเสมอ)"""
+    if kind not in ARTIFACT_KINDS:
+        raise ValueError(f"ไม่รู้จักไฟล์ประกอบชนิด {kind}")
+    if os.path.basename(audio_name) != audio_name or not (0 <= start_frame < end_frame):
+        raise ValueError("ข้อมูลช่วงเวลาหรือชื่อไฟล์ไม่ถูกต้อง")
+
+    key = event_artifact_key(audio_name, start_frame, end_frame, kind)
+    cached = get_cached(key)
+    if cached:
+        return cached
+
+    # ไฟล์ต้นฉบับอยู่ในที่เก็บแบบ Content-addressed (หรือ uploads/audio สำหรับไฟล์เก่า)
+    audio_path = artifact_store.resolve(audio_name)
+    if audio_path is None:
+        raise FileNotFoundError(audio_name)
+
+    # ถอดรหัสเฉพาะช่วงของ Event (เปิดดูหลายท่อน/หลายชนิดไม่ต้องถอดรหัสทั้งยกซ้ำทุกครั้ง)
+    y_chunk, sr = load_event_chunk(audio_path, start_frame, end_frame)
+
+    if kind == "seg.wav":
+        # ใช้เฉพาะไฟล์ที่ตัดเป็นช่วง byte ไม่ได้ (เช่น mp3) ไฟล์ WAV ส่งจากไฟล์ต้นฉบับตรงๆ (segment_audio)
+        return put_cached(key, lambda path: sf.write(path, y_chunk, sr, format="WAV"))
+
+    # mel_db เดียวกับที่ใช้สร้าง Input ของ AI ภาพที่กรรมการเห็นจึงตรงกับสิ่งที่ AI ใช้จริง
+    features = EventFeatures(y_chunk, sr, AI_INPUT_DURATION)
+    writers = {
+        "spec.png": lambda path: save_spectrogram_image(features.mel_db, sr, path),
+        "plot.png": lambda path: plot_syllables(*syllable_peaks(features.rms, sr), path),
+    }
+    paths = {}
+    for image_kind, writer in writers.items():
+        # ภาพอีกชนิดอาจอยู่ในแคชแล้ว (ไฟล์ในแคชถูกลบไปบางไฟล์) ไม่ต้องเขียนซ้ำ
+        image_key = event_artifact_key(audio_name, start_frame, end_frame, image_kind)
+        paths[image_kind] = get_cached(image_key) or put_cached(image_key, writer)
+    return paths[kind]
+
+def predict_batch(inputs: np.ndarray, model=None) -> np.ndarray:
+    """ส่งท่อนเสียงทั้งหมดให้ AI ทายผลแบบเป็นชุด (แบ่งชุดละไม่เกิน PREDICT_BATCH_SIZE)"""
+    if model is None:
+        model = model_manager.model
+    if len(inputs) == 0:
+        return np.empty((0, 2), dtype=np.float32)
+
+    outputs = []
+    for i in range(0, len(inputs), PREDICT_BATCH_SIZE):
+        # predict_on_batch ไม่ต้องสร้าง Data Adapter ใหม่ทุกครั้งเหมือน predict จึงเร็วกว่ามากสำหรับชุดเล็กๆ
+        outputs.append(np.asarray(model.predict_on_batch(inputs[i:i + PREDICT_BATCH_SIZE])))
+    return np.concatenate(outputs, axis=0)
+
+def judge_event(probs, count_syllables_fn) -> dict:
+    """ตัดสินคะแนนของท่อนเสียง 1 ท่อน จากผลทายของ AI (นับพยางค์เฉพาะท่อนที่เป็นเสียงนกร้องเท่านั้น)"""
+    class_idx = int(np.argmax(probs))
+    confidence = float(np.max(probs))
+
+    syllables = 0
+    is_counted = False
+
+    # กติกา: ต้องเป็นเสียงนกร้อง (Class 1) และมีความมั่นใจสูง
+    if class_idx == 1 and confidence >= CONFIDENCE_THRESHOLD:
+        # เข้าสู่ฟังก์ชันนับพยางค์
+        syllables = count_syllables_fn()
+
+        # กติกา: ต้องมี 3 พยางค์ขึ้นไปถึงจะได้ 1 ดอก
+        if syllables >= MIN_SYLLABLES:
+            is_counted = True
+
+    return {
+        "prediction": "singing" if class_idx == 1 else "noise",
+        "confidence": round(confidence, 4),
+        "syllables": syllables,
+        "is_counted": is_counted,
+    }
+
+def score_segment(y_chunk, sr) -> dict:
+    """ให้คะแนนท่อนเสียงที่ตัดมาแล้ว 1 ท่อน (ใช้กับการวิเคราะห์แบบ Real-time ที่ท่อนเสียงมาทีละท่อน)"""
+    model = model_manager.model
     if model is None: raise RuntimeError("โมเดล AI ยังไม่ได้ถูกโหลด")
 
+    if sr != SR:
+        y_chunk = librosa.resample(y_chunk, orig_sr=sr, target_sr=SR)
+        sr = SR
+    features = EventFeatures(y_chunk, sr, AI_INPUT_DURATION)
+    probs = predict_batch(features.tensor[np.newaxis], model)[0]
+    return judge_event(probs, lambda: count_syllables(features))
+
+def analyze_audio_session(audio_path: str, progress=None, audio_bytes: bytes = None) -> dict:
+    """ฟังก์ชันหลัก: รับไฟล์ 13 วินาที -> ตัดท่อน -> AI คัดกรอง -> นับพยางค์ -> สรุปคะแนน
+    (ไม่วาดภาพ/เขียนไฟล์ประกอบ ไฟล์เหล่านั้นสร้างภายหลังผ่าน render_event_artifact เมื่อมีคนเปิดดู)
+    progress: ฟังก์ชันรับชื่อขั้นตอน (decoded, segmented, classified, scored) สำหรับรายงานความคืบหน้า
+    audio_bytes: เนื้อไฟล์ที่อยู่ในหน่วยความจำแล้ว (audio_path ยังใช้ตั้งชื่อ URL ของไฟล์ประกอบ)"""
+    # จับโมเดลไว้ตั้งแต่ต้น ถ้ามีการสลับโมเดลระหว่างทาง ยกนี้ยังใช้โมเดลเดียวกันทั้งยก
+    model = model_manager.model
+    if model is None: raise RuntimeError("โมเดล AI ยังไม่ได้ถูกโหลด")
+    report = progress or (lambda stage: None)
+    timer = StageTimer()
+
     # 1. โหลดและทำ Normalization ทั้งไฟล์
-    y, sr = librosa.load(audio_path, sr=SR)
-    y = librosa.util.normalize(y)
+    y, sr = load_recording(audio_path, audio_bytes)
+    timer.lap("decode")
+    report("decoded")
 
     # 2. ลดเสียงรบกวนเบื้องต้น
     y_clean = reduce_noise(y, sr)
+    timer.lap("denoise")
 
     # 3. ตัดแบ่งท่อนเสียง (ใช้ MERGE_GAP ที่เล็กลง)
     raw_intervals = librosa.effects.split(y_clean, top_db=TOP_DB)
 
     # ฟังก์ชัน merge_intervals เดิม (แต่จะใช้ค่า MERGE_GAP 0.25)
     merged_intervals = merge_intervals(raw_intervals, sr, gap_threshold=MERGE_GAP)
-    
-    total_score = 0
-    events_detail = []
-    session_id = int(time.time()) # ใช้ timestamp เพื่อไม่ให้ชื่อไฟล์ซ้ำ
+    timer.lap("split")
+    report("segmented")
 
-    file_prefix = os.path.splitext(os.path.basename(audio_path))[0]
+    audio_name = os.path.basename(audio_path)
 
+    # --- ขั้นตอนที่ 1: รวบรวมท่อนเสียงทั้งหมดและเตรียม Input ให้ AI ---
+    candidates = []
+    inputs = []
     for i, (start_frame, end_frame) in enumerate(merged_intervals):
-        # 1. คำนวณเวลาเริ่มต้นและสิ้นสุดเป็นวินาที
+        # คำนวณเวลาเริ่มต้นและสิ้นสุดเป็นวินาที
         start_sec = start_frame / sr
         end_sec = end_frame / sr
         duration = end_sec - start_sec
 
         if duration < MIN_DURATION: continue
 
-        # 2. สร้างชื่อไฟล์โดยใช้ช่วงเวลา (ใช้ _ แทน . เพื่อความปลอดภัยของชื่อไฟล์)
-        # ตัวอย่าง: bird01_02.50s-04.10s_spec.png
-        time_range = f"{start_sec:.2f}s-{end_sec:.2f}s".replace(".", "_")
-        base_name = f"{file_prefix}_{time_range}"
+        # เผื่อขอบเสียงเล็กน้อย
+        y_chunk = event_chunk(y, sr, start_frame, end_frame)
 
-        spec_path = os.path.join(IMG_DIR, f"{base_name}_spec.png")
-        plot_path = os.path.join(IMG_DIR, f"{base_name}_plot.png")
-        audio_path_seg = os.path.join(AUDIO_DIR, f"{base_name}_seg.wav")
+        # Mel / RMS ของท่อนคำนวณครั้งเดียวใน EventFeatures (Input ของ AI จาก NumPy โดยตรง ไม่ต้องผ่านไฟล์ PNG)
+        features = EventFeatures(y_chunk, sr, AI_INPUT_DURATION)
+        inputs.append(features.tensor)
 
-        # เผื่อขอบเสียงเล็กน้อย
-        pad = int(PADDING_TIME * sr)
-        y_chunk = y[max(0, start_frame-pad) : min(len(y), end_frame+pad)]
-        
-        # --- ขั้นตอนที่ 1: AI คัดกรอง (Classification) ---
-        create_padded_spectrogram(y_chunk, sr, spec_path)
-        img = tf.keras.utils.load_img(spec_path, target_size=(128, 130), color_mode='grayscale')
-        img_array = tf.expand_dims(tf.keras.utils.img_to_array(img) / 255.0, 0)
-        
-        predictions = model.predict(img_array, verbose=0)
-        class_idx = np.argmax(predictions[0])
-        confidence = float(np.max(predictions[0]))
-
-        # --- ขั้นตอนที่ 2: ตัดสินคะแนน (Scoring Logic) ---
-        syllables = 0
-        is_counted = False
-        
-        # กติกา: ต้องเป็นเสียงนกร้อง (Class 1) และมีความมั่นใจสูง
-        if class_idx == 1 and confidence >= CONFIDENCE_THRESHOLD:
-            # เข้าสู่ฟังก์ชันนับพยางค์
-            syllables = count_syllables_and_plot(y_chunk, sr, plot_path)
-            
-            # กติกา: ต้องมี 3 พยางค์ขึ้นไปถึงจะได้ 1 ดอก
-            if syllables >= MIN_SYLLABLES:
-                is_counted = True
-                total_score += 1
-        
-        # เซฟไฟล์เสียงท่อนสั้นไว้ให้กรรมการฟังย้อนหลัง
-        sf.write(audio_path_seg, y_chunk, sr)
-
-        # เก็บข้อมูลลงรายการย่อย
-        events_detail.append({
+        candidates.append({
             "event_no": i + 1,
-            "duration_sec": round(duration, 2),
-            "prediction": "singing" if class_idx == 1 else "noise",
-            "confidence": round(confidence, 4),
-            "syllables": syllables,
-            "is_counted": is_counted,
-            "spectrogram_url": f"/uploads/images/{os.path.basename(spec_path)}",
-            "plotgraph_url": f"/uploads/images/{os.path.basename(plot_path)}",
-            "segment_audio_url": f"/uploads/audio/{os.path.basename(audio_path_seg)}"
+            "start_frame": int(start_frame),
+            "end_frame": int(end_frame),
+            "duration": duration,
+            "features": features,
+        })
+
+    # --- ขั้นตอนที่ 2: AI คัดกรอง (Classification) ทุกท่อนในการเรียกโมเดลครั้งเดียว ---
+    batch = np.stack(inputs) if inputs else np.empty((0, 128, 130, 1), dtype=np.float32)
+    timer.lap("feature")
+    predictions = predict_batch(batch, model)
+    timer.lap("inference")
+    report("classified")
+
+    # --- ขั้นตอนที่ 3: ตัดสินคะแนน (Scoring Logic) ---
+    total_score = 0
+    events_detail = []
+    for candidate, probs in zip(candidates, predictions):
+        verdict = judge_event(probs, lambda: count_syllables(candidate["features"]))
+        if verdict["is_counted"]:
+            total_score += 1
+
+        # เก็บข้อมูลลงรายการย่อย (URL ของไฟล์ประกอบจะสร้างไฟล์จริงเมื่อกรรมการเปิดดูครั้งแรก)
+        start_frame, end_frame = candidate["start_frame"], candidate["end_frame"]
+        events_detail.append({
+            "event_no": candidate["event_no"],
+            "start_sec": round(start_frame / sr, 2),
+            "end_sec": round(end_frame / sr, 2),
+            "duration_sec": round(candidate["duration"], 2),
+            **verdict,
+            "spectrogram_url": artifact_url(audio_name, start_frame, end_frame, "spec.png"),
+            "plotgraph_url": artifact_url(audio_name, start_frame, end_frame, "plot.png"),
+            "segment_audio_url": artifact_url(audio_name, start_frame, end_frame, "seg.wav")
         })
 
-    # 3. สรุปผลลัพธ์ทั้งหมดของยกนี้
+    timer.lap("syllables")
+    report("scored")
+
+    # สรุปผลลัพธ์ทั้งหมดของยกนี้ (profile ใช้บันทึกตัวชี้วัดใน Process หลัก ไม่ถูกเก็บลงฐานข้อมูล)
     return {
         "total_score": total_score,
         "total_events": len(events_detail),
-        "events": events_detail
+        "events": events_detail,
+        "profile": {
+            "timings": timer.timings,
+            "events": len(events_detail),
+            "batch_sizes": [min(PREDICT_BATCH_SIZE, len(batch) - i) for i in range(0, len(batch), PREDICT_BATCH_SIZE)],
+        },
     }
 
 def predict_spectrogram(image_path: str) -> dict:
+    from tensorflow.keras.preprocessing.image import load_img, img_to_array
+
+    model = model_manager.model
     if model is None:
         raise RuntimeError("AI Model is not loaded.")
     
@@ -0,0 +1,66 @@
+import os
+import hashlib
+import threading
+
+# --- ตั้งค่าโมเดล AI (CNN) ---
+MODEL_PATH = os.getenv("MODEL_PATH", "ml_pipeline/models/bird_song_model.keras")
+WARMUP_BATCH_SIZE = int(os.getenv("MODEL_WARMUP_BATCH", "4"))  # ขนาด batch ที่ใช้อุ่นเครื่องโมเดลหลังโหลด
+INPUT_SHAPE = (128, 130, 1)
+
+def model_version(path: str) -> str:
+    """เวอร์ชันของโมเดล = แฮชของไฟล์ .keras (เปลี่ยนไฟล์เมื่อไหร่ เวอร์ชันเปลี่ยนทันที)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+class ModelManager:
+    """ดูแลโมเดลของ Process นี้: โหลด -> อุ่นเครื่อง -> พร้อมใช้งาน และสลับไปไฟล์ใหม่ได้โดยไม่ต้องรีสตาร์ท"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model = None
+        self._path = None
+        self._version = None
+        self.error = None
+
+    @property
+    def model(self):
+        return self._model
+
+    @property
+    def version(self):
+        return self._version
+
+    def load(self, path: str = MODEL_PATH):
+        """โหลดไฟล์โมเดล + อุ่นเครื่องด้วย batch ว่าง แล้วสลับมาใช้ทันที (โมเดลเดิมยังใช้ต่อได้จนกว่าจะสลับ)"""
+        # import ตอนโหลดเท่านั้น Process ที่ไม่ได้ใช้โมเดล (เช่น API หลัก) จะได้ไม่ต้องโหลด TensorFlow
+        import numpy as np
+        import tensorflow as tf
+
+        print(f"⏳ กำลังโหลดโมเดล AI ({path})...")
+        try:
+            version = model_version(path)
+            model = tf.keras.models.load_model(path)
+            # เรียกโมเดลครั้งแรกตรงนี้ เพื่อให้ค่า Graph Tracing ไม่ไปตกอยู่กับคำขอของผู้ใช้
+            model.predict_on_batch(np.zeros((WARMUP_BATCH_SIZE, *INPUT_SHAPE), dtype=np.float32))
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ โหลดโมเดลไม่สำเร็จ: {e}")
+            raise
+
+        with self._lock:
+            self._model, self._path, self._version = model, path, version
+            self.error = None
+        print(f"✅ โหลดโมเดลสำเร็จ พร้อมทำงาน! (เวอร์ชัน {version})")
+
+    def describe(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "model_path": self._path,
+            "model_version": self._version,
+            "error": self.error,
+        }
+
+model_manager = ModelManager()
@@ -0,0 +1,88 @@
+"""
+วาดภาพประกอบ Event (Spectrogram และกราฟนับพยางค์) เป็น PNG bytes ด้วย NumPy + Pillow โดยตรง
+
+ไม่ใช้ pyplot จึงไม่มี state กลางร่วมกัน เรียกพร้อมกันจากหลาย Thread ได้ และไม่มี Figure ค้างในหน่วยความจำ
+ภาพ Spectrogram ให้พิกเซลเดียวกับ specshow(cmap='gray') ใน 02_make_spectrograms.py (ตรวจด้วย check_mel_tensor)
+"""
+import io
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from backend.services.features import N_FRAMES, N_MELS, db_to_pixels
+
+# --- ขนาดและสีของกราฟนับพยางค์ (เท่ากับ figsize=(8, 3), dpi=100 ของกราฟเดิม) ---
+PLOT_WIDTH, PLOT_HEIGHT = 800, 300
+PLOT_MARGIN = (60, 40, 20, 30)      # ซ้าย, บน, ขวา, ล่าง (พิกเซล)
+LINE_COLOR = (37, 99, 235)          # '#2563eb'
+PEAK_COLOR = (220, 38, 38)          # สีแดงของเครื่องหมาย x
+AXIS_COLOR = (0, 0, 0)
+GRID_COLOR = (229, 231, 235)
+
+def encode_png(pixels) -> bytes:
+    """แปลง array uint8 (สูง x กว้าง หรือ สูง x กว้าง x 3) เป็น PNG bytes"""
+    buffer = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(pixels)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def spectrogram_png(S_dB) -> bytes:
+    """dB Mel-spectrogram -> ภาพขาวดำ 130x128 (กว้าง x สูง) แบบเดียวกับภาพที่ใช้เทรนโมเดล"""
+    pixels = db_to_pixels(S_dB)
+    if pixels.shape != (N_MELS, N_FRAMES):
+        # ท่อนเสียงที่ยาวไม่เท่า 130 เฟรม ถูกยืดเต็มภาพเหมือนที่ specshow ยืดลงแกนขนาดคงที่
+        pixels = np.asarray(Image.fromarray(pixels).resize((N_FRAMES, N_MELS), Image.NEAREST))
+    return encode_png(pixels)
+
+def _to_xy(values, box):
+    """แปลงค่า RMS (0-1) ของแต่ละเฟรมเป็นพิกัดพิกเซลในกรอบกราฟ"""
+    left, top, right, bottom = box
+    n = max(len(values) - 1, 1)
+    xs = left + np.arange(len(values)) * (right - left) / n
+    ys = bottom - np.clip(values, 0.0, 1.0) * (bottom - top)
+    return xs, ys
+
+def _draw_text(draw, xy, text, font, align="left"):
+    """วางข้อความให้กึ่งกลางแนวตั้งที่ xy (คำนวณเองแทน anchor ซึ่งใช้กับฟอนต์ bitmap ไม่ได้)"""
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    x, y = xy
+    if align == "center":
+        x -= (right - left) / 2
+    elif align == "right":
+        x -= right - left
+    draw.text((x, y - (top + bottom) / 2), text, fill=AXIS_COLOR, font=font)
+
+def syllable_plot_png(rms_norm, peaks) -> bytes:
+    """กราฟ RMS ที่ Normalize แล้ว + เครื่องหมาย x ที่จุดยอดแต่ละพยางค์ (ให้กรรมการดูว่านับตรงไหม)"""
+    image = Image.new("RGB", (PLOT_WIDTH, PLOT_HEIGHT), "white")
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    left, top, right, bottom = PLOT_MARGIN[0], PLOT_MARGIN[1], PLOT_WIDTH - PLOT_MARGIN[2], PLOT_HEIGHT - PLOT_MARGIN[3]
+    box = (left, top, right, bottom)
+
+    # เส้นตารางแนวนอนที่ 0, 0.5, 1.0 พร้อมตัวเลขแกน
+    for level in (0.0, 0.5, 1.0):
+        y = bottom - level * (bottom - top)
+        draw.line([(left, y), (right, y)], fill=GRID_COLOR)
+        _draw_text(draw, (left - 8, y), f"{level:.1f}", font, align="right")
+    draw.rectangle(box, outline=AXIS_COLOR)
+
+    values = np.asarray(rms_norm, dtype=np.float64)
+    if len(values) > 0:
+        xs, ys = _to_xy(values, box)
+        draw.line(list(zip(xs.tolist(), ys.tolist())), fill=LINE_COLOR, width=2)
+        peaks = np.asarray(peaks, dtype=int)
+        for x, y in zip(xs[peaks].tolist(), ys[peaks].tolist()):
+            draw.line([(x - 5, y - 5), (x + 5, y + 5)], fill=PEAK_COLOR, width=2)
+            draw.line([(x - 5, y + 5), (x + 5, y - 5)], fill=PEAK_COLOR, width=2)
+
+    _draw_text(draw, (PLOT_WIDTH / 2, top / 2), f"Syllable Counting (Total: {len(peaks)})", font, align="center")
+
+    # คำอธิบายสัญลักษณ์ (มุมขวาบน)
+    legend_x, legend_y = right - 150, top + 10
+    draw.line([(legend_x, legend_y), (legend_x + 20, legend_y)], fill=LINE_COLOR, width=2)
+    _draw_text(draw, (legend_x + 26, legend_y), "Normalized Energy", font)
+    draw.line([(legend_x + 5, legend_y + 11), (legend_x + 15, legend_y + 21)], fill=PEAK_COLOR, width=2)
+    draw.line([(legend_x + 5, legend_y + 21), (legend_x + 15, legend_y + 11)], fill=PEAK_COLOR, width=2)
+    _draw_text(draw, (legend_x + 26, legend_y + 16), "Syllable", font)
+
+    return encode_png(np.asarray(image))
@@ -0,0 +1,183 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from pymongo import ReturnDocument, UpdateOne
+
+from backend.db.database import get_database
+
+PASS_SCORE = 8   # กติกาจำลอง: ถ้าคะแนนรวม 4 ยก >= 8 คะแนน ถือว่าผ่าน (ปรับเปลี่ยนได้ตามต้องการ)
+
+def _now():
+    return datetime.now(ZoneInfo("Asia/Bangkok"))
+
+def normalize_match_name(match_name: str) -> str:
+    """ชื่อรายการแข่งสำหรับค้นหา: ตัวพิมพ์เล็ก ตัดช่องว่างหัวท้าย และรวมช่องว่างซ้อนเหลือช่องเดียว"""
+    return " ".join((match_name or "").casefold().split())
+
+def decide_final_status(mode: str, round_no: int, session_total) -> str:
+    """ตัดสินสถานะของนกหลังจบยกนี้ (ใช้คะแนนรวม 4 ยกในโหมดแข่งขัน)
+    session_total: คะแนนรวมทุกยกของเซสชันนี้ (รวมยกนี้แล้ว) จาก db.sessions หรือ None ถ้าไม่มี session_id"""
+    final_status = "n/a" # ค่าเริ่มต้นสำหรับโหมด Test
+
+    if mode == "competition":
+        if round_no < 4:
+            final_status = "pending" # รอให้ครบ 4 ยก
+        elif round_no == 4 and session_total is not None:
+            final_status = "pass" if session_total >= PASS_SCORE else "fail"
+
+    return final_status
+
+def final_status_expr(mode: str, round_no: int) -> dict:
+    """decide_final_status ในรูป Expression ของ MongoDB (ตัดสินจาก $total_score ในคำสั่งอัปเดตเดียวกัน)"""
+    return {"$cond": [
+        {"$gte": ["$total_score", PASS_SCORE]},
+        {"$literal": decide_final_status(mode, round_no, PASS_SCORE)},
+        {"$literal": decide_final_status(mode, round_no, PASS_SCORE - 1)},
+    ]}
+
+async def update_session(round_info: dict, user_id: str, round_score: int) -> str:
+    """อัปเดตสรุปผลของเซสชัน (db.sessions, _id = session_id) แบบ atomic ในการเขียนครั้งเดียวทุกครั้งที่บันทึกยก
+    เก็บคะแนนรวม, ยกที่มีแล้ว, คะแนนรายยก และสถานะล่าสุด หน้าเซสชันและการตัดสินยกที่ 4 จึงอ่านเอกสารเดียวจบ
+    คะแนนรวมคำนวณใหม่จากคะแนนรายยกในคำสั่งเดียวกัน ส่งยกเดิมซ้ำ (แม้พร้อมกัน) จึงแทนที่คะแนนเก่าโดยไม่นับซ้ำ
+    สถานะตัดสินจากคะแนนรวมใหม่ในคำสั่งเดียวกันด้วย คะแนนรวมและสถานะจึงไม่มีทางไม่ตรงกัน
+    คืนสถานะของนกหลังรวมยกนี้แล้ว"""
+    db = get_database()
+    session_id, round_no = round_info["session_id"], round_info["round_no"]
+    now = _now()
+
+    def keep(field, value):
+        # แทน $setOnInsert (ใช้ใน Update แบบ Pipeline ไม่ได้) และใช้ $literal กันค่าที่ขึ้นต้นด้วย $ ถูกตีความเป็นชื่อฟิลด์
+        return {"$ifNull": [f"${field}", {"$literal": value}]}
+
+    rounds = {"$ifNull": ["$rounds", []]}
+    session = await db.sessions.find_one_and_update(
+        {"_id": session_id},
+        [
+            {"$set": {
+                "user_id": keep("user_id", user_id),
+                "match_name": keep("match_name", round_info["match_name"]),
+                "cage_number": keep("cage_number", round_info["cage_number"]),
+                "mode": keep("mode", round_info["mode"]),
+                "created_at": keep("created_at", now),
+                "updated_at": {"$literal": now},
+                "round_scores": {"$mergeObjects": [
+                    {"$ifNull": ["$round_scores", {}]}, {str(round_no): {"$literal": round_score}},
+                ]},
+                "rounds": {"$cond": [
+                    {"$in": [round_no, rounds]}, rounds, {"$concatArrays": [rounds, [round_no]]},
+                ]},
+            }},
+            {"$set": {"total_score": {"$sum": {"$map": {
+                "input": {"$objectToArray": "$round_scores"}, "in": "$$this.v",
+            }}}}},
+            {"$set": {"final_status": final_status_expr(round_info["mode"], round_no)}},
+        ],
+        projection={"final_status": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return session["final_status"]
+
+async def record_round(round_info: dict, user_id: str, audio_url: str, analysis_result: dict,
+                       job_id: str = None, audio_hash: str = None) -> dict:
+    """บันทึกผลการวิเคราะห์ 1 ยกลง db.results (และสรุปผลเซสชันใน db.sessions) แล้วคืนเอกสารที่บันทึก (มี _id เป็น string)
+    round_info ต้องมี match_name, mode, session_id, cage_number, round_no
+    audio_hash: แฮชของไฟล์ต้นฉบับในที่เก็บไฟล์ (ผลที่อ้างถึงไฟล์อยู่ ไฟล์จะไม่ถูกเก็บกวาด)"""
+    db = get_database()
+
+    if round_info["session_id"]:
+        final_status = await update_session(round_info, user_id, analysis_result["total_score"])
+    else:
+        final_status = decide_final_status(round_info["mode"], round_info["round_no"], None)
+
+    result_doc = {
+        "user_id": user_id,
+        "match_name": round_info["match_name"],
+        "match_name_norm": normalize_match_name(round_info["match_name"]), # ใช้ค้นหาในหน้าประวัติ (มี Index)
+        "mode": round_info["mode"],
+        "session_id": round_info["session_id"],
+        "cage_number": round_info["cage_number"],
+        "round_no": round_info["round_no"],
+        "total_score": analysis_result["total_score"],
+        "audio_path": audio_url,
+        "audio_hash": audio_hash,
+        "details": analysis_result["events"], # ข้อมูลละเอียดแต่ละท่อนร้อง
+        "final_status": final_status,
+        "created_at": _now()
+    }
+    if job_id:
+        result_doc["job_id"] = job_id # ใช้กันบันทึกซ้ำเมื่องานถูกรันต่อหลังรีสตาร์ท
+
+    new_result = await db.results.insert_one(result_doc)
+    result_doc["_id"] = str(new_result.inserted_id)
+    return result_doc
+
+async def backfill_sessions():
+    """สร้าง db.sessions จากผลย้อนหลังใน db.results (ทำครั้งเดียวตอนเริ่มเซิร์ฟเวอร์ ถ้ายังไม่มีข้อมูลเซสชันเลย)"""
+    db = get_database()
+    if await db.sessions.estimated_document_count() > 0:
+        return
+    if await db.results.count_documents({"session_id": {"$nin": [None, ""]}}, limit=1) == 0:
+        return
+
+    print("⏳ กำลังสร้างสรุปผลเซสชันจากประวัติเดิม...")
+    await db.results.aggregate([
+        {"$match": {"session_id": {"$nin": [None, ""]}}},
+        {"$sort": {"session_id": 1, "created_at": 1}},
+        # ยกเดียวกันที่ส่งซ้ำ ใช้ผลล่าสุด
+        {"$group": {
+            "_id": {"session_id": "$session_id", "round_no": "$round_no"},
+            "doc": {"$last": "$$ROOT"},
+            "first_at": {"$first": "$created_at"},
+        }},
+        {"$sort": {"_id.session_id": 1, "_id.round_no": 1}},
+        {"$group": {
+            "_id": "$_id.session_id",
+            "user_id": {"$first": "$doc.user_id"},
+            "match_name": {"$first": "$doc.match_name"},
+            "cage_number": {"$first": "$doc.cage_number"},
+            "mode": {"$first": "$doc.mode"},
+            "total_score": {"$sum": "$doc.total_score"},
+            "rounds": {"$push": "$_id.round_no"},
+            "round_scores": {"$push": {"k": {"$toString": "$_id.round_no"}, "v": "$doc.total_score"}},
+            "final_status": {"$last": "$doc.final_status"},
+            "created_at": {"$min": "$first_at"},
+            "updated_at": {"$max": "$doc.created_at"},
+        }},
+        {"$set": {"round_scores": {"$arrayToObject": "$round_scores"}}},
+        {"$merge": {"into": "sessions", "whenMatched": "keepExisting"}},
+    ]).to_list(None)
+    print("✅ สร้างสรุปผลเซสชันเรียบร้อย")
+
+def build_round_response(result_doc: dict, filename: str, analysis_result: dict) -> dict:
+    """สร้าง Response ที่ส่งกลับหน้าเว็บ พร้อม URL ของไฟล์ต้นฉบับ"""
+    return {
+        "id": result_doc["_id"],
+        "status": "success",
+        "final_status": result_doc["final_status"],
+        "filename": filename,
+        "audio_full_url": result_doc["audio_path"],
+        "summary": {
+            "total_score": analysis_result["total_score"],
+            "total_events": analysis_result["total_events"]
+        },
+        "events": analysis_result["events"]
+    }
+
+async def backfill_match_names(batch_size: int = 500):
+    """เติม match_name_norm ให้ผลย้อนหลังที่บันทึกก่อนมีฟิลด์นี้ (ตอนเริ่มเซิร์ฟเวอร์ ทำเฉพาะเอกสารที่ยังไม่มี)"""
+    db = get_database()
+    total = 0
+    while True:
+        docs = await db.results.find(
+            {"match_name_norm": {"$exists": False}}, {"match_name": 1}
+        ).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        await db.results.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"match_name_norm": normalize_match_name(doc.get("match_name"))}})
+            for doc in docs
+        ], ordered=False)
+        total += len(docs)
+    if total:
+        print(f"✅ เติมชื่อรายการแข่งสำหรับค้นหาให้ผลย้อนหลัง {total} รายการ")
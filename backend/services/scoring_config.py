@@ -0,0 +1,32 @@
+import os
+import json
+import hashlib
+
+# --- การตั้งค่ามาตรฐาน (ต้องตรงกับตอนเตรียมข้อมูลเทรนโมเดล) ---
+# แยกไว้ในไฟล์นี้ (ไม่มี import หนัก) เพื่อให้ Process ของ API ใช้ค่าเดียวกับ ml_service ได้โดยไม่ต้องโหลด librosa
+SR = 22050                  # Sample Rate
+AI_INPUT_DURATION = 3.0     # ความยาวเสียงที่โมเดล AI รองรับ (วินาที)
+CONFIDENCE_THRESHOLD = 0.6  # ค่าความมั่นใจขั้นต่ำที่ยอมรับว่าเป็นเสียงนกร้อง
+NOISE_FLOOR_DB = -30        # ตัดเสียงที่เบากว่านี้ (เทียบกับจุดที่ดังที่สุด) ออกตอนลดเสียงรบกวน
+TOP_DB = 25                 # ระดับความดังที่ใช้ตัดเสียง (ยิ่งน้อยยิ่งไวต่อเสียงเบา)
+MIN_DURATION = 0.4          # ท่อนเสียงต้องยาวอย่างน้อย 0.5 วินาทีถึงจะนำมาคิด
+MERGE_GAP = 0.25            # ถ้าเสียงห่างกันไม่เกิน 0.5 วิ ให้รวมเป็นท่อนเดียวกัน
+PADDING_TIME = 0.15          # เผื่อขอบเสียงหน้า-หลังตอนตัด (วินาที)
+MIN_SYLLABLES = 3           # กติกา: ต้องนับได้ 3 พยางค์ขึ้นไปถึงจะได้ 1 ดอก
+PREDICT_BATCH_SIZE = int(os.getenv("PREDICT_BATCH_SIZE", "32"))  # จำนวนท่อนเสียงสูงสุดต่อการเรียกโมเดล 1 ครั้ง
+
+# ค่าที่มีผลต่อผลลัพธ์การให้คะแนน (ใช้เป็นส่วนหนึ่งของคีย์แคชผลวิเคราะห์ ปรับค่าใดก็ตามแคชเดิมจะไม่ถูกใช้)
+SCORING_PARAMS = {
+    "sr": SR,
+    "ai_input_duration": AI_INPUT_DURATION,
+    "confidence_threshold": CONFIDENCE_THRESHOLD,
+    "noise_floor_db": NOISE_FLOOR_DB,
+    "top_db": TOP_DB,
+    "min_duration": MIN_DURATION,
+    "merge_gap": MERGE_GAP,
+    "padding_time": PADDING_TIME,
+    "min_syllables": MIN_SYLLABLES,
+    # รุ่นของวิธีคำนวณ Feature (เปลี่ยนเมื่อสูตรตัดท่อน/Input ของ AI/นับพยางค์เปลี่ยน แม้ค่าข้างบนจะเท่าเดิม)
+    "feature_version": 2,
+}
+SCORING_PARAMS_HASH = hashlib.sha256(json.dumps(SCORING_PARAMS, sort_keys=True).encode()).hexdigest()[:12]
@@ -0,0 +1,198 @@
+import os
+import uuid
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from backend.services import scoring_worker, metrics
+from backend.services.model_manager import MODEL_PATH
+
+# --- ตั้งค่า Process Pool สำหรับงานวิเคราะห์เสียง (CPU หนัก ห้ามรันบน Event Loop) ---
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "2"))          # จำนวน Process ที่โหลดโมเดลไว้ (0 = API อย่างเดียว ไม่รับงานวิเคราะห์)
+SCORING_MAX_PENDING = int(os.getenv("SCORING_MAX_PENDING", "8"))  # งานที่รับไว้พร้อมกันได้สูงสุด (รวมที่กำลังรัน)
+SCORING_RETRY_AFTER = int(os.getenv("SCORING_RETRY_AFTER", "10")) # วินาทีที่แนะนำให้ลองใหม่เมื่อคิวเต็ม
+SCORING_WARMUP_TIMEOUT = int(os.getenv("SCORING_WARMUP_TIMEOUT", "300")) # วินาทีที่รอให้ทุก Process โหลดโมเดลเสร็จ
+WARMUP_HOLD = 0.5  # วินาทีที่งานรายงานตัวค้าง Process ไว้ ให้แต่ละงานไปตก Process ที่ต่างกัน
+
+class ScoringBusyError(Exception):
+    """คิววิเคราะห์เสียงเต็ม ให้ผู้ใช้ลองใหม่ภายหลัง"""
+
+class ScoringDisabledError(Exception):
+    """เซิร์ฟเวอร์นี้รันแบบ API อย่างเดียว (SCORING_WORKERS=0) ไม่รับงานวิเคราะห์เสียง"""
+
+class ScoringExecutor:
+    """Process Pool ขนาดคงที่ ทุก Process โหลดโมเดลครั้งเดียวตอนเริ่ม และจำกัดจำนวนงานที่รับเข้าคิว"""
+
+    def __init__(self, workers: int = SCORING_WORKERS, max_pending: int = SCORING_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.model_path = MODEL_PATH
+        self.model_info = None   # ข้อมูลโมเดลจาก Process ลูกหลังอุ่นเครื่องเสร็จ
+        self.ready = False       # True เมื่อทุก Process โหลดและอุ่นเครื่องโมเดลเสร็จแล้ว
+        self.error = None
+        self._pool = None
+        self._warm_task = None
+        self._loop = None
+        self._progress_queue = None
+        self._progress_thread = None
+        self._progress_listeners = {}  # task_id -> async callback(stage)
+
+    def _create_pool(self, model_path: str):
+        # ใช้ spawn แทน fork เพราะ TensorFlow ไม่รองรับการ fork หลังโหลดแล้ว
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=scoring_worker.init_worker,
+            initargs=(self._progress_queue, model_path),
+        )
+
+    async def _warm_pool(self, pool) -> dict:
+        """รอจนทุก Process ใน Pool โหลด + อุ่นเครื่องโมเดลเสร็จ (งานจะเริ่มรันได้หลัง initializer จบเท่านั้น)
+        ส่งงานรายงานตัวซ้ำจนครบทุก pid ถ้าไม่ครบภายใน SCORING_WARMUP_TIMEOUT วินาทีถือว่าล้มเหลว"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SCORING_WARMUP_TIMEOUT
+        pids = set()
+        info = None
+        while len(pids) < self.workers:
+            futures = [
+                asyncio.wrap_future(pool.submit(scoring_worker.worker_info, WARMUP_HOLD)) for _ in range(self.workers)
+            ]
+            try:
+                reports = await asyncio.wait_for(asyncio.gather(*futures), timeout=max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"Process พร้อมทำงาน {len(pids)}/{self.workers} ภายใน {SCORING_WARMUP_TIMEOUT} วินาที"
+                ) from None
+            for info in reports:
+                pids.add(info["pid"])
+        return info
+
+    async def warm_up(self):
+        """โหลดโมเดลในทุก Process เบื้องหลังตอนเริ่มเซิร์ฟเวอร์ แล้วเปิดสถานะ ready"""
+        self.start()
+        try:
+            self.model_info = await self._warm_pool(self._pool)
+            self.ready = True
+            self.error = None
+            print(f"✅ Scoring Pool พร้อมทำงาน (โมเดลเวอร์ชัน {self.model_info['model_version']})")
+        except Exception as e:
+            self.ready = False
+            self.error = str(e) or type(e).__name__
+            print(f"❌ อุ่นเครื่อง Scoring Pool ไม่สำเร็จ: {self.error}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def warm_up_in_background(self):
+        """เริ่มอุ่นเครื่องแบบไม่รอ (เซิร์ฟเวอร์รับ Request อื่นได้ทันที ดูสถานะได้ที่ /health/ready)"""
+        if not self.enabled:
+            return
+        self._warm_task = asyncio.create_task(self.warm_up())
+
+    async def reload(self, model_path: str = None) -> dict:
+        """สลับไปใช้ไฟล์โมเดลใหม่แบบไม่สะดุด: สร้าง Pool ใหม่ + อุ่นเครื่องให้เสร็จก่อน แล้วค่อยสลับ
+        งานที่กำลังรันใน Pool เดิมจะทำต่อจนเสร็จ"""
+        model_path = model_path or self.model_path
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(model_path)
+        self.start()
+
+        new_pool = self._create_pool(model_path)
+        try:
+            info = await self._warm_pool(new_pool)
+        except Exception:
+            new_pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        old_pool, self._pool = self._pool, new_pool
+        self.model_path, self.model_info = model_path, info
+        self.ready, self.error = True, None
+        old_pool.shutdown(wait=False)
+        print(f"✅ สลับเป็นโมเดลเวอร์ชัน {info['model_version']} เรียบร้อย")
+        return info
+
+    def start(self):
+        if not self.enabled:
+            raise ScoringDisabledError()
+        if self._pool is None:
+            self._loop = asyncio.get_running_loop()
+            self._progress_queue = multiprocessing.get_context("spawn").Queue()
+            self._progress_thread = threading.Thread(target=self._drain_progress, args=(self._progress_queue,), daemon=True)
+            self._progress_thread.start()
+            self._pool = self._create_pool(self.model_path)
+            print(f"✅ เริ่ม Scoring Pool ({self.workers} process, คิวสูงสุด {self.max_pending} งาน)")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self.ready = False
+            self._progress_queue.put(None) # สั่งให้ Thread อ่านความคืบหน้าหยุดทำงาน
+            self._progress_queue = None
+            print("✅ ปิด Scoring Pool เรียบร้อย")
+
+    def _drain_progress(self, progress_queue):
+        """Thread เบื้องหลัง: อ่านความคืบหน้าจาก Process ลูก แล้วส่งต่อให้ callback บน Event Loop"""
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                break
+            task_id, stage = item
+            callback = self._progress_listeners.get(task_id)
+            if callback is not None:
+                asyncio.run_coroutine_threadsafe(callback(stage), self._loop)
+
+    def is_full(self) -> bool:
+        return self.pending >= self.max_pending
+
+    async def run(self, fn, *args):
+        """ส่งงานไปรันใน Process ลูก แล้วรอผลแบบไม่บล็อก Event Loop"""
+        if not self.enabled:
+            raise ScoringDisabledError()
+        if self.is_full():
+            raise ScoringBusyError()
+        self.start()
+
+        self.pending += 1
+        pool = self._pool
+        try:
+            return await asyncio.wrap_future(pool.submit(fn, *args))
+        except BrokenProcessPool:
+            # Process ลูกตาย (เช่น หน่วยความจำไม่พอ) สร้าง Pool ใหม่ให้งานถัดไปใช้ได้ (ทำครั้งเดียวต่อ Pool ที่เสีย)
+            if self._pool is pool:
+                print("❌ Scoring Pool เสียหาย กำลังสร้างใหม่...")
+                self.shutdown()
+                self.warm_up_in_background()
+            raise
+        finally:
+            self.pending -= 1
+
+    async def score(self, audio_path: str, progress=None, audio_bytes: bytes = None) -> dict:
+        """วิเคราะห์ไฟล์เสียง 1 ยก ถ้าระบุ progress (async callback รับชื่อขั้นตอน) จะได้รับแจ้งทุกขั้นตอน
+        audio_bytes: ส่งเนื้อไฟล์ไปให้ Process ลูกถอดรหัสจากหน่วยความจำได้เลย
+        เวลาแต่ละขั้นตอนที่ Process ลูกจับมา (profile) ถูกบันทึกเป็นตัวชี้วัดแล้วตัดออกจากผลลัพธ์"""
+        task_id = None
+        if progress is not None:
+            task_id = uuid.uuid4().hex
+            self._progress_listeners[task_id] = progress
+        try:
+            with metrics.span("scoring"):
+                result = await self.run(scoring_worker.score_audio, audio_path, task_id, audio_bytes)
+        finally:
+            if task_id is not None:
+                self._progress_listeners.pop(task_id, None)
+
+        metrics.observe_analysis(result.pop("profile", None))
+        metrics.rounds_total.inc(source="scored")
+        return result
+
+scoring_executor = ScoringExecutor()
+
+metrics.registry.register(metrics.Gauge(
+    "bulbul_scoring_queue_depth", "งานวิเคราะห์ที่รับไว้ (รวมที่กำลังรัน)", lambda: scoring_executor.pending))
+metrics.registry.register(metrics.Gauge(
+    "bulbul_scoring_ready", "Scoring Pool โหลดโมเดลเสร็จพร้อมรับงาน (1/0)", lambda: int(scoring_executor.ready)))
@@ -0,0 +1,48 @@
+"""
+โค้ดที่รันภายใน Process ลูกของ ScoringExecutor
+(แยกไฟล์ออกมาเพื่อให้ Process หลักของ API ไม่ต้อง import TensorFlow/librosa เอง)
+"""
+
+_progress_queue = None  # คิวส่งความคืบหน้า (task_id, stage) กลับไปที่ Process หลัก
+
+def init_worker(progress_queue=None, model_path: str = None):
+    """รันครั้งเดียวตอน Process ลูกเริ่มทำงาน: โหลดและอุ่นเครื่องโมเดล AI ค้างไว้ใช้ตลอดอายุของ Process"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+    from backend.services.model_manager import model_manager, MODEL_PATH
+    model_manager.load(model_path or MODEL_PATH)
+
+def worker_info(hold: float = 0.0) -> dict:
+    """ข้อมูลของ Process ลูก (pid, เวอร์ชันโมเดล) ใช้ตรวจว่าทุก Process โหลดโมเดลเสร็จแล้ว
+    hold: ค้าง Process ไว้กี่วินาทีก่อนตอบ (Process ที่พร้อมก่อนจะได้ไม่รับงานรายงานตัวของ Process อื่นไปหมด)"""
+    import time
+    from backend.services.model_manager import model_manager
+    time.sleep(hold)
+    return model_manager.describe()
+
+def score_audio(audio_path: str, task_id: str = None, audio_bytes: bytes = None) -> dict:
+    """วิเคราะห์ไฟล์เสียง 1 ยก (เรียก analyze_audio_session ใน Process ลูก)
+    ถ้ามี task_id จะรายงานแต่ละขั้นตอนกลับไปทาง progress queue
+    ถ้ามี audio_bytes จะถอดรหัสจากหน่วยความจำแทนการอ่านไฟล์
+    ผลลัพธ์มี model_version ของโมเดลที่ใช้จริง (ใช้เป็นคีย์แคชผลวิเคราะห์)"""
+    from backend.services.ml_service import analyze_audio_session
+    from backend.services.model_manager import model_manager
+
+    progress = None
+    if task_id and _progress_queue is not None:
+        progress = lambda stage: _progress_queue.put((task_id, stage))
+    version = model_manager.version
+    result = analyze_audio_session(audio_path, progress=progress, audio_bytes=audio_bytes)
+    result["model_version"] = version
+    return result
+
+def score_segment(y_chunk, sr: int) -> dict:
+    """ให้คะแนนท่อนเสียง 1 ท่อนที่ตัดมาแล้ว (ใช้กับการวิเคราะห์แบบ Real-time)"""
+    from backend.services.ml_service import score_segment as _score_segment
+    return _score_segment(y_chunk, sr)
+
+def render_artifact(audio_name: str, start_frame: int, end_frame: int, kind: str) -> str:
+    """สร้างไฟล์ประกอบ Event ลงแคช (ภาพ Spectrogram, กราฟนับพยางค์, เสียงท่อนสั้นของไฟล์ mp3) คืน path ของไฟล์"""
+    from backend.services.ml_service import render_event_artifact
+    return render_event_artifact(audio_name, start_frame, end_frame, kind)
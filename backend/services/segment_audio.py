@@ -0,0 +1,126 @@
+"""
+เสียงท่อนสั้นของ Event = ช่วง byte ของไฟล์ WAV ต้นฉบับ (ไม่ถอดรหัส ไม่เขียนไฟล์ใหม่)
+
+สร้าง Header WAV 44 bytes ขึ้นมาใหม่ แล้วต่อด้วยข้อมูล PCM ช่วง [start, end) ที่อ่านตรงจากไฟล์ต้นฉบับ
+รองรับ HTTP Range บนไฟล์ WAV เสมือนนี้ (เบราว์เซอร์เลื่อนตำแหน่งเล่นได้)
+ใช้แค่ไลบรารีมาตรฐาน Process ของ API จึงไม่ต้องโหลด librosa/soundfile
+"""
+import struct
+
+from backend.services.scoring_config import SR, PADDING_TIME
+
+WAV_HEADER_SIZE = 44
+READ_BLOCK = 64 * 1024
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+class UnsupportedAudioError(Exception):
+    """ไฟล์ต้นฉบับไม่ใช่ WAV แบบ PCM/float ที่ตัดเป็นช่วง byte ได้ (เช่น mp3) ต้องถอดรหัสแทน"""
+
+class RangeNotSatisfiableError(Exception):
+    """ช่วง byte ที่ขอ (HTTP Range) อยู่นอกขนาดไฟล์"""
+
+def _read_wav_layout(f) -> dict:
+    """อ่านโครงสร้างไฟล์ WAV: รูปแบบข้อมูล, channel, sample rate, ขนาดต่อเฟรม และตำแหน่งของ data chunk"""
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise UnsupportedAudioError("ไม่ใช่ไฟล์ WAV")
+
+    layout = {}
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size)
+            audio_format, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                audio_format = struct.unpack("<H", fmt[24:26])[0] # 2 bytes แรกของ SubFormat GUID
+            layout.update(format=audio_format, channels=channels, sample_rate=sample_rate,
+                          block_align=block_align, bits=bits)
+            if chunk_size % 2:
+                f.read(1)
+        elif chunk_id == b"data":
+            layout.update(data_offset=f.tell(), data_size=chunk_size)
+            break
+        else:
+            f.seek(chunk_size + (chunk_size % 2), 1) # chunk อื่น (LIST, fact, ...) ข้ามไป
+
+    if "data_offset" not in layout or layout.get("format") not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise UnsupportedAudioError("ไฟล์ WAV ไม่ใช่ PCM/float")
+    return layout
+
+def _wav_header(layout: dict, data_size: int) -> bytes:
+    channels, sample_rate, block_align, bits = layout["channels"], layout["sample_rate"], layout["block_align"], layout["bits"]
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, layout["format"], channels, sample_rate, sample_rate * block_align, block_align, bits,
+        b"data", data_size,
+    )
+
+class SegmentAudio:
+    """ไฟล์ WAV เสมือนของท่อนเสียง [start_frame, end_frame) (หน่วย sample ที่ SR เหมือน URL ของไฟล์ประกอบ)
+    เผื่อขอบหน้า-หลัง PADDING_TIME แบบเดียวกับ event_bounds"""
+
+    def __init__(self, audio_path: str, start_frame: int, end_frame: int):
+        if not (0 <= start_frame < end_frame):
+            raise ValueError("ข้อมูลช่วงเวลาไม่ถูกต้อง")
+        self.path = audio_path
+        with open(audio_path, "rb") as f:
+            self.layout = _read_wav_layout(f)
+
+        # แปลงตำแหน่งจาก SR ไปเป็น sample rate ของไฟล์ต้นฉบับ
+        rate = self.layout["sample_rate"]
+        total_frames = self.layout["data_size"] // self.layout["block_align"]
+        pad = int(PADDING_TIME * SR)
+        first = max(0, round((start_frame - pad) * rate / SR))
+        last = min(total_frames, round((end_frame + pad) * rate / SR))
+        if last <= first:
+            raise ValueError("ช่วงเวลาอยู่นอกความยาวของไฟล์เสียง")
+
+        self.data_start = self.layout["data_offset"] + first * self.layout["block_align"]
+        self.data_size = (last - first) * self.layout["block_align"]
+        self.header = _wav_header(self.layout, self.data_size)
+        self.size = WAV_HEADER_SIZE + self.data_size
+
+    def byte_range(self, range_header: str):
+        """แปลง Header Range ("bytes=a-b", "bytes=a-", "bytes=-n") เป็น (start, end) แบบรวมปลาย ไม่มี Range คืน None"""
+        if not range_header:
+            return None
+        unit, _, spec = range_header.partition("=")
+        if unit.strip() != "bytes" or "," in spec:
+            return None # รองรับช่วงเดียว ช่วงหลายช่วงส่งทั้งไฟล์แทน (อนุญาตตาม RFC 9110)
+        first, _, last = spec.strip().partition("-")
+        try:
+            if first == "":
+                start, end = max(0, self.size - int(last)), self.size - 1
+            else:
+                start = int(first)
+                end = min(int(last), self.size - 1) if last else self.size - 1
+        except ValueError:
+            return None
+        if start >= self.size or start > end:
+            raise RangeNotSatisfiableError()
+        return start, end
+
+    def iter_bytes(self, start: int = 0, end: int = None):
+        """อ่านไฟล์ WAV เสมือนช่วง [start, end] ทีละก้อน (Header สร้างในหน่วยความจำ ส่วนข้อมูลอ่านจากไฟล์ต้นฉบับ)"""
+        end = self.size - 1 if end is None else end
+        if start < WAV_HEADER_SIZE:
+            yield self.header[start:min(end + 1, WAV_HEADER_SIZE)]
+            start = WAV_HEADER_SIZE
+        if end < WAV_HEADER_SIZE:
+            return
+
+        remaining = end + 1 - start
+        with open(self.path, "rb") as f:
+            f.seek(self.data_start + start - WAV_HEADER_SIZE)
+            while remaining > 0:
+                block = f.read(min(READ_BLOCK, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
@@ -0,0 +1,66 @@
+import os
+import hashlib
+import asyncio
+from fastapi import UploadFile
+
+from backend.services import artifact_store
+
+# --- ตั้งค่าการรับไฟล์เสียงที่อัปโหลด ---
+UPLOAD_CHUNK_SIZE = 1024 * 1024                                           # อ่านทีละ 1 MB
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024     # ขนาดไฟล์สูงสุดที่รับ
+IN_MEMORY_MAX_BYTES = int(os.getenv("IN_MEMORY_DECODE_MB", "8")) * 1024 * 1024  # ไฟล์ที่เล็กกว่านี้ถอดรหัสจากหน่วยความจำได้เลย
+
+class UploadTooLargeError(Exception):
+    """ไฟล์ที่อัปโหลดใหญ่เกิน MAX_UPLOAD_BYTES"""
+
+def upload_extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower()
+
+async def receive_upload(file: UploadFile):
+    """อ่านไฟล์อัปโหลดทีละก้อน (ไม่โหลดทั้งไฟล์ในครั้งเดียว) จำกัดขนาด และคำนวณ SHA-256 ไปพร้อมกัน
+    คืน (content, audio_hash, save_path)
+    - ไฟล์เล็ก (ไม่เกิน IN_MEMORY_MAX_BYTES): content เป็น bytes เพื่อถอดรหัสจากหน่วยความจำ ยังไม่เขียนลงดิสก์
+    - ไฟล์ใหญ่: เขียนลงไฟล์ชั่วคราวระหว่างอ่าน แล้วย้ายเข้าที่เก็บไฟล์ (artifact_store) ที่ save_path (content เป็น None)
+    ไฟล์ต้นฉบับตั้งชื่อตามแฮช ไฟล์เนื้อหาเดียวกันจึงใช้ไฟล์เดียวกันบนดิสก์"""
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    tmp_path = artifact_store.temp_path()
+    out = None
+    total = 0
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > MAX_UPLOAD_BYTES:
+                raise UploadTooLargeError()
+            digest.update(chunk)
+
+            if out is None and total <= IN_MEMORY_MAX_BYTES:
+                buffer.extend(chunk)
+                continue
+
+            if out is None:
+                # ไฟล์ใหญ่เกินจะเก็บในหน่วยความจำ เปลี่ยนไปเขียนลงดิสก์แทน
+                out = open(tmp_path, "wb")
+                await asyncio.to_thread(out.write, bytes(buffer))
+                buffer = None
+            await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(tmp_path)
+        raise
+
+    audio_hash = digest.hexdigest()
+    ext = upload_extension(file.filename)
+    if out is not None:
+        out.close()
+        return None, audio_hash, artifact_store.adopt_file(tmp_path, audio_hash, ext)
+    return bytes(buffer), audio_hash, artifact_store.blob_path(audio_hash, ext)
+
+def persist_upload(audio_hash: str, ext: str, data: bytes) -> asyncio.Task:
+    """เขียนไฟล์ต้นฉบับลงที่เก็บไฟล์เบื้องหลัง (ทำงานพร้อมกับการวิเคราะห์เสียงจากหน่วยความจำ)
+    ถ้ามีไฟล์เนื้อหาเดียวกันอยู่แล้วจะไม่เขียนซ้ำ"""
+    return asyncio.create_task(asyncio.to_thread(artifact_store.put_bytes, audio_hash, ext, data))
@@ -0,0 +1,87 @@
+"""
+วัด Throughput ของการ Login (ตรวจรหัสผ่านด้วย bcrypt) เมื่อมีกรรมการ Login พร้อมกันหลายคน
+และความหน่วงของ Event Loop ระหว่างนั้น (Request อื่นต้องรอนานแค่ไหน)
+
+เทียบ 2 แบบ:
+  1. inline : เรียก verify_password ตรงๆ ใน async handler (แบบเดิม บล็อก Event Loop)
+  2. pool   : verify_password_async ผ่าน Thread Pool ของ bcrypt (BCRYPT_WORKERS)
+
+วิธีใช้ (รันจาก Root ของโปรเจกต์):
+    python benchmarks/bcrypt_login.py [--logins 32] [--rounds 12] [--workers 4]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Login throughput ของ bcrypt ภายใต้โหลดพร้อมกัน")
+    parser.add_argument("--logins", type=int, default=32, help="จำนวน Login ที่ยิงพร้อมกัน")
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")), help="Cost factor ของ bcrypt")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BCRYPT_WORKERS", "4")), help="ขนาด Thread Pool ของ bcrypt")
+    return parser.parse_args()
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> list:
+    """Task จำลอง Request อื่น: ตื่นทุก interval วินาที แล้ววัดว่าตื่นช้ากว่ากำหนดเท่าไหร่"""
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return lags
+
+async def run_case(name: str, login, logins: int) -> dict:
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    lags = await lag_task
+    assert all(results), "ตรวจรหัสผ่านไม่ผ่าน"
+    return {
+        "case": name,
+        "seconds": elapsed,
+        "logins_per_sec": logins / elapsed,
+        "loop_lag_max_ms": max(lags, default=0.0) * 1000,
+        "loop_lag_p50_ms": statistics.median(lags) * 1000 if lags else 0.0,
+    }
+
+async def main_async(args):
+    from backend.services import auth_service
+
+    password = "judge-password"
+    hashed = auth_service.hash_password(password, rounds=args.rounds)
+
+    async def inline_login():
+        return auth_service.verify_password(password, hashed)
+
+    async def pool_login():
+        return await auth_service.verify_password_async(password, hashed)
+
+    return [
+        await run_case("inline", inline_login, args.logins),
+        await run_case("pool", pool_login, args.logins),
+    ]
+
+def main():
+    args = parse_args()
+    # ต้องตั้งค่าก่อน import auth_service เพราะ Thread Pool ถูกสร้างตอน import
+    os.environ["BCRYPT_WORKERS"] = str(args.workers)
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    print(f"🔐 Login พร้อมกัน {args.logins} ครั้ง (bcrypt cost {args.rounds}, Thread Pool {args.workers} threads)")
+    for r in asyncio.run(main_async(args)):
+        print(
+            f"{r['case']:<7} {r['seconds']:6.2f} s  {r['logins_per_sec']:7.1f} logins/s  "
+            f"loop lag p50 {r['loop_lag_p50_ms']:7.1f} ms  max {r['loop_lag_max_ms']:7.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
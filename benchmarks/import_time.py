@@ -0,0 +1,62 @@
+"""
+วัดเวลา import และหน่วยความจำของ Process API (backend.main) เพื่อคุมงบการเริ่มต้นเซิร์ฟเวอร์
+และยืนยันว่าเส้นทางที่ไม่ใช่การวิเคราะห์เสียงไม่ได้ import TensorFlow / librosa / matplotlib
+
+วิธีใช้ (รันจาก Root ของโปรเจกต์):
+    python benchmarks/import_time.py [--runs 5] [--budget 1.0]
+จบด้วย exit code 1 ถ้าเกินงบเวลา หรือมีไลบรารีหนักหลุดเข้ามา
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+HEAVY_MODULES = ["tensorflow", "keras", "librosa", "matplotlib", "numba", "scipy", "sklearn"]
+
+PROBE = f"""
+import sys, time, json, resource
+start = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - start
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "heavy": heavy}}))
+"""
+
+def measure_once(root: str) -> dict:
+    # รันใน Process ใหม่ทุกครั้ง เพื่อไม่ให้ module ที่ import ไปแล้วทำให้ผลเร็วเกินจริง
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=root, capture_output=True, text=True, check=True,
+        env={**os.environ, "SCORING_WORKERS": os.getenv("SCORING_WORKERS", "0")},
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget ของ backend.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_BUDGET_SEC", "1.0")))
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = [measure_once(root) for _ in range(args.runs)]
+    median = statistics.median(r["seconds"] for r in runs)
+    rss = max(r["max_rss_mb"] for r in runs)
+    heavy = sorted({m for r in runs for m in r["heavy"]})
+
+    print(f"⏱️ import backend.main: median {median * 1000:.0f} ms ({args.runs} รอบ, งบ {args.budget * 1000:.0f} ms)")
+    print(f"💾 Max RSS: {rss:.0f} MB")
+
+    failed = False
+    if heavy:
+        print(f"❌ พบไลบรารีหนักถูก import ใน Process API: {', '.join(heavy)}")
+        failed = True
+    if median > args.budget:
+        print("❌ เวลา import เกินงบที่กำหนด")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ อยู่ในงบที่กำหนด")
+
+if __name__ == "__main__":
+    main()
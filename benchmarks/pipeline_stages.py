@@ -0,0 +1,175 @@
+"""
+วัดเวลาของแต่ละขั้นตอนใน Pipeline ให้คะแนน ด้วยเสียงนกปรอดสังเคราะห์ (ไม่ต้องใช้ไฟล์จริงหรือเน็ต)
+ใช้เทียบความเร็วระหว่าง Commit: รันก่อน/หลังแก้ ml_service.py แล้วเทียบไฟล์ JSON ที่ได้
+
+เสียงสังเคราะห์ = ชุดพยางค์เสียงกวาดความถี่ (FM chirp 1.5-4.5 kHz) เป็นวรรค + Noise ที่หลายระดับ SNR และหลายความยาว
+สุ่มด้วย seed คงที่ ทุกเครื่องได้เสียงชุดเดียวกัน
+
+ขั้นตอนที่วัด (ตามลำดับใน analyze_audio_session):
+  decode, denoise (reduce_noise), split, merge, tensors, predict, syllables,
+  artifacts (ภาพ Spectrogram + กราฟพยางค์ + เสียงท่อนสั้น), end_to_end
+
+วิธีใช้ (รันจาก Root ของโปรเจกต์):
+    python benchmarks/pipeline_stages.py [--repeats 5] [--durations 13 30 60] [--snrs 20 10 0] [--out bench.json]
+ไม่มีไฟล์โมเดล (หรือใส่ --no-model) จะข้ามขั้นตอน predict และ end_to_end
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="เวลาของแต่ละขั้นตอนใน Pipeline ให้คะแนน")
+    parser.add_argument("--repeats", type=int, default=5, help="จำนวนรอบที่วัดต่อเสียง 1 ชุด")
+    parser.add_argument("--durations", type=float, nargs="+", default=[13.0, 30.0, 60.0], help="ความยาวเสียง (วินาที)")
+    parser.add_argument("--snrs", type=float, nargs="+", default=[20.0, 10.0, 0.0], help="ระดับ SNR (dB)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-model", action="store_true", help="ไม่โหลดโมเดล (ข้าม predict และ end_to_end)")
+    parser.add_argument("--out", default=None, help="ไฟล์ JSON ผลลัพธ์ (ค่าเริ่มต้น benchmarks/results/pipeline_<commit>.json)")
+    return parser.parse_args()
+
+def synth_round(duration: float, snr_db: float, sr: int, rng):
+    """เสียงสังเคราะห์ 1 ยก: วรรคละ 3-6 พยางค์ พยางค์ยาว 80-160 ms กวาดความถี่ขึ้น/ลง เว้นวรรค 0.4-1.5 วินาที"""
+    import numpy as np
+
+    n = int(duration * sr)
+    y = np.zeros(n, dtype=np.float32)
+    t = 0.3
+    while t < duration - 1.0:
+        for _ in range(rng.integers(3, 7)):
+            length = rng.uniform(0.08, 0.16)
+            f0, f1 = rng.uniform(1500, 4500, size=2)
+            ts = np.arange(int(length * sr)) / sr
+            phase = 2 * np.pi * (f0 * ts + (f1 - f0) * ts ** 2 / (2 * length))
+            syllable = np.sin(phase) * np.hanning(len(ts)) * rng.uniform(0.5, 1.0)
+            start = int(t * sr)
+            y[start:start + len(syllable)] += syllable[:n - start]
+            t += length + rng.uniform(0.03, 0.08)
+        t += rng.uniform(0.4, 1.5)
+
+    signal_power = np.mean(y ** 2)
+    noise = rng.standard_normal(n).astype(np.float32)
+    noise *= np.sqrt(signal_power / (10 ** (snr_db / 10)) / np.mean(noise ** 2))
+    mixed = y + noise
+    return (mixed / np.max(np.abs(mixed)) * 0.9).astype(np.float32)
+
+def timed(times: dict, stage: str, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    times.setdefault(stage, []).append(time.perf_counter() - start)
+    return result
+
+def run_once(path: str, times: dict, model):
+    """รัน Pipeline 1 รอบ แยกจับเวลาทีละขั้นตอน (ลำดับและฟังก์ชันเดียวกับ analyze_audio_session)"""
+    import numpy as np
+    import librosa
+    from backend.services import ml_service
+    from backend.services.features import EventFeatures
+    from backend.services.renderer import spectrogram_png, syllable_plot_png
+    from backend.services.segment_audio import SegmentAudio
+    from backend.services.scoring_config import AI_INPUT_DURATION, TOP_DB, MERGE_GAP, MIN_DURATION
+
+    y, sr = timed(times, "decode", ml_service.load_recording, path)
+    y_clean = timed(times, "denoise", ml_service.reduce_noise, y, sr)
+    raw_intervals = timed(times, "split", librosa.effects.split, y_clean, top_db=TOP_DB)
+    merged = timed(times, "merge", ml_service.merge_intervals, raw_intervals, sr, MERGE_GAP)
+
+    events = [(s, e) for s, e in merged if (e - s) / sr >= MIN_DURATION]
+    chunks = [ml_service.event_chunk(y, sr, s, e) for s, e in events]
+    features = [EventFeatures(c, sr, AI_INPUT_DURATION) for c in chunks]
+    batch = timed(times, "tensors", lambda: np.stack([f.tensor for f in features]) if features
+                  else np.empty((0, 128, 130, 1), dtype=np.float32))
+    if model is not None:
+        timed(times, "predict", ml_service.predict_batch, batch, model)
+    timed(times, "syllables", lambda: [ml_service.count_syllables(f) for f in features])
+
+    def write_artifacts():
+        # ไฟล์ประกอบสร้างทีหลังใน Process อื่น (render_event_artifact) จึงคำนวณ EventFeatures ใหม่ 1 ชุดต่อท่อน
+        for (s, e), chunk in zip(events, chunks):
+            event = EventFeatures(chunk, sr, AI_INPUT_DURATION)
+            spectrogram_png(event.mel_db)
+            syllable_plot_png(*ml_service.syllable_peaks(event.rms, sr))
+            b"".join(SegmentAudio(path, s, e).iter_bytes())
+    timed(times, "artifacts", write_artifacts)
+
+    if model is not None:
+        timed(times, "end_to_end", ml_service.analyze_audio_session, path)
+    return len(events)
+
+def summarize(samples: list) -> dict:
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "min_ms": round(min(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+def git_commit(root: str) -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main():
+    args = parse_args()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(root)
+    sys.path.insert(0, root)
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")  # วัดบน CPU เสมอ ผลจึงเทียบกันได้ทุกเครื่อง
+
+    import numpy as np
+    import soundfile as sf
+    from backend.services.scoring_config import SR, SCORING_PARAMS_HASH
+    from backend.services.model_manager import model_manager, MODEL_PATH
+
+    model = None
+    if not args.no_model and os.path.exists(MODEL_PATH):
+        model_manager.load(MODEL_PATH)
+        model = model_manager.model
+    elif not args.no_model:
+        print(f"⚠️ ไม่พบไฟล์โมเดลที่ {MODEL_PATH} ข้ามขั้นตอน predict และ end_to_end")
+
+    rng = np.random.default_rng(args.seed)
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for duration in args.durations:
+            for snr in args.snrs:
+                path = os.path.join(tmp, f"synth_{duration:g}s_{snr:g}db.wav")
+                sf.write(path, synth_round(duration, snr, SR, rng), SR, subtype="PCM_16")
+
+                times = {}
+                run_once(path, times, model)  # รอบอุ่นเครื่อง (ไม่นับ)
+                times.clear()
+                for _ in range(args.repeats):
+                    events = run_once(path, times, model)
+
+                stages = {stage: summarize(samples) for stage, samples in times.items()}
+                cases.append({"duration_sec": duration, "snr_db": snr, "events": events, "stages": stages})
+                summary = "  ".join(f"{stage} {s['median_ms']:.1f}" for stage, s in stages.items())
+                print(f"🎵 {duration:g}s SNR {snr:g} dB ({events} ท่อน) [ms] {summary}")
+
+    commit = git_commit(root)
+    report = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params_hash": SCORING_PARAMS_HASH,
+        "model_version": model_manager.version,
+        "repeats": args.repeats,
+        "seed": args.seed,
+        "cases": cases,
+    }
+    out_path = args.out or os.path.join("benchmarks", "results", f"pipeline_{commit}.json")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 บันทึกผลที่ {out_path}")
+
+if __name__ == "__main__":
+    main()
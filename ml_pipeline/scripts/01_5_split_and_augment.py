@@ -1,5 +1,6 @@
 import os
 import shutil
+import argparse
 import librosa
 import soundfile as sf
 import numpy as np
@@ -22,7 +23,8 @@ def time_stretch(data, rate):
     return librosa.effects.time_stretch(y=data, rate=rate)
 
 def process_and_save(file_path, save_dir, filename, is_train=False):
-    """ฟังก์ชันโหลดเสียงและเซฟ (ทำ Augment เฉพาะตอน is_train=True)"""
+    """ฟังก์ชันโหลดเสียงและเซฟ (ทำ Augment เฉพาะตอน is_train=True)
+    ปกติไม่ต้องเขียนไฟล์ Augment แล้ว 03_train_model.py ทำ augmentation ทีละ batch ระหว่างเทรน (augment.py)"""
     y, sr = librosa.load(file_path, sr=TARGET_SR)
     
     # เซฟไฟล์ต้นฉบับเสมอ ไม่ว่าจะอยู่ Train, Val หรือ Test
@@ -35,6 +37,11 @@ def process_and_save(file_path, save_dir, filename, is_train=False):
         sf.write(os.path.join(save_dir, f"{filename}_noise.wav"), add_noise(y), sr)
 
 def main():
+    parser = argparse.ArgumentParser(description="แบ่งชุดข้อมูล 80:10:10")
+    parser.add_argument("--materialize-augment", action="store_true",
+                        help="เขียนไฟล์ Augment (_pitch/_stretch/_noise) ลงดิสก์แบบเดิม (ปกติทำตอนเทรนแทน)")
+    args = parser.parse_args()
+
     print("🚀 เริ่มกระบวนการแบ่งกลุ่ม 80:10:10 และ Augment ข้อมูล...")
     classes = ["0_noise", "1_singing"]
     
@@ -51,13 +58,16 @@ def main():
         val_files, test_files = train_test_split(temp_files, test_size=0.5, random_state=42)
         
         splits = {
-            'train': (train_files, True),  # True = อนุญาตให้ทำ Augment
+            'train': (train_files, args.materialize_augment),  # True = เขียนไฟล์ Augment ลงดิสก์
             'val': (val_files, False),     # False = ห้ามทำ Augment (ข้อสอบ)
             'test': (test_files, False)    # False = ห้ามทำ Augment (ข้อสอบ)
         }
         
         for split_name, (split_files, do_augment) in splits.items():
             out_dir = os.path.join(OUTPUT_DIR, split_name, cls)
+            # ล้างผลของรอบก่อนทิ้ง (เช่นไฟล์ _pitch/_stretch/_noise จากตอนที่ยังเขียน Augment ลงดิสก์
+            # หรือไฟล์ที่ย้ายคลาส/ถูกลบออกจาก 03_labeled แล้ว) ไม่อย่างนั้นจะปนเข้าชุดข้อมูลรอบใหม่
+            shutil.rmtree(out_dir, ignore_errors=True)
             os.makedirs(out_dir, exist_ok=True)
             
             desc = f"ปั๊มข้อมูล {cls} ({split_name})" if do_augment else f"คัดลอก {cls} ({split_name})"
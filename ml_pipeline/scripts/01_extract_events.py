@@ -1,10 +1,32 @@
 import os
+import re
 import glob
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import librosa
 import soundfile as sf
 import noisereduce as nr
 from tqdm import tqdm 
 
+RAW_DIR = "ml_pipeline/data/01_raw"
+INTERIM_DIR = "ml_pipeline/data/02_interim"
+MANIFEST_PATH = os.path.join(INTERIM_DIR, "extract_manifest.jsonl")
+
+# พารามิเตอร์การหั่นเสียง (เปลี่ยนค่าใดค่าหนึ่ง ทุกไฟล์จะถูกหั่นใหม่ในรอบถัดไป)
+EXTRACT_PARAMS = {
+    "sr": 22050,
+    "prop_decrease": 0.8,
+    "top_db": 25,
+    "frame_length": 2048,
+    "hop_length": 512,
+    "merge_gap": 0.5,
+    "padding": 0.2,
+    "min_duration": 0.3,
+}
+PARAMS_HASH = hashlib.sha256(json.dumps(EXTRACT_PARAMS, sort_keys=True).encode()).hexdigest()[:12]
+
 def merge_intervals(intervals, sr, gap_threshold):
     """ เชื่อมต่อท่อนเสียงที่อยู่ใกล้กัน (Gap < threshold) ให้เป็นก้อนเดียว """
     if len(intervals) == 0: return []
@@ -21,113 +43,213 @@ def merge_intervals(intervals, sr, gap_threshold):
     merged.append((current_start, current_end))
     return merged
 
-def process_audio_file(input_path, output_dir, file_prefix):
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def format_time(seconds):
+    """แปลงวินาทีเป็นนาที-วินาที (เช่น 65.5 -> 01-05)"""
+    m = int(seconds // 60)
+    s = int(seconds % 60)
+    return f"{m:02d}-{s:02d}"
+
+def event_filename(file_prefix, source_hash, index, start_sec, end_sec):
+    """ชื่อไฟล์ Event แบบคงที่: ไฟล์ต้นฉบับเดิม + พารามิเตอร์เดิม ได้ชื่อเดิมเสมอ (ไม่ต้องเช็กชื่อซ้ำบนดิสก์)
+    เช่น xc_104214_00-12_00-14_3fa9c1_007.wav (แฮชของไฟล์ต้นฉบับกันชนกันระหว่างไฟล์ที่ prefix เหมือนกัน)"""
+    return f"{file_prefix}_{format_time(start_sec)}_{format_time(end_sec)}_{source_hash[:6]}_{index:03d}.wav"
+
+def process_audio_file(input_path, output_dir, file_prefix, source_hash=None):
     """
     อ่านไฟล์เสียงดิบ -> ลด Noise -> Normalize -> หา Event -> เซฟไฟล์ย่อย (ความยาวตามจริง)
+    คืนรายชื่อไฟล์ที่หั่นได้ (รันใน Process ลูกของ Pool)
     """
-    try:
-        # 1. โหลดไฟล์เสียง (ปรับ Sample Rate เป็น 22050 Hz ซึ่งเป็นมาตรฐานสำหรับเสียงนก)
-        y, sr = librosa.load(input_path, sr=22050)
-
-        # 2. Noise Reduction (ทำก่อนเพื่อกำจัดเสียงซ่า/ลมเบื้องหลัง)
-        # prop_decrease=0.8 คือลด noise ลง 80% เพื่อให้ยังพอได้ยินสภาพแวดล้อมบ้าง
-        y_clean = nr.reduce_noise(y=y, sr=sr, prop_decrease=0.8)
-
-        # 3. Normalization (ปรับความดังให้อยู่ในสเกล -1.0 ถึง 1.0)
-        y_norm = librosa.util.normalize(y_clean)
-
-        # 4. Event Detection (หาช่วงที่เสียงดังทะลุเกณฑ์ความเงียบ)
-        # top_db=25: ยิ่งค่าน้อยยิ่งตัดไว (ถ้าพบว่าตัดติดความเงียบมาเยอะไป ให้ลองปรับเป็น 20)
-        raw_intervals = librosa.effects.split(
-            y_norm,
-            top_db=25,
-            frame_length=2048,
-            hop_length=512
-        )
-
-        merged_intervals = merge_intervals(raw_intervals, sr, gap_threshold=0.5)
-
-        count = 1
-        padding = int(sr * 0.2) # เพิ่มพื้นที่ว่าง หัว-ท้าย อย่างละ 0.1 วินาที
-        for start, end in merged_intervals:
-            # เช็กความยาว "ดั้งเดิม" ก่อนเพิ่ม Padding
-            if (end - start) < (sr * 0.3):
-                continue
-
-            # ขยายขอบเขตการหั่น (แต่ไม่ให้เกินขอบเขตของไฟล์จริง)
-            start_pad = max(0, start - padding)
-            end_pad = min(len(y_norm), end + padding)
-
-            # ดึงท่อนเสียงออกมาตามความยาวจริงที่จับได้
-            y_event = y_norm[start_pad:end_pad]
-
-            # กรอง Event ขยะ: ถ้าเสียงสั้นกว่า 0.3 วินาที มักจะเป็นแค่เสียงไมค์กระแทก หรือนกขยับตัว ข้ามไปเลย
-            if len(y_event) < sr * 0.3:
-                continue
-
-            # --- คำนวณเวลาเริ่มและจบจาก Sample Index ---
-            start_sec = start / sr
-            end_sec = end / sr
-
-            # ฟังก์ชันย่อยสำหรับแปลงวินาทีเป็นนาที-วินาที (เช่น 65.5 -> 01-05)
-            def format_time(seconds):
-                m = int(seconds // 60)
-                s = int(seconds % 60)
-                return f"{m:02d}-{s:02d}"
-
-            # สร้างข้อความช่วงเวลา เช่น 00-12_00-14
-            time_range = f"{format_time(start_sec)}_{format_time(end_sec)}"
-
-            # 5. เซฟไฟล์ .wav เพื่อนำไปนั่งฟังคัดแยกทีหลัง
-            # ตั้งชื่อไฟล์ให้มีเลขรันลำดับ เช่น xc_01_001.wav
-            out_filename = f"{file_prefix}_{time_range}.wav"
-            out_filepath = os.path.join(output_dir, out_filename)
-
-            # ตรวจสอบเผื่อกรณีชื่อไฟล์ซ้ำกันในช่วงวินาทีเดียวกัน ให้เติมเลขลำดับกันทับไฟล์เดิม
-            if os.path.exists(out_filepath):
-                out_filename = f"{file_prefix}_{time_range}_{count:02d}.wav"
-                out_filepath = os.path.join(output_dir, out_filename)
-
-            sf.write(out_filepath, y_event, sr)
-            count += 1
-        
-        return count - 1 # คืนค่าจำนวนไฟล์ที่หั่นได้
+    p = EXTRACT_PARAMS
+    source_hash = source_hash or file_sha256(input_path)
+
+    # 1. โหลดไฟล์เสียง (ปรับ Sample Rate เป็น 22050 Hz ซึ่งเป็นมาตรฐานสำหรับเสียงนก)
+    y, sr = librosa.load(input_path, sr=p["sr"])
+
+    # 2. Noise Reduction (ทำก่อนเพื่อกำจัดเสียงซ่า/ลมเบื้องหลัง)
+    # prop_decrease=0.8 คือลด noise ลง 80% เพื่อให้ยังพอได้ยินสภาพแวดล้อมบ้าง
+    y_clean = nr.reduce_noise(y=y, sr=sr, prop_decrease=p["prop_decrease"])
+
+    # 3. Normalization (ปรับความดังให้อยู่ในสเกล -1.0 ถึง 1.0)
+    y_norm = librosa.util.normalize(y_clean)
+
+    # 4. Event Detection (หาช่วงที่เสียงดังทะลุเกณฑ์ความเงียบ)
+    # top_db=25: ยิ่งค่าน้อยยิ่งตัดไว (ถ้าพบว่าตัดติดความเงียบมาเยอะไป ให้ลองปรับเป็น 20)
+    raw_intervals = librosa.effects.split(
+        y_norm,
+        top_db=p["top_db"],
+        frame_length=p["frame_length"],
+        hop_length=p["hop_length"]
+    )
+
+    merged_intervals = merge_intervals(raw_intervals, sr, gap_threshold=p["merge_gap"])
+
+    outputs = []
+    padding = int(sr * p["padding"]) # เพิ่มพื้นที่ว่าง หัว-ท้าย
+    for index, (start, end) in enumerate(merged_intervals, start=1):
+        # เช็กความยาว "ดั้งเดิม" ก่อนเพิ่ม Padding
+        # กรอง Event ขยะ: ถ้าเสียงสั้นกว่า 0.3 วินาที มักจะเป็นแค่เสียงไมค์กระแทก หรือนกขยับตัว ข้ามไปเลย
+        if (end - start) < (sr * p["min_duration"]):
+            continue
+
+        # ขยายขอบเขตการหั่น (แต่ไม่ให้เกินขอบเขตของไฟล์จริง) แล้วดึงท่อนเสียงออกมาตามความยาวจริงที่จับได้
+        start_pad = max(0, start - padding)
+        end_pad = min(len(y_norm), end + padding)
+        y_event = y_norm[start_pad:end_pad]
+
+        # 5. เซฟไฟล์ .wav เพื่อนำไปนั่งฟังคัดแยกทีหลัง
+        # ลำดับ index มาจากลำดับของท่อนในไฟล์ต้นฉบับ ชื่อไฟล์จึงไม่ซ้ำกันแม้อยู่ในวินาทีเดียวกัน
+        out_filename = event_filename(file_prefix, source_hash, index, start / sr, end / sr)
+        sf.write(os.path.join(output_dir, out_filename), y_event, sr)
+        outputs.append(out_filename)
+
+    return outputs
+
+def source_prefix(file_path):
+    """ชื่อไฟล์ต้นฉบับ (เช่น q_A_XC104214_call_t_0:59) ตัดส่วนเวลาเดิม (_t_...) ออก
+    เพื่อแทนที่ด้วยเวลาเริ่ม-จบที่แม่นยำจากการหั่นจริง"""
+    raw_name = os.path.splitext(os.path.basename(file_path))[0]
+    return raw_name.split("_t_")[0] if "_t_" in raw_name else raw_name
 
+def extract_source(file_path, output_dir, known_hash=None):
+    """งาน 1 ไฟล์ใน Process ลูก: หั่นเสียงแล้วคืนบันทึกสำหรับ Manifest (ผิดพลาดคืน error แทน)"""
+    entry = {"source": file_path, "params_hash": PARAMS_HASH}
+    try:
+        # อยู่ใน try ด้วย: ไฟล์ต้นฉบับที่ถูกลบ/ย้ายระหว่างรัน กลายเป็น error ของไฟล์นั้น ไม่ทำให้ทั้งรอบหยุด
+        stat = os.stat(file_path)
+        entry.update(size=stat.st_size, mtime=stat.st_mtime)
+        entry["sha256"] = file_sha256(file_path)
+        if known_hash is not None and known_hash == entry["sha256"]:
+            entry["unchanged"] = True # แค่เวลาแก้ไขเปลี่ยน เนื้อไฟล์เหมือนเดิม ไม่ต้องหั่นใหม่
+            return entry
+        entry["outputs"] = process_audio_file(file_path, output_dir, source_prefix(file_path), entry["sha256"])
     except Exception as e:
-        print(f"❌ เกิดข้อผิดพลาดกับไฟล์ {input_path}: {e}")
-        return 0
+        entry["error"] = str(e)
+    return entry
+
+def load_manifest(path):
+    """อ่าน Manifest (JSONL: บรรทัดละไฟล์ต้นฉบับ บรรทัดหลังสุดของไฟล์เดียวกันใช้แทนบรรทัดก่อนหน้า)"""
+    manifest = {}
+    if not os.path.exists(path):
+        return manifest
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue # บรรทัดสุดท้ายที่เขียนไม่ครบตอนถูกขัดจังหวะ
+            manifest[entry["source"]] = entry
+    return manifest
+
+def repair_manifest(path):
+    """ตัดบรรทัดสุดท้ายที่เขียนไม่ครบ (ไม่มีตัวขึ้นบรรทัดปิดท้าย ตอนถูกขัดจังหวะ) ออกก่อนเปิดต่อท้าย
+    ไม่อย่างนั้นบรรทัดแรกของรอบใหม่จะถูกเขียนต่อกันเป็นบรรทัดเสียและหายไปด้วย"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+def remove_legacy_outputs(file_path, output_dir):
+    """ลบไฟล์ที่หั่นด้วยชื่อแบบเก่า (ก่อนมี Manifest: prefix_MM-SS_MM-SS[_NN].wav) ของไฟล์ต้นฉบับนี้
+    กันไม่ให้ไฟล์เดิมซ้ำกับไฟล์ชื่อใหม่ใน 02_interim หลังอัปเกรด (ชื่อแบบใหม่มีแฮชต่อท้ายเสมอ จึงไม่ถูกลบ)"""
+    legacy = re.compile(re.escape(source_prefix(file_path)) + r"_\d{2}-\d{2}_\d{2}-\d{2}(_\d{2})?\.wav")
+    removed = 0
+    for name in os.listdir(output_dir):
+        if legacy.fullmatch(name):
+            os.remove(os.path.join(output_dir, name))
+            removed += 1
+    return removed
+
+def needs_extract(file_path, entry):
+    """ต้องหั่นไฟล์นี้ใหม่หรือไม่: ยังไม่เคยหั่น, เคยผิดพลาด, พารามิเตอร์เปลี่ยน หรือขนาด/เวลาแก้ไขของไฟล์เปลี่ยน"""
+    if entry is None or "error" in entry or entry.get("params_hash") != PARAMS_HASH:
+        return True
+    stat = os.stat(file_path)
+    return stat.st_size != entry["size"] or stat.st_mtime != entry["mtime"]
+
+def remove_outputs(entry, output_dir):
+    """ลบไฟล์ที่หั่นจากไฟล์ต้นฉบับเวอร์ชันก่อน (ไฟล์ที่ถูกย้ายไปคัดแยกแล้วจะไม่อยู่ในโฟลเดอร์นี้ ข้ามไป)"""
+    for name in entry.get("outputs", []):
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except FileNotFoundError:
+            pass
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="หั่นไฟล์เสียงดิบเป็นท่อน Event (ขนานหลาย Process ทำต่อจากครั้งก่อนได้)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="จำนวน Process ที่หั่นเสียงพร้อมกัน")
+    parser.add_argument("--force", action="store_true", help="หั่นใหม่ทุกไฟล์ (ไม่สนผลใน Manifest)")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+
     # กำหนด Path ของโฟลเดอร์ (อิงจาก Root ของโปรเจกต์)
-    raw_dir = "ml_pipeline/data/01_raw"
-    interim_dir = "ml_pipeline/data/02_interim"
+    raw_dir = RAW_DIR
+    interim_dir = INTERIM_DIR
 
     # สร้างโฟลเดอร์อัตโนมัติถ้ายังไม่มี
     os.makedirs(raw_dir, exist_ok=True)
     os.makedirs(interim_dir, exist_ok=True)
 
-    # กวาดหาไฟล์ .wav และ .mp3 ทั้งหมดในโฟลเดอร์ 01_raw
-    audio_files = glob.glob(os.path.join(raw_dir, "*.wav")) + glob.glob(os.path.join(raw_dir, "*.mp3"))
+    # กวาดหาไฟล์ .wav และ .mp3 ทั้งหมดในโฟลเดอร์ 01_raw (เรียงชื่อ ลำดับงานจึงเหมือนเดิมทุกครั้ง)
+    audio_files = sorted(glob.glob(os.path.join(raw_dir, "*.wav")) + glob.glob(os.path.join(raw_dir, "*.mp3")))
 
     if not audio_files:
         print(f"⚠️ ไม่พบไฟล์เสียงในโฟลเดอร์ '{raw_dir}'")
         print("💡 คำแนะนำ: นำไฟล์เสียงจาก Xeno-canto/YouTube ไปวางไว้ในโฟลเดอร์นั้นก่อนรันนะครับ")
         return
-        
-    print(f"🚀 เริ่มต้นกระบวนการหั่นเสียง ({len(audio_files)} ไฟล์)...")
-    
+
+    # ข้ามไฟล์ที่เคยหั่นแล้ว (ไฟล์เดิม + พารามิเตอร์เดิม) ตาม Manifest
+    manifest = {} if args.force else load_manifest(MANIFEST_PATH)
+    todo = [path for path in audio_files if needs_extract(path, manifest.get(path))]
+    print(f"🚀 เริ่มต้นกระบวนการหั่นเสียง ({len(todo)} ไฟล์ใหม่/เปลี่ยนแปลง จากทั้งหมด {len(audio_files)} ไฟล์, {args.workers} Process)...")
+    if not todo:
+        print("✅ ทุกไฟล์หั่นไว้แล้ว ไม่มีอะไรต้องทำ")
+        return
+
+    # ไฟล์ต้นฉบับที่ไม่มีใน Manifest อาจเคยหั่นด้วยสคริปต์เวอร์ชันก่อน ลบไฟล์ชื่อแบบเก่าก่อนหั่นใหม่
+    legacy_removed = sum(remove_legacy_outputs(path, interim_dir) for path in todo if path not in manifest)
+    if legacy_removed:
+        print(f"🧹 ลบไฟล์ที่หั่นด้วยชื่อแบบเก่า {legacy_removed} ไฟล์ (จะถูกหั่นใหม่ด้วยชื่อแบบใหม่)")
+
+    repair_manifest(MANIFEST_PATH)
     total_extracted = 0
-    # วนลูปประมวลผลทีละไฟล์ พร้อมแสดง Progress Bar สวยๆ
-    for file_path in tqdm(audio_files, desc="Processing Audio"):
-        # ดึงชื่อไฟล์ต้นฉบับออกมา (เช่น q_A_XC104214_call_t_0:59)
-        raw_name = os.path.splitext(os.path.basename(file_path))[0]        
-        # ปรับปรุง: ตัดส่วนเวลาเดิม (_t_...) ออก เพื่อแทนที่ด้วยเวลาเริ่ม-จบที่แม่นยำจากการหั่นจริง
-        clean_prefix = raw_name.split("_t_")[0] if "_t_" in raw_name else raw_name
-
-        # เรียกฟังก์ชันหลักโดยส่ง clean_prefix เข้าไป
-        extracted_count = process_audio_file(file_path, interim_dir, clean_prefix)
-        total_extracted += extracted_count
-        
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, open(MANIFEST_PATH, "a", encoding="utf-8") as log:
+        futures = []
+        for file_path in todo:
+            previous = manifest.get(file_path)
+            # ไฟล์ที่พารามิเตอร์เดิมแต่เวลาแก้ไขเปลี่ยน ตรวจแฮชก่อนว่าเนื้อไฟล์เปลี่ยนจริงหรือไม่
+            known_hash = previous.get("sha256") if previous and previous.get("params_hash") == PARAMS_HASH and "error" not in previous else None
+            futures.append(pool.submit(extract_source, file_path, interim_dir, known_hash))
+
+        # แสดง Progress Bar ตามงานที่เสร็จ (ไม่ต้องรอตามลำดับ)
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing Audio"):
+            entry = future.result()
+            previous = manifest.get(entry["source"])
+            if entry.pop("unchanged", False):
+                entry["outputs"] = previous.get("outputs", [])
+            elif "error" in entry:
+                print(f"❌ เกิดข้อผิดพลาดกับไฟล์ {entry['source']}: {entry['error']}")
+            else:
+                # ลบไฟล์ที่หั่นจากเวอร์ชันก่อนที่ไม่มีในผลใหม่ (ชื่อคงที่ ไฟล์ที่ชื่อตรงกันถูกเขียนทับแล้ว)
+                if previous:
+                    stale = {"outputs": [name for name in previous.get("outputs", []) if name not in entry["outputs"]]}
+                    remove_outputs(stale, interim_dir)
+                total_extracted += len(entry["outputs"])
+
+            # บันทึกลง Manifest ทันทีที่แต่ละไฟล์เสร็จ ถ้าถูกขัดจังหวะ รอบหน้าทำต่อจากไฟล์ที่ค้าง
+            log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            log.flush()
+
     print(f"\n✅ เสร็จสิ้นกระบวนการทั้งหมด!")
     print(f"🎉 ได้ไฟล์เสียงย่อยออกมาทั้งหมด {total_extracted} ไฟล์")
     print(f"📂 เชิญเข้าไปนั่งฟังและคัดแยกไฟล์ได้ที่โฟลเดอร์: {interim_dir}")
@@ -1,10 +1,16 @@
 import os
+import sys
+import json
+import argparse
 import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Input, Conv2D, MaxPooling2D, Flatten, Dense, Dropout
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from input_pipeline import make_dataset
+from augment import AUGMENT_PARAMS
+
 # --- 1. ตั้งค่าไฮเปอร์พารามิเตอร์ (ตามสเปกในรายงาน) ---
 IMG_HEIGHT = 128    # ความสูงภาพ [cite: 320]
 IMG_WIDTH = 130     # ความกว้างภาพ [cite: 320]
@@ -12,37 +18,28 @@ CHANNELS = 1        # สีขาวดำ (1 Channel) [cite: 320]
 BATCH_SIZE = 32     # จำนวนข้อมูลต่อรอบ [cite: 320]
 EPOCHS = 50         # จำนวนรอบสูงสุด [cite: 320]
 
-# ชี้เป้าไปที่โฟลเดอร์ใหม่ที่เราเพิ่งจัดกลุ่มเสร็จ
-TRAIN_DIR = "ml_pipeline/data/dataset_spectrograms/train"
-VAL_DIR = "ml_pipeline/data/dataset_spectrograms/val"
 MODEL_SAVE_PATH = "ml_pipeline/models/bird_song_model.keras"
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="เทรนโมเดล CNN แยกเสียงนกร้อง/เสียงรบกวน")
+    parser.add_argument("--no-augment", action="store_true", help="ปิด augmentation ระหว่างเทรน")
+    parser.add_argument("--augment", default=None,
+                        help='ค่าตั้ง augmentation ของการทดลองนี้ (JSON ทับค่าเริ่มต้น เช่น \'{"noise_prob": 0.8}\')')
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     print("🚀 กำลังเตรียมข้อมูลภาพเข้าสู่ระบบ (แบบไร้ Data Leakage)...")
-    
-    # --- 2. สร้าง Data Generator (ดึงจากโฟลเดอร์ตรงๆ ไม่ง้อ validation_split) ---
-    # แค่ปรับสเกลสีให้เป็น 0-1 ก็พอครับ
-    datagen = ImageDataGenerator(rescale=1./255)
 
-    # โหลดชุดข้อมูลฝึกสอน (Training Set)
-    train_generator = datagen.flow_from_directory(
-        TRAIN_DIR,
-        target_size=(IMG_HEIGHT, IMG_WIDTH),
-        color_mode='grayscale',          
-        batch_size=BATCH_SIZE,
-        class_mode='sparse',             
-        shuffle=True
-    )
-
-    # โหลดชุดข้อมูลตรวจสอบ (Validation Set)
-    val_generator = datagen.flow_from_directory(
-        VAL_DIR,
-        target_size=(IMG_HEIGHT, IMG_WIDTH),
-        color_mode='grayscale',
-        batch_size=BATCH_SIZE,
-        class_mode='sparse',
-        shuffle=False # ข้อสอบไม่ต้องสับไพ่
-    )
+    # --- 2. สร้าง Input pipeline แบบ tf.data (อ่านขนาน + cache + prefetch) ---
+    # ใช้ชุดข้อมูลแบบ memory-mapped (packed_dataset.py) ถ้าสร้างไว้แล้ว ไม่อย่างนั้นอ่านภาพ PNG จากโฟลเดอร์
+    # ภาพถูก cache ในหน่วยความจำหลัง Epoch แรก และสับลำดับด้วย seed คงที่ (ผลเทรนซ้ำได้)
+    # Augmentation ทำทีละ batch บนภาพระหว่างเทรนเฉพาะชุด Train (ไม่ต้องเขียนไฟล์เสียงเพิ่มใน 01_5)
+    augment_params = None if args.no_augment else {**AUGMENT_PARAMS, **json.loads(args.augment or "{}")}
+    train_ds, train_labels, _ = make_dataset("train", BATCH_SIZE, shuffle=True, seed=args.seed, augment_params=augment_params)
+    val_ds, _, _ = make_dataset("val", BATCH_SIZE, shuffle=False) # ข้อสอบไม่ต้องสับไพ่
+    print(f"📦 ข้อมูล Train {len(train_labels)} ภาพ (Augmentation: {augment_params if augment_params else 'ปิด'})")
 
     # --- 3. สร้างสถาปัตยกรรมโมเดล 2D CNN ---
     print("🧠 กำลังสร้างโครงข่ายประสาทเทียม (Custom 2D CNN)...")
@@ -88,8 +85,8 @@ def main():
     print("🔥 เริ่มต้นกระบวนการฝึกสอน AI ของจริง!")
     
     history = model.fit(
-        train_generator,
-        validation_data=val_generator,
+        train_ds,
+        validation_data=val_ds,
         epochs=EPOCHS,
         callbacks=[checkpoint, early_stop],
         verbose=1 
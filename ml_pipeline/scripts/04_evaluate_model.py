@@ -1,18 +1,20 @@
 import os
+import sys
 import numpy as np
 import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from sklearn.metrics import confusion_matrix, accuracy_score, precision_score, recall_score, f1_score
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from input_pipeline import make_dataset
+
 # --- 1. ตั้งค่าพื้นฐาน ---
 IMG_HEIGHT = 128
 IMG_WIDTH = 130
 BATCH_SIZE = 32
 
 MODEL_PATH = "ml_pipeline/models/bird_song_model.keras"
-TEST_DIR = "ml_pipeline/data/dataset_spectrograms/test"
 CM_SAVE_PATH = "ml_pipeline/models/confusion_matrix.png" # ที่เซฟรูปกราฟ
 
 def main():
@@ -24,25 +26,15 @@ def main():
         return
     model = tf.keras.models.load_model(MODEL_PATH)
     
-    # เตรียมข้อมูล Test (หาร 255 อย่างเดียว ห้ามทำ Augment และ ห้าม Shuffle)
-    datagen = ImageDataGenerator(rescale=1./255)
-    test_generator = datagen.flow_from_directory(
-        TEST_DIR,
-        target_size=(IMG_HEIGHT, IMG_WIDTH),
-        color_mode='grayscale',
-        batch_size=BATCH_SIZE,
-        class_mode='sparse',
-        shuffle=False # สำคัญมาก! ต้อง False เพื่อให้เฉลยตรงกับลำดับไฟล์
-    )
+    # เตรียมข้อมูล Test (หาร 255 อย่างเดียว ห้ามทำ Augment และ ห้าม Shuffle เพื่อให้เฉลยตรงกับลำดับไฟล์)
+    test_ds, y_true, class_names = make_dataset("test", BATCH_SIZE, shuffle=False, cache=None) # ['0_noise', '1_singing']
     
     # --- 2. ให้ AI ทำข้อสอบ ---
     print("\n🤖 กำลังให้ AI ทำนายผลจากภาพที่ทดสอบ...")
-    predictions = model.predict(test_generator, verbose=1)
+    predictions = model.predict(test_ds, verbose=1)
     
     # แปลงความน่าจะเป็นให้เป็นคลาสที่โมเดลเลือก (0 หรือ 1)
     y_pred = np.argmax(predictions, axis=1)
-    y_true = test_generator.classes # เฉลยที่ถูกต้อง
-    class_names = list(test_generator.class_indices.keys()) # ['0_noise', '1_singing']
 
     # --- 3. คำนวณตัวชี้วัดประสิทธิภาพ (Evaluation Metrics) ---
     print("\n📊 --- ผลการทดสอบประสิทธิภาพของโมเดล ---")
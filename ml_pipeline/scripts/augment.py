@@ -0,0 +1,89 @@
+"""
+Augmentation แบบทำทีละ batch บนภาพ Mel-spectrogram ระหว่างเทรน (แทนการเขียนไฟล์ WAV _pitch/_stretch/_noise ลงดิสก์)
+
+ทำงานบน Input ของโมเดล (B x 128 x 130 x 1 สเกล 0-1 แถวบนสุด = ความถี่สูงสุด) ด้วย TensorFlow ทั้ง batch พร้อมกัน:
+  - noise       : เติม Gaussian noise (แทน add_noise)
+  - freq_shift  : เลื่อนภาพตามแกน Mel ขึ้น/ลงไม่เกิน N แถบ (ใกล้เคียง pitch_shift)
+  - time_stretch: ยืด/หดแกนเวลาด้วยการ resample คอลัมน์แบบ linear (ใกล้เคียง time_stretch)
+  - gain        : ปรับช่วงความดัง (dynamic range) เทียบกับจุดที่ดังที่สุด
+    (ภาพถูก normalize ต่อภาพตามค่าสูงสุด การคูณ gain ตรงๆ จึงไม่มีผล ใช้การยืด/หดช่วง dB แทน)
+
+แต่ละวิธีสุ่มทำต่อภาพตามความน่าจะเป็น *_prob สุ่มแบบ stateless จาก seed ของ batch (ผลซ้ำได้ทุกครั้งด้วย seed เดิม)
+"""
+import tensorflow as tf
+
+AUGMENT_PARAMS = {
+    "noise_std": 0.02,          # ส่วนเบี่ยงเบนมาตรฐานของ noise (สเกลพิกเซล 0-1)
+    "noise_prob": 0.5,
+    "freq_shift_max": 4,        # เลื่อนได้สูงสุดกี่แถบ Mel
+    "freq_shift_prob": 0.5,
+    "time_stretch_max": 0.1,    # อัตรายืด/หด 1 ± ค่านี้
+    "time_stretch_prob": 0.5,
+    "gain_max": 0.2,            # ช่วง dB คูณด้วย 1 ± ค่านี้
+    "gain_prob": 0.5,
+}
+
+def _coin(seed, batch, prob):
+    """สุ่มว่าภาพไหนใน batch จะถูกทำ augmentation (B x 1 x 1 x 1)"""
+    return tf.reshape(tf.random.stateless_uniform([batch], seed) < prob, [-1, 1, 1, 1])
+
+def _uniform(seed, batch, low, high):
+    return tf.random.stateless_uniform([batch], seed, minval=low, maxval=high)
+
+def add_noise(x, seed, std):
+    return tf.clip_by_value(x + tf.random.stateless_normal(tf.shape(x), seed, stddev=std), 0.0, 1.0)
+
+def freq_shift(x, seed, max_shift):
+    """เลื่อนแต่ละภาพตามแกนความถี่ไม่เท่ากัน แถวที่ว่างจากการเลื่อนเติมเป็นความเงียบ (0)"""
+    batch, height = tf.shape(x)[0], tf.shape(x)[1]
+    shift = tf.random.stateless_uniform([batch, 1], seed, minval=-max_shift, maxval=max_shift + 1, dtype=tf.int32)
+    source = tf.range(height)[tf.newaxis, :] - shift
+    valid = (source >= 0) & (source < height)
+    shifted = tf.gather(x, tf.clip_by_value(source, 0, height - 1), axis=1, batch_dims=1)
+    return tf.where(valid[:, :, tf.newaxis, tf.newaxis], shifted, 0.0)
+
+def time_stretch(x, seed, max_rate):
+    """ยืด/หดแต่ละภาพตามแกนเวลา (คอลัมน์ j อ่านจากคอลัมน์ j * rate ของภาพเดิม แบบ linear) เกินท้ายภาพเป็นความเงียบ"""
+    batch, width = tf.shape(x)[0], tf.shape(x)[2]
+    rate = _uniform(seed, batch, 1.0 - max_rate, 1.0 + max_rate)
+    position = tf.cast(tf.range(width), tf.float32)[tf.newaxis, :] * rate[:, tf.newaxis]
+    left = tf.floor(position)
+    weight = (position - left)[:, tf.newaxis, :, tf.newaxis]
+    left = tf.cast(left, tf.int32)
+    last = width - 1
+    x0 = tf.gather(x, tf.clip_by_value(left, 0, last), axis=2, batch_dims=1)
+    x1 = tf.gather(x, tf.clip_by_value(left + 1, 0, last), axis=2, batch_dims=1)
+    valid = (position <= tf.cast(last, tf.float32))[:, tf.newaxis, :, tf.newaxis]
+    return tf.where(valid, x0 * (1.0 - weight) + x1 * weight, 0.0)
+
+def random_gain(x, seed, max_gain):
+    """ยืด/หดช่วงความดังเทียบกับจุดที่ดังที่สุด (1.0) เหมือนเสียงที่อัดด้วยระดับเสียงรบกวนพื้นหลังต่างกัน"""
+    gain = tf.reshape(_uniform(seed, tf.shape(x)[0], 1.0 - max_gain, 1.0 + max_gain), [-1, 1, 1, 1])
+    return tf.clip_by_value(1.0 - (1.0 - x) * gain, 0.0, 1.0)
+
+def augment_batch(x, seed, params=AUGMENT_PARAMS):
+    """ทำ augmentation ทั้ง batch (seed: tensor int ขนาด 2) ภาพที่ไม่ถูกสุ่มให้ทำคงค่าเดิม"""
+    seeds = tf.random.experimental.stateless_split(seed, num=8)
+    batch = tf.shape(x)[0]
+    steps = [
+        ("time_stretch", lambda x, s: time_stretch(x, s, params["time_stretch_max"])),
+        ("freq_shift", lambda x, s: freq_shift(x, s, params["freq_shift_max"])),
+        ("gain", lambda x, s: random_gain(x, s, params["gain_max"])),
+        ("noise", lambda x, s: add_noise(x, s, params["noise_std"])),
+    ]
+    for i, (name, fn) in enumerate(steps):
+        prob = params.get(f"{name}_prob", 0.0)
+        if prob <= 0:
+            continue
+        x = tf.where(_coin(seeds[2 * i], batch, prob), fn(x, seeds[2 * i + 1]), x)
+    return x
+
+def apply(ds, params=AUGMENT_PARAMS, seed=42):
+    """เพิ่มขั้นตอน augmentation ให้ tf.data ที่ batch แล้ว (x, y) โดย seed ของแต่ละ batch มาจาก
+    Dataset.random(seed) ที่สุ่มใหม่ทุก Epoch (แต่ละ Epoch ได้ภาพต่างกัน แต่รันซ้ำด้วย seed เดิมได้ผลเดิม)"""
+    params = {**AUGMENT_PARAMS, **(params or {})}
+    seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True).batch(2)
+    return tf.data.Dataset.zip((ds, seeds)).map(
+        lambda batch, s: (augment_batch(batch[0], s, params), batch[1]),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
@@ -0,0 +1,118 @@
+"""
+ตรวจสอบว่า Input ที่คำนวณจาก NumPy (backend/services/features.py) ให้ค่าเดียวกับเส้นทางเดิมที่วาดภาพ PNG
+
+เทียบ 2 แบบ:
+  1. serving  : เส้นทางเดิมของเซิร์ฟเวอร์ (เติมท้าย, fmax=8000) -> PNG -> load_img -> / 255
+  2. training : 02_make_spectrograms.py (เติมสองฝั่ง, ไม่กำหนด fmax) -> PNG -> load_img -> / 255
+และตรวจภาพ PNG จาก backend/services/renderer.py (ไม่ใช้ matplotlib) ว่าได้พิกเซลเดียวกับ specshow ด้วย
+สุดท้ายตรวจว่า EventFeatures (Mel / RMS ที่คำนวณครั้งเดียวแล้วใช้ร่วมกัน) ตรงกับการคำนวณแยกทีละขั้นตอนแบบเดิมทุกบิต
+
+วิธีใช้ (รันจาก Root ของโปรเจกต์):
+    python -m ml_pipeline.scripts.check_mel_tensor [โฟลเดอร์ไฟล์ .wav]
+ถ้าไม่ระบุโฟลเดอร์ จะสร้างเสียงสังเคราะห์มาทดสอบแทน
+"""
+import io
+import os
+import sys
+import tempfile
+import numpy as np
+import librosa
+import librosa.display
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from PIL import Image
+
+from backend.services.features import (
+    HOP_LENGTH, N_FRAMES, N_MELS, FMAX, EventFeatures, fit_length, mel_db, mel_tensor, db_to_pixels, pixels_to_tensor,
+)
+from backend.services.renderer import spectrogram_png
+
+SR, DURATION = 22050, 3.0
+TOLERANCE = 2 / 255  # ยอมให้ต่างได้ไม่เกิน 2 ระดับสี (จากการปัดเศษตอน matplotlib แปลงสี)
+
+def png_to_tensor(path_or_file):
+    """อ่านภาพแบบ load_img(color_mode='grayscale') -> / 255"""
+    img = Image.open(path_or_file).convert('L')
+    if img.size != (N_FRAMES, N_MELS):
+        img = img.resize((N_FRAMES, N_MELS), Image.NEAREST)
+    return np.asarray(img, dtype=np.float32)[..., np.newaxis] / 255.0
+
+def render_png_tensor(S_dB, save_path):
+    """วาดภาพแบบเดียวกับเซิร์ฟเวอร์เดิม / 02_make_spectrograms.py แล้วอ่านกลับแบบ load_img"""
+    fig = plt.figure(figsize=(1.30, 1.28), dpi=100)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.axis('off')
+    librosa.display.specshow(S_dB, sr=SR, hop_length=HOP_LENGTH, cmap='gray', ax=ax)
+    plt.savefig(save_path, bbox_inches='tight', pad_inches=0, dpi=100, format='png')
+    plt.close(fig)
+    return png_to_tensor(save_path)
+
+def legacy_rms(y):
+    """RMS envelope แบบเดิมใน syllable_envelope (Normalize ท่อน -> librosa.feature.rms)"""
+    if np.max(np.abs(y)) > 0:
+        y = librosa.util.normalize(y)
+    return librosa.feature.rms(y=y, frame_length=2048, hop_length=512)[0]
+
+def check_event_features(name, y) -> bool:
+    """EventFeatures ต้องให้ Input ของ AI, ภาพ spec.png และ RMS ของการนับพยางค์ เท่ากับการคำนวณแยกแบบเดิมทุกบิต"""
+    features = EventFeatures(y, SR, DURATION)
+    checks = {
+        "tensor": np.array_equal(features.tensor, mel_tensor(y, SR, DURATION)),
+        "spec_png": spectrogram_png(features.mel_db) == spectrogram_png(mel_db(fit_length(y, int(SR * DURATION)), SR)),
+        "rms": np.array_equal(features.rms, legacy_rms(y)),
+    }
+    print(f"{name:<32} features " + "  ".join(f"{key}={'ok' if ok else 'DIFF'}" for key, ok in checks.items()))
+    return all(checks.values())
+
+def synthetic_clips(n=8, seed=0):
+    """เสียงสังเคราะห์: ชุดพยางค์โทนเดียวความยาวต่างๆ + Noise"""
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        length = rng.uniform(0.5, 4.0)
+        t = np.arange(int(SR * length)) / SR
+        tone = np.sin(2 * np.pi * rng.uniform(1500, 4000) * t) * (np.sin(2 * np.pi * 8 * t) > 0)
+        yield f"synthetic_{i:02d}", (tone + 0.05 * rng.standard_normal(len(t))).astype(np.float32)
+
+def wav_clips(folder):
+    for name in sorted(os.listdir(folder)):
+        if name.endswith('.wav'):
+            y, _ = librosa.load(os.path.join(folder, name), sr=SR)
+            yield name, y
+
+def main():
+    clips = list(wav_clips(sys.argv[1]) if len(sys.argv) > 1 else synthetic_clips())
+    variants = {
+        "serving": dict(center=False, fmax=FMAX),
+        "training": dict(center=True, fmax=None),
+    }
+    worst = 0.0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        png_path = os.path.join(tmp_dir, "spec.png")
+        for name, y in clips:
+            for variant, opts in variants.items():
+                y_fit = fit_length(y, int(SR * DURATION), center=opts["center"])
+                S_dB = mel_db(y_fit, SR, fmax=opts["fmax"])
+
+                expected = render_png_tensor(S_dB, png_path)
+                outputs = {
+                    "tensor": pixels_to_tensor(db_to_pixels(S_dB)),
+                    "png": png_to_tensor(io.BytesIO(spectrogram_png(S_dB))),
+                }
+                for source, actual in outputs.items():
+                    diff = np.abs(expected - actual)
+                    worst = max(worst, float(diff.max()))
+                    print(f"{name:<32} {variant:<8} {source:<6} max={diff.max() * 255:.1f}/255 mean={diff.mean() * 255:.3f}/255")
+
+    if worst > TOLERANCE:
+        print(f"❌ ค่าต่างกันเกินเกณฑ์ ({worst * 255:.1f}/255)")
+        sys.exit(1)
+
+    if not all([check_event_features(name, y) for name, y in clips]):
+        print("❌ EventFeatures ให้ค่าต่างจากการคำนวณแยกทีละขั้นตอน")
+        sys.exit(1)
+    print(f"✅ Input จาก NumPy และภาพจาก renderer ตรงกับภาพ PNG เดิม (ต่างกันสูงสุด {worst * 255:.1f}/255)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Input pipeline แบบ tf.data สำหรับเทรน/ประเมินผลโมเดล (แทน ImageDataGenerator.flow_from_directory)
+
+- อ่านจากชุดข้อมูล memory-mapped (packed_dataset.py) ถ้าสร้างไว้แล้ว ไม่อย่างนั้นอ่านภาพ PNG จากโฟลเดอร์
+- ถอดรหัส/อ่านภาพขนานกันหลาย Thread (map + AUTOTUNE)
+- cache() ภาพ uint8 ไว้ในหน่วยความจำ (หรือไฟล์บนดิสก์) หลัง Epoch แรกไม่ต้องอ่านจากดิสก์ซ้ำ
+- สับลำดับแบบกำหนด seed (ผลซ้ำได้ทุกครั้ง) และ prefetch ให้ CPU เตรียม batch ถัดไประหว่างโมเดลคำนวณ
+
+วัด Throughput เทียบกับแบบเดิม (รันจาก Root ของโปรเจกต์):
+    python ml_pipeline/scripts/input_pipeline.py [--split train] [--epochs 3]
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from packed_dataset import PACKED_DIR, CLASSES, IMG_HEIGHT, IMG_WIDTH, load_split
+import augment
+
+SPECTROGRAM_DIR = "ml_pipeline/data/dataset_spectrograms"
+BATCH_SIZE = 32
+SEED = 42
+AUTOTUNE = tf.data.AUTOTUNE
+
+def has_packed(base_dir=PACKED_DIR):
+    return os.path.exists(os.path.join(base_dir, "meta.json"))
+
+def _packed_source(split):
+    """(ชุดภาพ uint8 ทีละภาพ, label) จาก memmap: แต่ละ Thread อ่านแถวของตัวเองจากไฟล์เดียวกัน"""
+    data = load_split(split)
+
+    def read_row(i):
+        return np.asarray(data.images[data.rows[i]])
+
+    def load(i):
+        pixels = tf.numpy_function(read_row, [i], tf.uint8)
+        pixels.set_shape((IMG_HEIGHT, IMG_WIDTH))
+        return pixels
+
+    indices = tf.data.Dataset.range(len(data))
+    images = indices.map(load, num_parallel_calls=AUTOTUNE)
+    return images, data.labels, data.classes
+
+def _png_source(split):
+    """(ชุดภาพ uint8 ทีละภาพ, label) จากโฟลเดอร์ภาพ PNG แบบเดียวกับ flow_from_directory (label ตามลำดับชื่อโฟลเดอร์)"""
+    paths, labels = [], []
+    for label, cls in enumerate(CLASSES):
+        files = sorted(glob.glob(os.path.join(SPECTROGRAM_DIR, split, cls, "*.png")))
+        paths.extend(files)
+        labels.extend([label] * len(files))
+
+    def load(path):
+        image = tf.io.decode_png(tf.io.read_file(path), channels=1)
+        # ภาพจาก savefig อาจคลาดขนาดไป 1 พิกเซล ปรับแบบ nearest เหมือน load_img(target_size=...)
+        image = tf.image.resize(image, (IMG_HEIGHT, IMG_WIDTH), method="nearest")
+        return tf.cast(tf.squeeze(image, -1), tf.uint8)
+
+    images = tf.data.Dataset.from_tensor_slices(paths).map(load, num_parallel_calls=AUTOTUNE)
+    return images, np.asarray(labels, dtype=np.int32), list(CLASSES)
+
+def _to_input(pixels, label):
+    """uint8 -> Input ของโมเดล (สูง x กว้าง x 1) สเกล 0-1 เหมือน rescale=1/255"""
+    return tf.cast(pixels, tf.float32)[..., tf.newaxis] / 255.0, label
+
+def make_dataset(split, batch_size=BATCH_SIZE, shuffle=False, seed=SEED, cache="", augment_params=None):
+    """ชุดข้อมูล tf.data ของ split หนึ่ง คืน (dataset, labels ตามลำดับเมื่อไม่สับ, ชื่อคลาส)
+    cache: "" = เก็บในหน่วยความจำ, path = เก็บเป็นไฟล์บนดิสก์, None = ไม่ cache
+    augment_params: ค่าตั้ง augmentation (ดู augment.AUGMENT_PARAMS) ทำทีละ batch หลัง cache จึงต่างกันทุก Epoch"""
+    images, labels, classes = _packed_source(split) if has_packed() else _png_source(split)
+
+    ds = tf.data.Dataset.zip((images, tf.data.Dataset.from_tensor_slices(labels)))
+    if cache is not None:
+        # cache ภาพ uint8 (ก่อนแปลงเป็น float32) ใช้หน่วยความจำน้อยกว่า 4 เท่า
+        ds = ds.cache(cache)
+    if shuffle:
+        ds = ds.shuffle(len(labels), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(_to_input, num_parallel_calls=AUTOTUNE)
+    if augment_params is not None:
+        ds = augment.apply(ds, augment_params, seed)
+
+    options = tf.data.Options()
+    options.deterministic = True  # ลำดับข้อมูลเหมือนเดิมทุกครั้งแม้ map ขนาน
+    return ds.with_options(options).prefetch(AUTOTUNE), labels, classes
+
+def measure_throughput(ds, epochs=3) -> list:
+    """วัดจำนวนภาพต่อวินาทีของแต่ละ Epoch (Epoch แรกรวมเวลาอ่านจากดิสก์ Epoch ถัดไปอ่านจาก cache)"""
+    rates = []
+    for _ in range(epochs):
+        start = time.perf_counter()
+        count = 0
+        for x, _ in ds:
+            count += int(x.shape[0])
+        rates.append(count / (time.perf_counter() - start))
+    return rates
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput ของ Input pipeline (ภาพ/วินาที)")
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--augment", action="store_true", help="รวมเวลา augmentation แบบ batch ด้วย")
+    args = parser.parse_args()
+
+    ds, labels, _ = make_dataset(args.split, args.batch_size, shuffle=True,
+                                 augment_params=augment.AUGMENT_PARAMS if args.augment else None)
+    source = "memory-mapped" if has_packed() else "PNG"
+    print(f"📊 tf.data ({source}, {len(labels)} ภาพ)")
+    for epoch, rate in enumerate(measure_throughput(ds, args.epochs), start=1):
+        print(f"   Epoch {epoch}: {rate:10.1f} ภาพ/วินาที")
+
+    split_dir = os.path.join(SPECTROGRAM_DIR, args.split)
+    if os.path.isdir(split_dir):
+        from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+        generator = ImageDataGenerator(rescale=1./255).flow_from_directory(
+            split_dir, target_size=(IMG_HEIGHT, IMG_WIDTH), color_mode='grayscale',
+            batch_size=args.batch_size, class_mode='sparse', shuffle=True, seed=SEED,
+        )
+        print(f"📊 ImageDataGenerator (แบบเดิม, {generator.samples} ภาพ)")
+        for epoch in range(1, args.epochs + 1):
+            start = time.perf_counter()
+            for _ in range(len(generator)):
+                next(generator)
+            print(f"   Epoch {epoch}: {generator.samples / (time.perf_counter() - start):10.1f} ภาพ/วินาที")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+ชุดข้อมูล Mel-spectrogram แบบไฟล์เดียวต่อ split (memory-mapped uint8) แทนภาพ PNG หลายพันไฟล์
+
+เก็บที่ ml_pipeline/data/dataset_packed/
+  meta.json        : ขนาดภาพ, ชื่อคลาส และพารามิเตอร์ที่ใช้สร้าง (เปลี่ยนเมื่อไหร่สร้างใหม่ทั้งหมด)
+  <split>.u8       : พิกเซลทุกภาพต่อกัน (N x 128 x 130, uint8 ค่าเดียวกับภาพ PNG ที่ 02_make_spectrograms.py วาด)
+  <split>.csv      : แถวละภาพ: ลำดับใน .u8, path ของไฟล์เสียง, label, ขนาด/เวลาแก้ไขของไฟล์ และสถานะ active
+
+สร้างแบบขนานและทำเพิ่มเฉพาะไฟล์ใหม่ (ไฟล์ที่ถูกแก้/ลบจะถูกปิด active แล้วต่อท้ายใหม่ ใช้ --compact เพื่อเก็บกวาด)
+ตอนเทรน/ประเมินผลอ่านผ่าน np.memmap ไม่ต้องถอดรหัส PNG ทุก Epoch
+
+วิธีใช้ (รันจาก Root ของโปรเจกต์):
+    python -m ml_pipeline.scripts.packed_dataset [--workers 8] [--compact]
+"""
+import os
+import csv
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+INPUT_BASE_DIR = "ml_pipeline/data/dataset_audio"
+PACKED_DIR = "ml_pipeline/data/dataset_packed"
+SPLITS = ["train", "val", "test"]
+CLASSES = ["0_noise", "1_singing"]   # ลำดับเดียวกับ flow_from_directory (เรียงตามชื่อโฟลเดอร์)
+
+IMG_HEIGHT, IMG_WIDTH = 128, 130
+# ตรงกับ 02_make_spectrograms.py: เสียง 3 วินาที เติม/ตัดสองฝั่งเท่ากัน ไม่กำหนด fmax
+BUILD_PARAMS = {"sr": 22050, "duration": 3.0, "center": True, "fmax": None, "shape": [IMG_HEIGHT, IMG_WIDTH]}
+INDEX_FIELDS = ["row", "path", "label", "size", "mtime", "active"]
+
+def _paths(split, base_dir=PACKED_DIR):
+    return os.path.join(base_dir, f"{split}.u8"), os.path.join(base_dir, f"{split}.csv")
+
+def read_index(index_path):
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def write_index(index_path, rows):
+    """เขียน index ใหม่ทั้งไฟล์แบบ atomic (ถูกขัดจังหวะกลางทาง index เดิมยังใช้ได้)"""
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, index_path)
+
+# --- ส่วนโหลดข้อมูล (ใช้ตอนเทรน/ประเมินผล ต้องการแค่ NumPy) ---
+
+class PackedSplit:
+    """ข้อมูล 1 split: images เป็น memmap (ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ) เลือกเฉพาะแถวที่ active"""
+
+    def __init__(self, split, base_dir=PACKED_DIR):
+        data_path, index_path = _paths(split, base_dir)
+        rows = read_index(index_path)
+        if not rows:
+            raise FileNotFoundError(f"ไม่พบชุดข้อมูล {split} ที่ {base_dir} (รัน packed_dataset ก่อน)")
+
+        with open(os.path.join(base_dir, "meta.json"), encoding="utf-8") as f:
+            self.classes = json.load(f)["classes"]
+        total = os.path.getsize(data_path) // (IMG_HEIGHT * IMG_WIDTH)
+        self.images = np.memmap(data_path, dtype=np.uint8, mode="r", shape=(total, IMG_HEIGHT, IMG_WIDTH))
+
+        active = [row for row in rows if row["active"] == "1"]
+        self.rows = np.array([int(row["row"]) for row in active], dtype=np.int64)
+        self.labels = np.array([int(row["label"]) for row in active], dtype=np.int32)
+        self.paths = [row["path"] for row in active]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def pixels(self, idx):
+        """พิกเซล uint8 ของแถวที่เลือก (slice ของแถวที่เรียงต่อกันในไฟล์ได้ view แบบ zero-copy จาก memmap)"""
+        rows = self.rows[idx]
+        if isinstance(idx, slice) and len(rows) and rows[-1] - rows[0] == len(rows) - 1:
+            return self.images[rows[0]:rows[-1] + 1]
+        return self.images[rows]
+
+    def batch(self, idx):
+        """Input ของโมเดล (B x 128 x 130 x 1, สเกล 0-1 เหมือน rescale=1/255) และ label ของแถวที่เลือก"""
+        x = np.asarray(self.pixels(idx), dtype=np.float32)[..., np.newaxis] / 255.0
+        return x, self.labels[idx]
+
+def load_split(split, base_dir=PACKED_DIR):
+    return PackedSplit(split, base_dir)
+
+# --- ส่วนสร้างชุดข้อมูล ---
+
+def clip_pixels(audio_path):
+    """รันใน Process ลูก: ไฟล์เสียง -> ภาพ Mel-spectrogram uint8 แบบเดียวกับ 02_make_spectrograms.py"""
+    import librosa
+    from backend.services.features import fit_length, mel_db, db_to_pixels
+
+    p = BUILD_PARAMS
+    y, sr = librosa.load(audio_path, sr=p["sr"])
+    y = fit_length(y, int(p["sr"] * p["duration"]), center=p["center"])
+    return db_to_pixels(mel_db(y, sr, fmax=p["fmax"]))
+
+def scan_sources(split):
+    """ไฟล์เสียงทั้งหมดของ split: [(path, label)] เรียงตามคลาสและชื่อไฟล์"""
+    sources = []
+    for label, cls in enumerate(CLASSES):
+        in_dir = os.path.join(INPUT_BASE_DIR, split, cls)
+        if os.path.isdir(in_dir):
+            sources.extend((os.path.join(in_dir, f), label) for f in sorted(os.listdir(in_dir)) if f.endswith(".wav"))
+    return sources
+
+def whole_rows(data_path) -> int:
+    """จำนวนแถว (ภาพ) ที่เขียนครบในไฟล์ข้อมูล ถ้ารอบก่อนถูกหยุดกลางการเขียนภาพ ตัดเศษ byte ของภาพที่ไม่ครบทิ้ง
+    ไม่อย่างนั้นทุกแถวที่ต่อท้ายหลังจากนี้จะเลื่อนตำแหน่งไปตามเศษนั้น และอ่านได้เป็นภาพเสียทั้งหมด"""
+    if not os.path.exists(data_path):
+        return 0
+    row_bytes = IMG_HEIGHT * IMG_WIDTH
+    size = os.path.getsize(data_path)
+    if size % row_bytes:
+        os.truncate(data_path, size - size % row_bytes)
+    return size // row_bytes
+
+def build_split(split, pool, compact=False):
+    data_path, index_path = _paths(split)
+    rows = read_index(index_path)
+    next_row = whole_rows(data_path)
+    sources = scan_sources(split)
+    current = {path: os.stat(path) for path, _ in sources}
+
+    # ปิดแถวของไฟล์ที่ถูกลบหรือแก้ไข (ไฟล์ที่แก้ไขจะถูกสร้างแถวใหม่ต่อท้าย)
+    done = set()
+    for row in rows:
+        stat = current.get(row["path"])
+        if row["active"] == "1" and stat is not None and int(row["size"]) == stat.st_size and float(row["mtime"]) == stat.st_mtime:
+            done.add(row["path"])
+        else:
+            row["active"] = "0"
+
+    if compact and any(row["active"] == "0" for row in rows):
+        # เขียนไฟล์ใหม่เฉพาะแถวที่ active (เรียงตามลำดับเดิม)
+        active = [row for row in rows if row["active"] == "1"]
+        old = np.memmap(data_path, dtype=np.uint8, mode="r", shape=(next_row, IMG_HEIGHT, IMG_WIDTH))
+        with open(data_path + ".tmp", "wb") as out:
+            for new_row, row in enumerate(active):
+                out.write(old[int(row["row"])].tobytes())
+                row["row"] = str(new_row)
+        del old
+        os.replace(data_path + ".tmp", data_path)
+        rows = active
+        next_row = len(active)
+
+    todo = [(path, label) for path, label in sources if path not in done]
+    if todo:
+        # คำนวณขนานหลาย Process แต่เขียนต่อท้ายไฟล์ตามลำดับ (map คืนผลตามลำดับงาน)
+        with open(data_path, "ab") as out:
+            for (path, label), pixels in zip(todo, pool.map(clip_pixels, [path for path, _ in todo], chunksize=16)):
+                out.write(np.ascontiguousarray(pixels, dtype=np.uint8).tobytes())
+                stat = current[path]
+                rows.append({"row": str(next_row), "path": path, "label": str(label),
+                             "size": str(stat.st_size), "mtime": repr(stat.st_mtime), "active": "1"})
+                next_row += 1
+    write_index(index_path, rows)
+    active = sum(row["active"] == "1" for row in rows)
+    print(f"📦 {split}: เพิ่ม {len(todo)} ภาพ ใช้งาน {active} ภาพ (ทั้งไฟล์ {next_row} แถว)")
+
+def main():
+    parser = argparse.ArgumentParser(description="สร้างชุดข้อมูล Mel-spectrogram แบบ memory-mapped")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--compact", action="store_true", help="ลบแถวของไฟล์ที่ถูกลบ/แก้ไขออกจากไฟล์ข้อมูล")
+    args = parser.parse_args()
+
+    os.makedirs(PACKED_DIR, exist_ok=True)
+    meta_path = os.path.join(PACKED_DIR, "meta.json")
+    meta = {"classes": CLASSES, "dtype": "uint8", "params": BUILD_PARAMS}
+    previous = None
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            previous = json.load(f)
+    if previous != meta:
+        # พารามิเตอร์เปลี่ยน ภาพเดิมใช้ไม่ได้ สร้างใหม่ทั้งหมด
+        for split in SPLITS:
+            for path in _paths(split):
+                if os.path.exists(path):
+                    os.remove(path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    print("🖼️ กำลังสร้างชุดข้อมูล Mel-spectrogram แบบ memory-mapped...")
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for split in SPLITS:
+            build_split(split, pool, compact=args.compact)
+    print(f"\n✅ เสร็จสิ้น! ชุดข้อมูลพร้อมเทรนแล้วที่: {PACKED_DIR}")
+
+if __name__ == "__main__":
+    main()